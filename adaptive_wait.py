@@ -0,0 +1,142 @@
+"""
+自适应等待
+
+用页面信号（目录表格被替换、#popup_ok 弹窗关闭）代替固定的随机 sleep：
+信号出现即返回，并记录每个阶段实际的稳定耗时。记录的耗时会持久化，
+下次运行时据此自动收紧等待超时。礼貌性的最小间隔由 rate_limit.RateLimiter 单独控制。
+"""
+import json
+import statistics
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+
+from loguru import logger
+
+# 给当前目录表格打上标记；翻页后标记消失（整页刷新或表格被替换）即视为新页面已就绪
+MARK_TABLE_STALE_JS = """
+const t = document.querySelector('#directoryResults table');
+if (t) t.__awinStale = true;
+return !!t;
+"""
+TABLE_REPLACED_JS = """
+const t = document.querySelector('#directoryResults table');
+return !!t && !t.__awinStale;
+"""
+POPUP_CLOSED_JS = """
+const el = document.querySelector('#popup_ok');
+return !el || el.getClientRects().length === 0;
+"""
+
+
+class SettleStats:
+    """按阶段记录最近的稳定耗时（秒），线程安全，可持久化到 JSON"""
+
+    def __init__(self, path: Path | None = None, window: int = 200, min_samples: int = 10):
+        self.path = path
+        self.window = window
+        self.min_samples = min_samples
+        self._samples: dict[str, deque] = {}
+        self._lock = threading.Lock()
+        # 多个后台写入线程可能同时保存同一个实例，临时文件的写入与替换需要串行
+        self._save_lock = threading.Lock()
+        if path is not None and path.exists():
+            try:
+                for stage, values in json.loads(path.read_text(encoding="utf-8")).items():
+                    self._samples[stage] = deque((float(v) for v in values), maxlen=window)
+            except (json.JSONDecodeError, OSError, TypeError, ValueError):
+                logger.warning(f"无法读取等待耗时记录 {path}，从空记录开始")
+
+    def record(self, stage: str, seconds: float):
+        with self._lock:
+            self._samples.setdefault(stage, deque(maxlen=self.window)).append(seconds)
+
+    @contextmanager
+    def timed(self, stage: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - started)
+
+    def quantile(self, stage: str, q: float) -> float | None:
+        with self._lock:
+            values = sorted(self._samples.get(stage, ()))
+        if not values:
+            return None
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+    def timeout(self, stage: str, default: float, factor: float = 3.0, floor: float = 1.0) -> float:
+        """根据观测到的 p95 推导等待超时：样本不足时用 default，否则取 p95*factor 并限制在 [floor, default]"""
+        with self._lock:
+            count = len(self._samples.get(stage, ()))
+        if count < self.min_samples:
+            return default
+        return min(default, max(floor, self.quantile(stage, 0.95) * factor))
+
+    def summary(self) -> dict[str, dict]:
+        with self._lock:
+            snapshot = {stage: list(values) for stage, values in self._samples.items()}
+        result = {}
+        for stage, values in snapshot.items():
+            if not values:
+                continue
+            ordered = sorted(values)
+            result[stage] = {
+                "count": len(values),
+                "p50_ms": round(statistics.median(ordered) * 1000, 1),
+                "p95_ms": round(ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))] * 1000, 1),
+                "max_ms": round(ordered[-1] * 1000, 1),
+            }
+        return result
+
+    def save(self):
+        if self.path is None:
+            return
+        with self._lock:
+            data = {stage: [round(v, 4) for v in values] for stage, values in self._samples.items()}
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with self._save_lock:
+            tmp.write_text(json.dumps(data), encoding="utf-8")
+            tmp.replace(self.path)
+
+
+class AdaptiveWaiter:
+    """轮询页面信号直到满足条件，超时时间由 SettleStats 自动调整"""
+
+    def __init__(self, stats: SettleStats, poll_interval: float = 0.1):
+        self.stats = stats
+        self.poll_interval = poll_interval
+
+    def until(self, tab, stage: str, predicate_js: str, default_timeout: float) -> bool:
+        """
+        轮询 predicate_js 直到返回真值，返回是否在超时前满足
+        满足时记录耗时；导航过程中脚本执行失败视为尚未满足
+        """
+        timeout = self.stats.timeout(stage, default_timeout)
+        started = time.perf_counter()
+        while True:
+            try:
+                if tab.run_js(predicate_js):
+                    self.stats.record(stage, time.perf_counter() - started)
+                    return True
+            except Exception:
+                pass
+            if time.perf_counter() - started >= timeout:
+                logger.debug(f"等待 {stage} 超时 ({timeout:.1f}s)")
+                return False
+            time.sleep(self.poll_interval)
+
+    def mark_table_stale(self, tab) -> bool:
+        try:
+            return bool(tab.run_js(MARK_TABLE_STALE_JS))
+        except Exception:
+            return False
+
+    def table_replaced(self, tab, default_timeout: float = 15) -> bool:
+        return self.until(tab, "next_page_settle", TABLE_REPLACED_JS, default_timeout)
+
+    def popup_closed(self, tab, default_timeout: float = 10) -> bool:
+        return self.until(tab, "popup_close", POPUP_CLOSED_JS, default_timeout)
@@ -0,0 +1,311 @@
+"""
+审计日志分析
+
+增量读取审计日志的各个段（audit_log.segments，从上次处理到的「段序号 + 字节偏移」继续），
+按块转换为列式数据：
+- 每块只保留标量字段（ID 列表与差量不进入列式数据，只保留其计数与页面指纹），
+  写入 audit_columns/part-<段>-<偏移>.parquet（未安装 pyarrow 时写 .csv.gz），可用 load_frames() 做即席分析
+- 同时把各块的聚合结果累加到 state.json：各阶段失败次数、每小时成功邀请数、重复点击
+内存占用只取决于块大小与聚合结果，与日志总大小无关。当前文件被截断或替换时自动从头开始。
+pandas 只在 ingest 与 load_frames 时导入，report/reset 不需要加载。
+
+用法: python audit_analytics.py ingest [--log awin_audit.jsonl] [--chunk-size 20000]
+      python audit_analytics.py report [--hours 24] [--top 10] [--json]
+      python audit_analytics.py reset
+"""
+import argparse
+import importlib.util
+import json
+import shutil
+from collections import Counter
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from rich.console import Console
+from rich.table import Table
+
+import audit_log
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+DEFAULT_LOG_PATH = Path(__file__).parent / "awin_audit.jsonl"
+DEFAULT_COLUMNS_DIR = Path(__file__).parent / "audit_columns"
+
+# 写入列式数据的字段（均为标量）；其余字段（publisher_ids 列表、attrs 字典等）不进入列式数据
+COLUMNS = [
+    "ts", "event", "run", "url", "fetch_seq", "click_seq", "publisher_id", "stage", "error",
+    "after_refresh", "clicked_before", "extract_mode", "raw_count", "unique_count", "new_count",
+    "seen_total", "page_number", "settled", "html_path", "fp",
+]
+PART_SUFFIX = ".parquet" if importlib.util.find_spec("pyarrow") else ".csv.gz"
+
+console = Console()
+
+
+def _empty_state() -> dict:
+    return {
+        "source": None,
+        # 下一条待处理记录的位置：段序号 + 段内（解压后的）字节偏移；inode 用于发现当前文件被替换
+        "seq": 0,
+        "offset": 0,
+        "inode": None,
+        "lines": 0,
+        "bad_lines": 0,
+        "events": {},
+        "stage_failures": {},
+        "invites_per_hour": {},
+        # 每个 publisher 成功邀请的次数，用于发现重复邀请
+        "publisher_successes": {},
+        # 点击前已在 clicked 记录中的尝试次数（重复点击）
+        "clicked_before_attempts": 0,
+    }
+
+
+def _row_of(record: dict | None) -> dict | None:
+    if record is None or not record.get("event"):
+        return None
+    return {name: record.get(name) for name in COLUMNS}
+
+
+def _failure_stage(frame: "pd.DataFrame") -> "pd.Series":
+    """失败事件对应的阶段：invite_click_failed 自带 stage，刷新后仍找不到按钮记为 locate_link"""
+    import pandas as pd
+
+    failed = frame.loc[frame["event"] == "invite_click_failed", "stage"].fillna("unknown")
+    missing = (frame["event"] == "invite_button_missing") & frame["after_refresh"].eq(True)
+    return pd.concat([failed, pd.Series("locate_link", index=frame.index[missing])])
+
+
+def _merge_counts(target: dict, counts: "pd.Series"):
+    for key, value in counts.items():
+        target[str(key)] = target.get(str(key), 0) + int(value)
+
+
+def aggregate(frame: "pd.DataFrame", state: dict):
+    """把一块事件的聚合结果累加到 state"""
+    import pandas as pd
+
+    _merge_counts(state["events"], frame["event"].value_counts())
+    _merge_counts(state["stage_failures"], _failure_stage(frame).value_counts())
+
+    success = frame[frame["event"] == "invite_sent_success"]
+    hours = pd.to_datetime(pd.to_numeric(success["ts"], errors="coerce"), unit="s", utc=True).dt.floor("h").dropna()
+    _merge_counts(state["invites_per_hour"], hours.dt.strftime("%Y-%m-%dT%H:00Z").value_counts())
+    _merge_counts(state["publisher_successes"], success["publisher_id"].dropna().astype(str).value_counts())
+
+    attempts = frame[frame["event"] == "invite_click_attempt"]
+    state["clicked_before_attempts"] += int(attempts["clicked_before"].eq(True).sum())
+
+
+class AuditAnalytics:
+    """审计日志的增量列式转换与聚合"""
+
+    def __init__(self, log_path: Path = DEFAULT_LOG_PATH, columns_dir: Path = DEFAULT_COLUMNS_DIR):
+        self.log_path = Path(log_path)
+        self.columns_dir = Path(columns_dir)
+        self.state_path = self.columns_dir / "state.json"
+        self.state = self._load_state()
+
+    def _load_state(self) -> dict:
+        if self.state_path.exists():
+            try:
+                return {**_empty_state(), **json.loads(self.state_path.read_text(encoding="utf-8"))}
+            except (json.JSONDecodeError, OSError):
+                console.print(f"[yellow]⚠️ {self.state_path} 无法读取，重新处理全部日志[/yellow]")
+                self._clear_parts()
+        return _empty_state()
+
+    def _save_state(self):
+        self.columns_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_path.with_name(self.state_path.name + ".tmp")
+        tmp.write_text(json.dumps(self.state, ensure_ascii=False), encoding="utf-8")
+        tmp.replace(self.state_path)
+
+    def _clear_parts(self):
+        for part in self.columns_dir.glob("part-*"):
+            part.unlink()
+
+    def reset(self):
+        if self.columns_dir.exists():
+            shutil.rmtree(self.columns_dir)
+        self.state = _empty_state()
+
+    def _write_part(self, seq: int, start: int, frame: "pd.DataFrame"):
+        self.columns_dir.mkdir(parents=True, exist_ok=True)
+        # 以块的起始位置命名：中途中断后重新处理同一块会覆盖而不是重复
+        part = self.columns_dir / f"part-{seq:06d}-{start:015d}{PART_SUFFIX}"
+        if PART_SUFFIX == ".parquet":
+            frame.to_parquet(part, index=False)
+        else:
+            frame.to_csv(part, index=False)
+
+    def _flush_chunk(self, seq: int, start: int, rows: list[dict], lines: int, bad_lines: int, position: dict):
+        if rows:
+            import pandas as pd
+
+            frame = pd.DataFrame.from_records(rows, columns=COLUMNS)
+            aggregate(frame, self.state)
+            self._write_part(seq, start, frame)
+        self.state.update(
+            position,
+            lines=self.state["lines"] + lines,
+            bad_lines=self.state["bad_lines"] + bad_lines,
+        )
+        self._save_state()
+
+    def _check_source(self, segments: list[tuple[int, Path]]):
+        """日志路径变化、当前文件被截断或替换时从头重新处理"""
+        source = str(self.log_path.resolve())
+        changed = self.state["source"] != source
+        for seq, segment in segments:
+            if seq == self.state["seq"] and not segment.name.endswith(".gz"):
+                stat = segment.stat()
+                changed |= stat.st_size < self.state["offset"]
+                changed |= self.state["inode"] is not None and stat.st_ino != self.state["inode"]
+        if changed:
+            if self.state["offset"] or self.state["seq"]:
+                console.print("[yellow]⚠️ 审计日志已被截断或替换，从头重新处理[/yellow]")
+            self.reset()
+            self.state["source"] = source
+
+    def ingest(self, chunk_size: int = 20000) -> int:
+        """处理上次位置之后新增的完整记录（依次经过已轮转的段与当前文件），返回处理的记录数"""
+        segments = audit_log.segments(self.log_path)
+        self._check_source(segments)
+        processed = 0
+        for seq, segment in segments:
+            if seq < self.state["seq"]:
+                continue
+            start = end = self.state["offset"] if seq == self.state["seq"] else 0
+            rows: list[dict] = []
+            lines = bad_lines = 0
+            for end, record in audit_log.read_records(segment, start):
+                lines += 1
+                row = _row_of(record)
+                if row is None:
+                    bad_lines += 1
+                else:
+                    rows.append(row)
+                if lines >= chunk_size:
+                    self._flush_chunk(seq, start, rows, lines, bad_lines, {"seq": seq, "offset": end})
+                    processed += lines
+                    start, rows, lines, bad_lines = end, [], 0, 0
+            if segment.name.endswith(".gz"):
+                # 已轮转的段不会再增长，下次从下一段开头继续
+                position = {"seq": seq + 1, "offset": 0, "inode": None}
+            else:
+                position = {"seq": seq, "offset": end, "inode": segment.stat().st_ino}
+            self._flush_chunk(seq, start, rows, lines, bad_lines, position)
+            processed += lines
+        return processed
+
+    def load_frames(self, columns: list[str] | None = None):
+        """逐块读取列式数据（生成器），用于即席分析"""
+        import pandas as pd
+
+        for part in sorted(self.columns_dir.glob("part-*")):
+            if part.name.endswith(".parquet"):
+                yield pd.read_parquet(part, columns=columns)
+            else:
+                yield pd.read_csv(part, usecols=columns, dtype={"publisher_id": str})
+
+    def report(self, hours: int = 24, top: int = 10) -> dict:
+        """根据累计的聚合结果生成报告"""
+        events = self.state["events"]
+        attempts = events.get("invite_click_attempt", 0)
+        successes = events.get("invite_sent_success", 0)
+        duplicates = Counter({pid: n for pid, n in self.state["publisher_successes"].items() if n > 1})
+        per_hour = sorted(self.state["invites_per_hour"].items())[-hours:] if hours else []
+        missing_after_refresh = self.state["stage_failures"].get("locate_link", 0)
+        return {
+            "lines": self.state["lines"],
+            "bad_lines": self.state["bad_lines"],
+            "events": dict(sorted(events.items())),
+            "attempts": attempts,
+            "successes": successes,
+            "success_rate": round(successes / attempts, 4) if attempts else None,
+            "stage_failures": {
+                stage: {"count": n, "rate": round(n / attempts, 4) if attempts else None}
+                for stage, n in sorted(self.state["stage_failures"].items(), key=lambda item: -item[1])
+            },
+            "button_missing_first_try": events.get("invite_button_missing", 0) - missing_after_refresh,
+            "button_missing_after_refresh": missing_after_refresh,
+            "invites_per_hour": dict(per_hour),
+            "clicked_before_attempts": self.state["clicked_before_attempts"],
+            "duplicate_invited_publishers": len(duplicates),
+            "top_duplicates": dict(duplicates.most_common(top)),
+        }
+
+
+def print_report(report: dict):
+    console.print(
+        f"[bold]审计日志[/bold]: {report['lines']} 行（无法解析 {report['bad_lines']} 行）, "
+        f"点击尝试 {report['attempts']}, 成功 {report['successes']}"
+        + (f", 成功率 {report['success_rate']:.1%}" if report["success_rate"] is not None else "")
+    )
+
+    table = Table(title="各阶段失败", title_justify="left")
+    table.add_column("阶段")
+    table.add_column("次数", justify="right")
+    table.add_column("占点击尝试", justify="right")
+    for stage, item in report["stage_failures"].items():
+        table.add_row(stage, str(item["count"]), f"{item['rate']:.1%}" if item["rate"] is not None else "-")
+    console.print(table)
+    console.print(
+        f"按钮首次查找失败（刷新前）: {report['button_missing_first_try']} 次, "
+        f"刷新后仍找不到: {report['button_missing_after_refresh']} 次"
+    )
+
+    table = Table(title="每小时成功邀请", title_justify="left")
+    table.add_column("小时 (UTC)")
+    table.add_column("邀请数", justify="right")
+    for hour, n in report["invites_per_hour"].items():
+        table.add_row(hour, str(n))
+    console.print(table)
+
+    console.print(
+        f"重复点击: 点击前已记录为已点击的尝试 {report['clicked_before_attempts']} 次, "
+        f"被成功邀请多次的 publisher {report['duplicate_invited_publishers']} 个"
+    )
+    for pid, n in report["top_duplicates"].items():
+        console.print(f"  {pid}: {n} 次")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--log", type=Path, default=DEFAULT_LOG_PATH)
+    parser.add_argument("--columns-dir", type=Path, default=DEFAULT_COLUMNS_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    ingest = sub.add_parser("ingest", help="增量处理新增的审计日志")
+    ingest.add_argument("--chunk-size", type=int, default=20000)
+
+    report = sub.add_parser("report", help="增量处理后输出汇总报告")
+    report.add_argument("--chunk-size", type=int, default=20000)
+    report.add_argument("--hours", type=int, default=24, help="显示最近多少个有邀请的小时")
+    report.add_argument("--top", type=int, default=10, help="显示重复邀请最多的前 N 个 publisher")
+    report.add_argument("--json", action="store_true", help="以 JSON 输出")
+
+    sub.add_parser("reset", help="清空列式数据与处理进度")
+
+    args = parser.parse_args()
+    analytics = AuditAnalytics(args.log, args.columns_dir)
+    if args.command == "reset":
+        analytics.reset()
+        print(f"已清空 {args.columns_dir}")
+        return
+
+    processed = analytics.ingest(args.chunk_size)
+    if args.command == "ingest":
+        print(f"处理 {processed} 行，当前偏移 {analytics.state['offset']} 字节")
+    else:
+        result = analytics.report(args.hours, args.top)
+        if args.json:
+            print(json.dumps(result, ensure_ascii=False, indent=2))
+        else:
+            print_report(result)
+
+
+if __name__ == "__main__":
+    main()
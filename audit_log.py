@@ -0,0 +1,270 @@
+"""
+精简审计日志
+
+替代 loguru serialize=True 的审计输出（每行都带 process/thread/file/function 等信封字段）：
+- 每条记录只有 ts（epoch 秒）、run（本次进程的运行标识）、event 与事件自身的字段
+- publisher_ids_fetched 不再写完整 ID 列表，只写页面指纹 fp 与相对上一次获取的差量 ops
+  （[起始, 结束, 替换成的 ID]，对上一次的列表从后往前应用），新 ID 用下标区间 new 表示；
+  每个文件段内第一次获取写完整列表 ids，因此任一段都可以单独还原
+- 按大小轮转，轮转出的段 gzip 压缩为 <文件名>.<序号>.gz，只保留最近 backups 段
+- 文件后缀为 .msgpack（或 framing="msgpack"）时使用 msgpack 二进制帧，需要安装 msgpack
+
+read_events() 按顺序读取所有段并还原完整的 publisher_ids / new_publisher_ids；
+也能读取旧版 loguru 格式的行，方便新旧日志混在一起分析。
+
+用法: python audit_log.py cat [--log awin_audit.jsonl] [--event publisher_ids_fetched]
+"""
+import argparse
+import gzip
+import json
+import re
+import secrets
+import shutil
+import sys
+import threading
+import time
+from datetime import datetime
+from difflib import SequenceMatcher
+from pathlib import Path
+
+from page_index import fingerprint
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+FRAMINGS = ("json", "msgpack")
+
+
+def framing_of(path: Path) -> str:
+    name = re.sub(r"\.\d+\.gz$", "", Path(path).name)
+    return "msgpack" if name.endswith(".msgpack") else "json"
+
+
+def encode_ids(base: list[str] | None, publisher_ids: list[str], new_ids: list[str] | None) -> dict:
+    """把 ID 列表编码为相对 base 的差量字段（base 为 None 时写完整列表）"""
+    fields: dict = {"fp": fingerprint(publisher_ids)}
+    if base is None:
+        fields["ids"] = publisher_ids
+    else:
+        matcher = SequenceMatcher(None, base, publisher_ids, autojunk=False)
+        fields["ops"] = [
+            [i1, i2, publisher_ids[j1:j2]]
+            for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != "equal"
+        ]
+    if new_ids is not None:
+        position = {pid: i for i, pid in enumerate(publisher_ids)}
+        if all(pid in position for pid in new_ids):
+            ranges: list[list[int]] = []
+            for i in sorted(position[pid] for pid in new_ids):
+                if ranges and ranges[-1][1] == i:
+                    ranges[-1][1] = i + 1
+                else:
+                    ranges.append([i, i + 1])
+            fields["new"] = ranges
+        else:
+            fields["new_ids"] = new_ids
+    return fields
+
+
+def decode_ids(record: dict, base: list[str] | None) -> list[str] | None:
+    """按 encode_ids 的字段还原 publisher_ids / new_publisher_ids（原地写回 record），返回还原出的列表"""
+    if "ids" in record:
+        publisher_ids = record.pop("ids")
+    elif "ops" in record and base is not None:
+        publisher_ids = list(base)
+        for i1, i2, replacement in reversed(record.pop("ops")):
+            publisher_ids[i1:i2] = replacement
+    else:
+        publisher_ids = record.get("publisher_ids")
+    if publisher_ids is None:
+        return None
+    record["publisher_ids"] = publisher_ids
+    if "new" in record:
+        record["new_publisher_ids"] = [publisher_ids[i] for start, end in record.pop("new") for i in range(start, end)]
+    elif "new_ids" in record:
+        record["new_publisher_ids"] = record.pop("new_ids")
+    return publisher_ids
+
+
+class AuditSink:
+    """按大小轮转的精简审计日志，线程安全"""
+
+    def __init__(
+        self,
+        path: Path,
+        framing: str | None = None,
+        max_bytes: int = 64 * 1024 * 1024,
+        backups: int = 20,
+    ):
+        self.path = Path(path)
+        self.framing = framing or framing_of(self.path)
+        if self.framing not in FRAMINGS:
+            raise ValueError(f"未知的审计日志格式: {self.framing}")
+        if self.framing == "msgpack" and msgpack is None:
+            raise ValueError("审计日志使用 msgpack 格式需要先安装 msgpack")
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.run = f"{int(time.time()):x}{secrets.token_hex(2)}"
+        self._file = None
+        self._size = 0
+        # 当前文件段内上一次获取的 ID 列表，作为下一次差量的基准
+        self._last_ids: list[str] | None = None
+        self._lock = threading.Lock()
+
+    def _open(self):
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, "ab")
+            self._size = self._file.tell()
+            # 追加到已有文件时无法确定文件中最后一次获取来自本次运行，下一次获取写完整列表
+            self._last_ids = None
+        return self._file
+
+    def _encode(self, record: dict) -> bytes:
+        if self.framing == "msgpack":
+            return msgpack.packb(record, use_bin_type=True)
+        return (json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+    def write(self, record: dict):
+        """写入一条记录；record 中的 publisher_ids / new_publisher_ids 会被替换为差量字段"""
+        record = {"ts": round(record.pop("ts", time.time()), 3), "run": self.run, **record}
+        with self._lock:
+            f = self._open()
+            if "publisher_ids" in record:
+                publisher_ids = record.pop("publisher_ids")
+                record.update(encode_ids(self._last_ids, publisher_ids, record.pop("new_publisher_ids", None)))
+                self._last_ids = publisher_ids
+            data = self._encode(record)
+            f.write(data)
+            f.flush()
+            self._size += len(data)
+            if self._size >= self.max_bytes:
+                self._rotate()
+
+    def _rotate(self):
+        self._file.close()
+        self._file = None
+        rotated = segments(self.path)
+        seq = (rotated[-2][0] if len(rotated) > 1 else 0) + 1
+        target = self.path.with_name(f"{self.path.name}.{seq:06d}.gz")
+        with open(self.path, "rb") as src, gzip.open(target, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        self.path.unlink()
+        for _, old in segments(self.path)[:-self.backups or None]:
+            old.unlink()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def segments(path: Path) -> list[tuple[int, Path]]:
+    """[(序号, 路径)]：已轮转的压缩段按序号排列，当前文件（若存在）序号为最大序号 + 1"""
+    path = Path(path)
+    pattern = re.compile(re.escape(path.name) + r"\.(\d+)\.gz$")
+    rotated = sorted(
+        (int(m.group(1)), p) for p in path.parent.glob(path.name + ".*.gz") if (m := pattern.match(p.name))
+    )
+    if path.exists():
+        rotated.append(((rotated[-1][0] if rotated else 0) + 1, path))
+    return rotated
+
+
+def _from_legacy(obj: dict) -> dict | None:
+    """旧版 loguru serialize 行 -> 精简记录；非审计行返回 None"""
+    record = obj.get("record") or {}
+    extra = dict(record.get("extra") or {})
+    if not extra.pop("audit", False):
+        return None
+    try:
+        ts = datetime.fromisoformat(extra.pop("ts")).timestamp()
+    except (KeyError, TypeError, ValueError):
+        ts = (record.get("time") or {}).get("timestamp")
+    return {"ts": ts, "run": str((record.get("process") or {}).get("id")), **extra}
+
+
+def read_records(path: Path, start: int = 0, framing: str | None = None):
+    """
+    读取一个段（.gz 或当前文件）从 start 字节（解压后的偏移）开始的记录，生成 (结束偏移, 记录)
+    无法解析或不是审计记录的行生成 (结束偏移, None)；未写完整的末尾记录不会返回
+    """
+    path = Path(path)
+    framing = framing or framing_of(path)
+    opener = gzip.open if path.name.endswith(".gz") else open
+    with opener(path, "rb") as f:
+        f.seek(start)
+        if framing == "msgpack":
+            if msgpack is None:
+                raise ValueError("读取 msgpack 格式的审计日志需要先安装 msgpack")
+            unpacker = msgpack.Unpacker(f, raw=False)
+            try:
+                for record in unpacker:
+                    yield start + unpacker.tell(), record if isinstance(record, dict) else None
+            except (msgpack.OutOfData, ValueError):
+                return
+            return
+        offset = start
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            offset += len(line)
+            try:
+                obj = json.loads(line)
+            except ValueError:
+                yield offset, None
+                continue
+            if not isinstance(obj, dict):
+                yield offset, None
+            elif "record" in obj:
+                yield offset, _from_legacy(obj)
+            else:
+                yield offset, obj
+
+
+def read_events(path: Path, event: str | None = None):
+    """按顺序读取全部段，还原获取事件的完整 ID 列表后生成记录"""
+    last_ids: dict[str, list[str]] = {}
+    for _, segment in segments(path):
+        for _, record in read_records(segment):
+            if record is None:
+                continue
+            if record.get("event") == "publisher_ids_fetched":
+                publisher_ids = decode_ids(record, last_ids.get(record.get("run")))
+                if publisher_ids is not None:
+                    last_ids[record.get("run")] = publisher_ids
+            if event is None or record.get("event") == event:
+                yield record
+
+
+def recent_events(path: Path, event: str, since: float):
+    """ts 不早于 since 的 event 记录；最后修改时间早于 since 的段整段跳过，不还原获取事件的 ID 列表"""
+    for _, segment in segments(path):
+        try:
+            if segment.stat().st_mtime < since:
+                continue
+        except OSError:
+            continue
+        for _, record in read_records(segment):
+            if record is not None and record.get("event") == event and (record.get("ts") or 0) >= since:
+                yield record
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--log", type=Path, default=Path(__file__).parent / "awin_audit.jsonl")
+    sub = parser.add_subparsers(dest="command", required=True)
+    cat = sub.add_parser("cat", help="输出还原后的完整审计记录（JSON Lines）")
+    cat.add_argument("--event")
+    args = parser.parse_args()
+
+    if args.command == "cat":
+        for record in read_events(args.log, args.event):
+            sys.stdout.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+if __name__ == "__main__":
+    main()
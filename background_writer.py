@@ -0,0 +1,130 @@
+"""
+后台写入线程
+
+把 HTML 快照落盘、审计日志序列化等 I/O 从点击热路径上移走：
+- 有界队列提供背压，队列满时提交方阻塞（并统计阻塞时间）
+- 单线程按提交顺序执行，后提交的任务可以直接读取先提交任务的 Future 结果
+- 单个任务异常只记录日志，不会中断后续任务
+- 进程退出时（atexit）自动排空队列
+- 关闭检查与入队在同一把锁内完成，close 之后不会再有任务排在停止标记之后
+"""
+import atexit
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from loguru import logger
+
+_STOP = object()
+
+
+def resolve(value, default=None):
+    """若 value 是 Future 则等待并返回其结果（失败时返回 default），否则原样返回"""
+    if isinstance(value, Future):
+        try:
+            return value.result()
+        except Exception:
+            return default
+    return value
+
+
+class BackgroundWriter:
+    """有界队列 + 单工作线程的后台写入器"""
+
+    def __init__(self, maxsize: int = 64, name: str = "awin-writer"):
+        self._queue: queue.Queue = queue.Queue(maxsize=maxsize)
+        self._closed = False
+        # _lock 保护 _closed 与入队；_stats_lock 保护提交方与工作线程各自更新的统计
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        # 工作线程执行任务的累计耗时，即从热路径上移走的时间
+        self.busy_seconds = 0.0
+        # 队列满时提交方累计阻塞的时间
+        self.blocked_seconds = 0.0
+        self.max_depth = 0
+        self._thread = threading.Thread(target=self._worker, name=name, daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, func, *args, **kwargs) -> Future:
+        """提交任务，返回 Future；已关闭时在当前线程同步执行"""
+        future: Future = Future()
+        item = (future, func, args, kwargs)
+        blocked = 0.0
+        with self._lock:
+            if not self._closed:
+                try:
+                    self._queue.put_nowait(item)
+                except queue.Full:
+                    started = time.perf_counter()
+                    self._queue.put(item)
+                    blocked = time.perf_counter() - started
+                depth = self._queue.qsize()
+                with self._stats_lock:
+                    self.submitted += 1
+                    self.blocked_seconds += blocked
+                    self.max_depth = max(self.max_depth, depth)
+                return future
+        self._run(future, func, args, kwargs)
+        return future
+
+    def _run(self, future: Future, func, args, kwargs):
+        if not future.set_running_or_notify_cancel():
+            return
+        started = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            with self._stats_lock:
+                self.failed += 1
+                self.busy_seconds += time.perf_counter() - started
+            future.set_exception(e)
+            logger.opt(exception=e).warning(f"后台写入任务失败: {getattr(func, '__name__', func)}")
+            return
+        with self._stats_lock:
+            self.completed += 1
+            self.busy_seconds += time.perf_counter() - started
+        future.set_result(result)
+
+    def _worker(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _STOP:
+                    return
+                self._run(*item)
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        """阻塞直到已提交的任务全部完成"""
+        if not self._closed:
+            self._queue.join()
+
+    def close(self, timeout: float | None = 30):
+        """停止接收新任务（之后的提交改为同步执行），排空队列并结束工作线程"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.warning(f"后台写入线程在 {timeout}s 内未排空，剩余约 {self._queue.qsize()} 个任务")
+        atexit.unregister(self.close)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "pending": self._queue.qsize(),
+                "max_depth": self.max_depth,
+                "busy_ms": round(self.busy_seconds * 1000, 1),
+                "blocked_ms": round(self.blocked_seconds * 1000, 1),
+            }
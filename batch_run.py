@@ -0,0 +1,264 @@
+"""
+无人值守批量运行
+
+不经过 AppUI 的交互式菜单，按命令行参数或队列文件执行邀请任务，适合 cron 等定时调度：
+- 单个任务: --merchant（商户 ID 或目录页 URL）、--count、--template（invitation_messages.json 中的名称）
+- 队列文件: --queue jobs.jsonl，每行一个 JSON 任务，字段与命令行参数同名（merchant、count、template、
+  tabs、max_per_minute、invite_interval、page_interval、name），未给出的字段取命令行参数的值
+所有任务在同一个浏览器会话中依次执行，浏览器只启动一次；开始前先校验全部任务，配置有误时不启动浏览器。
+--resume 时单标签页任务从同一目录页、同一邀请信息的未完成检查点继续（见 checkpoint.py），count 为总目标。
+--per-hour / --per-day 启用跨运行共享的邀请配额（见 invite_quota.py）：发送节奏由配额的令牌桶控制，
+不再使用 --invite-interval 的固定间隔；今天的配额用完后任务以 quota 状态结束，之后的任务不再执行。
+结束时在标准输出最后一行输出 JSON 汇总（--summary 可另存为文件）。
+
+退出码: 0 全部任务发送了请求的数量；1 有任务发送不足（目录页已无可邀请的 publisher、发送失败或配额用完）；
+        2 参数/队列文件/邀请信息模板有误；3 有任务运行出错；130 被中断
+
+用法: python batch_run.py --merchant 45307 --count 20 --template 默认邀请信息 [--tabs 2 --max-per-minute 10]
+      python batch_run.py --queue jobs.jsonl [--summary summary.json] [--headless] [--block-resources]
+"""
+import argparse
+import json
+import sys
+import time
+from dataclasses import asdict, dataclass, fields
+from datetime import datetime, timezone
+from pathlib import Path
+
+from loguru import logger
+
+import main as rpa_main
+from rate_limit import RateLimiter
+
+EXIT_OK = 0
+EXIT_PARTIAL = 1
+EXIT_CONFIG = 2
+EXIT_ERROR = 3
+EXIT_INTERRUPTED = 130
+
+
+class JobError(ValueError):
+    """任务配置有误"""
+
+
+@dataclass
+class BatchJob:
+    merchant: str
+    count: int
+    template: str | None = None
+    tabs: int = 1
+    max_per_minute: float | None = None
+    invite_interval: float = 2.0
+    page_interval: float = 1.0
+    name: str | None = None
+
+    @property
+    def url(self) -> str:
+        return directory_url(self.merchant)
+
+
+def directory_url(merchant: str) -> str:
+    """商户 ID -> 目录页 URL；已经是 URL 时原样返回"""
+    merchant = str(merchant).strip()
+    if merchant.startswith(("http://", "https://")):
+        return merchant
+    if not merchant.isdigit():
+        raise JobError(f"商户应为数字 ID 或目录页 URL: {merchant!r}")
+    return rpa_main.AwinRPA.DIRECTORY_URL_TEMPLATE.format(merchant_id=merchant)
+
+
+def _job_from(values: dict, defaults: dict, label: str) -> BatchJob:
+    known = {f.name for f in fields(BatchJob)}
+    unknown = sorted(set(values) - known)
+    if unknown:
+        raise JobError(f"{label}: 未知字段 {', '.join(unknown)}")
+    merged = {**defaults, **values}
+    if not merged.get("merchant"):
+        raise JobError(f"{label}: 缺少 merchant")
+    try:
+        job = BatchJob(
+            merchant=str(merged["merchant"]),
+            count=int(merged["count"]),
+            template=merged.get("template"),
+            tabs=int(merged.get("tabs") or 1),
+            max_per_minute=float(merged["max_per_minute"]) if merged.get("max_per_minute") else None,
+            invite_interval=float(merged["invite_interval"]),
+            page_interval=float(merged["page_interval"]),
+            name=merged.get("name"),
+        )
+    except (KeyError, TypeError, ValueError) as e:
+        raise JobError(f"{label}: 字段有误 ({e})") from None
+    if job.count <= 0 or job.tabs <= 0:
+        raise JobError(f"{label}: count 与 tabs 必须为正整数")
+    directory_url(job.merchant)
+    return job
+
+
+def load_jobs(args: argparse.Namespace) -> list[BatchJob]:
+    defaults = {
+        "merchant": args.merchant,
+        "count": args.count,
+        "template": args.template,
+        "tabs": args.tabs,
+        "max_per_minute": args.max_per_minute,
+        "invite_interval": args.invite_interval,
+        "page_interval": args.page_interval,
+    }
+    if args.queue is None:
+        if args.merchant is None or args.count is None:
+            raise JobError("未指定 --queue 时必须给出 --merchant 与 --count")
+        return [_job_from({}, defaults, "命令行")]
+    try:
+        lines = args.queue.read_text(encoding="utf-8").splitlines()
+    except OSError as e:
+        raise JobError(f"无法读取队列文件: {e}") from None
+    jobs = []
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            values = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise JobError(f"{args.queue}:{number}: 不是有效的 JSON ({e})") from None
+        if not isinstance(values, dict):
+            raise JobError(f"{args.queue}:{number}: 每行应为一个 JSON 对象")
+        jobs.append(_job_from(values, defaults, f"{args.queue}:{number}"))
+    if not jobs:
+        raise JobError(f"队列文件中没有任务: {args.queue}")
+    return jobs
+
+
+def resolve_message(messages: list[dict], template: str | None) -> tuple[str, str]:
+    """按名称取邀请信息模板，未指定名称时取第一条，返回 (名称, 内容)"""
+    if not messages:
+        raise JobError("invitation_messages.json 中没有邀请信息")
+    if template is None:
+        return messages[0]["name"], messages[0]["content"]
+    for message in messages:
+        if message["name"] == template:
+            return message["name"], message["content"]
+    raise JobError(f"未找到邀请信息模板: {template!r}（可用: {', '.join(m['name'] for m in messages)}）")
+
+
+def _sent_in_run(rpa: rpa_main.AwinRPA) -> int:
+    """本次运行中发送成功的数量（运行出错、拿不到 run 的返回值时使用）"""
+    return rpa.metrics.summary().get("invite.total", {}).get("count") or 0
+
+
+def run_job(rpa: rpa_main.AwinRPA, job: BatchJob, message_name: str, msg: str, first: bool, resume: bool = False) -> dict:
+    result = {**asdict(job), "url": job.url, "template": message_name, "sent": 0, "failed": 0, "status": "error", "error": None}
+    started = time.perf_counter()
+    try:
+        # 第一个任务的目录页已由 start_browser 预热
+        if not first:
+            rpa.goto_page(job.url)
+        per_minute = job.max_per_minute if job.tabs == 1 else None
+        rpa.invite_limiter = RateLimiter(per_minute, min_interval=job.invite_interval, jitter=0.3)
+        rpa.page_limiter = RateLimiter(min_interval=job.page_interval, jitter=0.3)
+        if job.tabs > 1:
+            sent = rpa.run_parallel(job.count, msg, tabs=job.tabs, max_per_minute=job.max_per_minute, message_name=message_name)
+        else:
+            sent = rpa.run(job.count, msg, message_name=message_name, resume=resume)
+        result["sent"] = sent
+        result["status"] = "ok" if sent >= job.count else "quota" if rpa.quota_exhausted else "partial"
+    except KeyboardInterrupt:
+        result["sent"] = _sent_in_run(rpa)
+        result["status"] = "interrupted"
+    except Exception as e:
+        logger.exception(f"任务 {job.name or job.merchant} 运行出错")
+        result["sent"] = _sent_in_run(rpa)
+        result["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        result["failed"] = len(rpa.failed_publisher_ids)
+        result["duration_s"] = round(time.perf_counter() - started, 1)
+    return result
+
+
+def exit_code_of(results: list[dict]) -> int:
+    statuses = {r["status"] for r in results}
+    if "interrupted" in statuses:
+        return EXIT_INTERRUPTED
+    if "error" in statuses:
+        return EXIT_ERROR
+    if "partial" in statuses or "quota" in statuses:
+        return EXIT_PARTIAL
+    return EXIT_OK
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--merchant", help="商户 ID 或目录页 URL")
+    parser.add_argument("--count", type=int, help="要发送的邀请数量")
+    parser.add_argument("--template", help="邀请信息名称（默认取第一条）")
+    parser.add_argument("--tabs", type=int, default=1, help="并行发送的标签页数量")
+    parser.add_argument("--max-per-minute", type=float, default=None, help="每分钟最多发送的邀请数")
+    parser.add_argument("--invite-interval", type=float, default=2.0, help="相邻两次邀请的最小间隔（秒）")
+    parser.add_argument("--page-interval", type=float, default=1.0, help="相邻两次翻页的最小间隔（秒）")
+    parser.add_argument("--queue", type=Path, help="任务队列文件（JSON Lines），依次执行")
+    parser.add_argument("--summary", type=Path, help="把 JSON 汇总另存为文件")
+    parser.add_argument("--browser-address", help="接管已启动的 Chromium 调试地址，如 127.0.0.1:9222")
+    parser.add_argument("--user-data-path", type=Path, help="新启动浏览器使用的用户数据目录（沿用登录状态）")
+    parser.add_argument("--headless", action="store_true", help="新启动的浏览器使用无头模式")
+    parser.add_argument("--block-resources", action="store_true", help="轻量页面模式：拦截图片/字体/媒体与统计跟踪请求")
+    parser.add_argument("--resume", action="store_true", help="从上次中断的运行检查点继续（仅单标签页任务）")
+    parser.add_argument(
+        "--input-mode", default="inject", choices=rpa_main.AwinRPA.INPUT_MODES,
+        help="邀请信息写入方式：inject 一次设置输入框的值（未被页面接受时自动改为键盘输入），type 键盘输入",
+    )
+    parser.add_argument(
+        "--long-run", action="store_true",
+        help="长时间运行模式：定期检查标签页内存与进程 RSS，超过阈值时回收标签页（见 memory_guard.py）",
+    )
+    parser.add_argument("--per-hour", type=float, help="邀请配额：每小时最多发送的邀请数（令牌桶补充速率）")
+    parser.add_argument("--per-day", type=int, help="邀请配额：每天（本地时间）最多发送的邀请数")
+    parser.add_argument("--burst", type=int, default=5, help="邀请配额：空闲之后允许连续发送的数量")
+    args = parser.parse_args()
+
+    try:
+        if args.per_hour is not None or args.per_day is not None:
+            try:
+                rpa_main.QUOTA_POLICY = rpa_main.QuotaPolicy(args.per_hour, args.per_day, args.burst)
+            except ValueError as e:
+                raise JobError(f"邀请配额参数有误: {e}") from None
+        jobs = load_jobs(args)
+        messages = rpa_main.MessageManager().load()
+        templates = [resolve_message(messages, job.template) for job in jobs]
+    except JobError as e:
+        print(f"配置错误: {e}", file=sys.stderr)
+        sys.exit(EXIT_CONFIG)
+
+    rpa_main.configure_logging()
+    if args.browser_address:
+        rpa_main.BROWSER_ADDRESS = args.browser_address
+    if args.user_data_path:
+        rpa_main.BROWSER_USER_DATA_PATH = args.user_data_path
+    co = rpa_main.browser_options()
+    if args.headless:
+        co.headless(True)
+    if args.block_resources:
+        rpa_main.RESOURCE_POLICY = rpa_main.ResourcePolicy()
+    if args.long_run:
+        rpa_main.MEMORY_LIMITS = rpa_main.MemoryLimits()
+
+    started = time.perf_counter()
+    summary = {"started": datetime.now(timezone.utc).isoformat(), "jobs": []}
+    rpa = rpa_main.AwinRPA(browser_options=co, lazy_browser=True, live_metrics=False, input_mode=args.input_mode)
+    rpa.start_browser(jobs[0].url)
+    for i, (job, (message_name, msg)) in enumerate(zip(jobs, templates)):
+        result = run_job(rpa, job, message_name, msg, first=i == 0, resume=args.resume)
+        summary["jobs"].append(result)
+        if result["status"] in ("interrupted", "quota"):
+            break
+
+    summary["startup"] = rpa.startup
+    summary["duration_s"] = round(time.perf_counter() - started, 1)
+    summary["sent"] = sum(r["sent"] for r in summary["jobs"])
+    summary["exit_code"] = exit_code_of(summary["jobs"])
+    if args.summary:
+        args.summary.write_text(json.dumps(summary, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(json.dumps(summary, ensure_ascii=False))
+    sys.exit(summary["exit_code"])
+
+
+if __name__ == "__main__":
+    main()
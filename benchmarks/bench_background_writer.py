@@ -0,0 +1,119 @@
+"""
+后台写入基准测试
+
+用静态标签页（返回放大后的 fixture 目录页 HTML，不启动浏览器）模拟邀请流程：
+每次邀请保存 before_click/after_click 两个快照、写 4 条审计日志，并以 sleep 模拟浏览器操作耗时，
+对比同步写入与后台写入时主线程（点击热路径）上每次邀请花在 I/O 上的时间。
+
+用法: python benchmarks/bench_background_writer.py [--invites 200] [--scale 10] [--browser-ms 100]
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from loguru import logger
+from rich.console import Console
+from rich.table import Table
+
+import main as rpa_main
+from capture_policy import CapturePolicy
+from snapshot_store import SnapshotStore
+
+FIXTURE_PATH = Path(__file__).parent / "fixtures" / "directory_page.html"
+
+console = Console()
+
+
+class StaticTab:
+    """只提供 html/url 属性的静态标签页"""
+
+    def __init__(self, html: str):
+        self.html = html
+        self.url = "https://ui.awin.com/awin/merchant/45307/affiliate-directory/index/tab/notInvited"
+
+
+class StaticBrowser:
+    def __init__(self, html: str):
+        self.latest_tab = StaticTab(html)
+
+
+def simulate(async_writes: bool, invites: int, html: str, browser_ms: float, tmp_dir: Path) -> dict:
+    # 每次邀请都保存两个快照，测量写入本身的开销
+    rpa = rpa_main.AwinRPA(
+        browser=StaticBrowser(html), async_writes=async_writes, capture_policy=CapturePolicy("always")
+    )
+    rpa.snapshot_store = SnapshotStore(tmp_dir / ("async" if async_writes else "sync"))
+    after_html = html.replace('<div id="content">', '<div id="content"><div class="modal closed">ok</div>')
+
+    started = time.perf_counter()
+    for i in range(invites):
+        rpa._counters["click"] += 1
+        rpa._click_seq = rpa._counters["click"]
+        pid = f"bench{i}"
+        # 每次邀请的页面内容不同，避免被内容去重跳过写入
+        rpa.tab.html = html.replace("</body>", f"<!-- {i} --></body>")
+        rpa._audit("invite_click_attempt", click_seq=rpa._click_seq, publisher_id=pid, clicked_before=False)
+        html_before = rpa._save_snapshot(pid, "before_click")
+        rpa._audit("snapshot_before_click", click_seq=rpa._click_seq, publisher_id=pid, html_path=html_before)
+        time.sleep(browser_ms / 1000)  # 点击、输入、发送、关闭弹窗
+        rpa.tab.html = after_html.replace("</body>", f"<!-- {i} --></body>")
+        html_after = rpa._save_snapshot(pid, "after_click")
+        rpa._audit("invite_sent_success", click_seq=rpa._click_seq, publisher_id=pid, html_path=html_after)
+        rpa._audit("next_invite", click_seq=rpa._click_seq)
+    hot_path = time.perf_counter() - started - invites * browser_ms / 1000
+
+    rpa._flush_writes()
+    total = time.perf_counter() - started - invites * browser_ms / 1000
+    stats = rpa.writer.stats() if rpa.writer else {}
+    if rpa.writer:
+        rpa.writer.close()
+    return {
+        "hot_ms": hot_path / invites * 1000,
+        "total_ms": total / invites * 1000,
+        "busy_ms": stats.get("busy_ms", 0) / invites,
+        "blocked_ms": stats.get("blocked_ms", 0) / invites,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--invites", type=int, default=200)
+    parser.add_argument("--scale", type=int, default=10, help="把 fixture 表格行重复 N 次以模拟更大的页面")
+    parser.add_argument("--browser-ms", type=float, default=100, help="每次邀请模拟的浏览器操作耗时")
+    args = parser.parse_args()
+
+    tmp_dir = Path(tempfile.mkdtemp(prefix="awin_bench_"))
+    # 审计日志写入临时文件，保持与正式 sink 相同的序列化方式
+    logger.remove()
+    rpa_main.AUDIT_LOG_PATH = tmp_dir / "audit.jsonl"
+    rpa_main.PUBLISHER_IDS_DB_PATH = tmp_dir / "publisher_ids.sqlite3"
+    rpa_main.SEEN_IDS_PATH = tmp_dir / "seen_publisher_ids.txt"
+    rpa_main.CLICKED_IDS_PATH = tmp_dir / "clicked_publisher_ids.txt"
+
+    html = FIXTURE_PATH.read_text(encoding="utf-8")
+    body_start, body_end = html.index("<tbody>") + len("<tbody>"), html.index("</tbody>")
+    html = html[:body_start] + html[body_start:body_end] * args.scale + html[body_end:]
+    sync = simulate(False, args.invites, html, args.browser_ms, tmp_dir)
+    bg = simulate(True, args.invites, html, args.browser_ms, tmp_dir)
+
+    table = Table(title=(
+        f"每次邀请的 I/O 耗时 ({args.invites} 次邀请, 页面 {len(html) / 1024:.0f} KiB, "
+        f"浏览器 {args.browser_ms:.0f} ms/邀请)"
+    ))
+    table.add_column("模式")
+    table.add_column("热路径 I/O ms/邀请", justify="right")
+    table.add_column("后台执行 ms/邀请", justify="right")
+    table.add_column("背压阻塞 ms/邀请", justify="right")
+    table.add_column("排空后总 I/O ms/邀请", justify="right")
+    table.add_row("同步写入", f"{sync['hot_ms']:.2f}", "-", "-", f"{sync['total_ms']:.2f}")
+    table.add_row("后台写入", f"{bg['hot_ms']:.2f}", f"{bg['busy_ms']:.2f}", f"{bg['blocked_ms']:.2f}", f"{bg['total_ms']:.2f}")
+    console.print(table)
+    console.print(f"移出热路径: [green]{sync['hot_ms'] - bg['hot_ms']:.2f} ms/邀请[/green]")
+
+
+if __name__ == "__main__":
+    main()
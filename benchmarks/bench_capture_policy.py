@@ -0,0 +1,146 @@
+"""
+HTML 快照采集策略基准
+
+用静态标签页（返回放大后的 fixture 目录页 HTML，记录 DOM 读取次数与字符数，不启动浏览器）模拟邀请流程：
+每次邀请按策略保存 before_click；每 --fail-every 次邀请中有一次在点击阶段失败（保存 click_failed 现场），
+其余保存 after_click。对比各采集模式下每次邀请取回的 DOM、落盘的快照数量与磁盘占用，
+以及失败的邀请中有多少保留了点击前的快照（调试证据）。
+--keep-after-click 时各模式都保存成功后的 after_click（AwinRPA 的默认策略）。
+
+用法: python benchmarks/bench_capture_policy.py [--invites 500] [--scale 10] [--fail-every 50] [--keep-after-click]
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from loguru import logger
+from rich.console import Console
+from rich.table import Table
+
+import main as rpa_main
+from capture_policy import CAPTURE_MODES, CapturePolicy
+from snapshot_store import SnapshotStore
+
+FIXTURE_PATH = Path(__file__).parent / "fixtures" / "directory_page.html"
+
+console = Console()
+
+
+class CountingTab:
+    """返回固定 HTML 的静态标签页，统计 DOM 读取"""
+
+    url = "https://ui.awin.com/awin/merchant/45307/affiliate-directory/index/tab/notInvited"
+
+    def __init__(self, html: str):
+        self.page = html
+        self.reads = 0
+        self.chars = 0
+
+    @property
+    def html(self) -> str:
+        self.reads += 1
+        self.chars += len(self.page)
+        return self.page
+
+
+class StaticBrowser:
+    def __init__(self, html: str):
+        self.latest_tab = CountingTab(html)
+
+
+def simulate(mode: str, args: argparse.Namespace, html: str, tmp_dir: Path) -> dict:
+    policy = CapturePolicy(
+        mode, sample_every=args.sample_every, ring_size=args.ring_size, keep_after_click=args.keep_after_click
+    )
+    rpa = rpa_main.AwinRPA(browser=StaticBrowser(html), capture_policy=policy, live_metrics=False)
+    rpa.snapshot_store = SnapshotStore(tmp_dir / mode, prune_every=0)
+    tab = rpa.tab
+    after_html = html.replace('<div id="content">', '<div id="content"><div class="modal closed">ok</div>')
+    failed_seqs = []
+
+    started = time.perf_counter()
+    for i in range(args.invites):
+        rpa._counters["click"] += 1
+        rpa._click_seq = rpa._counters["click"]
+        pid = f"bench{i}"
+        # 每次邀请的页面内容不同，避免被内容去重跳过写入
+        tab.page = html.replace("</body>", f"<!-- {i} --></body>")
+        rpa._save_snapshot(pid, "before_click")
+        if (i + 1) % args.fail_every == 0:
+            failed_seqs.append(rpa._click_seq)
+            rpa._save_snapshot(pid, "click_failed")
+            continue
+        tab.page = after_html.replace("</body>", f"<!-- {i} --></body>")
+        rpa._save_snapshot(pid, "after_click")
+    rpa._flush_writes()
+    elapsed = time.perf_counter() - started
+    if rpa.writer:
+        rpa.writer.close()
+
+    index = list(rpa.snapshot_store.iter_index())
+    before_seqs = {entry["click_seq"] for entry in index if entry["phase"] == "before_click"}
+    disk_bytes = sum(path.stat().st_size for path in (tmp_dir / mode / "objects").glob("*/*.gz"))
+    return {
+        "dom_reads": tab.reads / args.invites,
+        "dom_mchars": tab.chars / args.invites / 1e6,
+        "snapshots": len(index),
+        "disk_kib": disk_bytes / 1024,
+        "evidence": sum(seq in before_seqs for seq in failed_seqs),
+        "failures": len(failed_seqs),
+        "ms": elapsed / args.invites * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--invites", type=int, default=500)
+    parser.add_argument("--scale", type=int, default=10, help="把 fixture 表格行重复 N 次以模拟更大的页面")
+    parser.add_argument("--fail-every", type=int, default=50, help="每 N 次邀请中有一次失败")
+    parser.add_argument("--sample-every", type=int, default=20)
+    parser.add_argument("--ring-size", type=int, default=5)
+    parser.add_argument("--keep-after-click", action="store_true", help="所有模式都保存成功后的 after_click 快照")
+    args = parser.parse_args()
+
+    tmp_dir = Path(tempfile.mkdtemp(prefix="awin_bench_"))
+    logger.remove()
+    rpa_main.AUDIT_LOG_PATH = tmp_dir / "audit.jsonl"
+    rpa_main.PUBLISHER_IDS_DB_PATH = tmp_dir / "publisher_ids.sqlite3"
+    rpa_main.SEEN_IDS_PATH = tmp_dir / "seen_publisher_ids.txt"
+    rpa_main.CLICKED_IDS_PATH = tmp_dir / "clicked_publisher_ids.txt"
+    rpa_main.PAGE_INDEX_PATH = tmp_dir / "page_index.json"
+    rpa_main.SETTLE_STATS_PATH = tmp_dir / "settle_times.json"
+
+    html = FIXTURE_PATH.read_text(encoding="utf-8")
+    body_start, body_end = html.index("<tbody>") + len("<tbody>"), html.index("</tbody>")
+    html = html[:body_start] + html[body_start:body_end] * args.scale + html[body_end:]
+
+    table = Table(title=(
+        f"快照采集策略 ({args.invites} 次邀请, 每 {args.fail_every} 次失败一次, 页面 {len(html) / 1024:.0f} KiB)"
+    ))
+    table.add_column("模式")
+    table.add_column("DOM 读取/邀请", justify="right")
+    table.add_column("取回 M 字符/邀请", justify="right")
+    table.add_column("落盘快照", justify="right")
+    table.add_column("磁盘 KiB", justify="right")
+    table.add_column("失败有点击前快照", justify="right")
+    table.add_column("ms/邀请", justify="right")
+    for mode in CAPTURE_MODES:
+        result = simulate(mode, args, html, tmp_dir)
+        table.add_row(
+            mode,
+            f"{result['dom_reads']:.2f}",
+            f"{result['dom_mchars']:.3f}",
+            f"{result['snapshots']}",
+            f"{result['disk_kib']:.0f}",
+            f"{result['evidence']}/{result['failures']}",
+            f"{result['ms']:.2f}",
+        )
+    console.print(table)
+
+
+if __name__ == "__main__":
+    main()
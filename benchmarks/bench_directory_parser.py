@@ -0,0 +1,97 @@
+"""
+目录页离线解析微基准
+
+对 html_dumps/ 下已有的 HTML 快照（旧版 .html dump 与快照存储中的完整对象）以及 fixture 目录页，
+分别用 html5lib 基线与 directory_parser 的各个后端解析，输出每页平均耗时及相对 html5lib 的加速比。
+
+用法: python benchmarks/bench_directory_parser.py [--rounds 5] [--limit 50] [路径 ...]
+"""
+import argparse
+import gzip
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bs4 import BeautifulSoup
+from rich.console import Console
+from rich.table import Table
+
+import directory_parser
+from snapshot_store import FULL_SUFFIX
+
+ROOT = Path(__file__).resolve().parent.parent
+FIXTURE_PATH = Path(__file__).parent / "fixtures" / "directory_page.html"
+
+console = Console()
+
+
+def html5lib_ids(html: str) -> list[str] | None:
+    """基线：html5lib 构建整页 DOM 后查找邀请链接"""
+    soup = BeautifulSoup(html, "html5lib")
+    results = soup.find(id="directoryResults")
+    table = results.find("table") if results else None
+    if table is None:
+        return None
+    return [a.get("data-publisherid") or "" for a in table.find_all("a", attrs={"data-publisherid": True})]
+
+
+def load_page(path: Path) -> str:
+    if path.name.endswith(FULL_SUFFIX):
+        return gzip.decompress(path.read_bytes()).decode("utf-8", errors="ignore")
+    return path.read_text(encoding="utf-8", errors="ignore")
+
+
+def time_per_page(func, pages: list[str], rounds: int) -> float:
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for html in pages:
+            func(html)
+        samples.append((time.perf_counter() - started) / len(pages))
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="*", type=Path, help="HTML 文件或目录，默认 html_dumps/ 与 fixture")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--limit", type=int, default=50, help="最多使用的 HTML 文件数")
+    args = parser.parse_args()
+
+    paths: list[Path] = []
+    for p in args.paths or [ROOT / "html_dumps", FIXTURE_PATH]:
+        if p.is_dir():
+            # 旧版未压缩 dump 与快照存储中的完整对象
+            paths.extend(sorted(p.glob("*.html")) + sorted(p.glob(f"objects/*/*{FULL_SUFFIX}")))
+        elif p.exists():
+            paths.append(p)
+    pages = [load_page(p) for p in paths[:args.limit]]
+    if not pages:
+        console.print("[red]没有找到可用的 HTML 文件[/red]")
+        return
+
+    # 正确性：各后端解析出的 ID 必须与 html5lib 基线一致
+    for html in pages:
+        expected = html5lib_ids(html)
+        for backend in directory_parser.BACKENDS:
+            rows = directory_parser.parse_directory_html(html, backend)
+            got = None if rows is None else [row.publisher_id for row in rows]
+            assert got == expected, f"{backend} 解析结果与 html5lib 不一致"
+
+    baseline = time_per_page(html5lib_ids, pages, args.rounds)
+    table = Table(title=f"目录页解析 ({len(pages)} 个文件, 平均 {sum(map(len, pages)) / len(pages) / 1024:.0f} KiB)")
+    table.add_column("后端")
+    table.add_column("ms/页", justify="right")
+    table.add_column("加速比", justify="right")
+    table.add_row("html5lib (基线)", f"{baseline:.2f}", "1.0x")
+    for backend in directory_parser.BACKENDS:
+        ms = time_per_page(lambda html: directory_parser.parse_directory_html(html, backend), pages, args.rounds)
+        table.add_row(backend, f"{ms:.2f}", f"{baseline / ms:.1f}x")
+    console.print(table)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""
+端到端吞吐基准
+
+启动本地模拟目录服务器与无头 Chromium，运行 AwinRPA.run（或 --tabs > 1 时 run_parallel），
+输出每分钟邀请数、各阶段 p50/p95 延迟、Python 与浏览器进程内存，以及服务器端统计（含重复邀请数）。
+--assets 让模拟页面加载图片/字体/统计脚本，配合 --resource-policy off/on 对比资源拦截前后的翻页耗时与浏览器内存。
+--input-mode inject/type 对比邀请信息的两种写入方式（invite.input_message 阶段，即每次邀请写入信息的耗时），
+加 --trusted-input-only 时模拟页面不接受注入的值，可观察改为键盘输入的回退（invite.input_fallback 阶段）。
+--long-run 开启长时间运行模式（memory_guard.py），输出标签页 JS 堆/DOM 节点/监听器与 Python RSS 随邀请数的变化
+及标签页回收次数，例如 --long-run --invites 10000 --publishers 12000 检查内存是否保持平稳；
+不加 --long-run 时加 --memory-check-every N 只采样不回收，作为对照。
+所有状态文件写入临时目录，不影响正式的 ID 历史与审计日志。
+进程内存用 psutil 统计（pip install -e ".[bench]"）；未安装时 Python 内存改读 /proc，浏览器内存不统计。
+
+用法: python benchmarks/bench_e2e.py [--invites 50] [--tabs 1] [--max-per-minute N]
+      [--invite-interval 0] [--page-interval 0] [--page-size 100] [--fail-rate 0.05]
+      [--assets --resource-policy on] [--input-mode type] [--long-run --tab-heap-mb 64] ...
+"""
+import argparse
+import functools
+import json
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from DrissionPage import Chromium, ChromiumOptions
+from loguru import logger
+from rich.console import Console
+from rich.table import Table
+
+import main as rpa_main
+from memory_guard import MemoryLimits, python_rss_mb
+from resource_policy import DEFAULT_DENY, ResourcePolicy
+from mock_awin_server import MockAwinServer, add_config_arguments, config_from_args
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+console = Console()
+
+TIMED_METHODS = ("get_publisher_ids", "click_next_page", "send_invite_to_publisher")
+# 额外输出的 AwinRPA.metrics 阶段（邀请信息写入与随后等待发送按钮启用）
+INPUT_STAGES = ("invite.input_message", "invite.input_fallback", "invite.wait_send_button")
+
+
+def instrument(samples: dict[str, list[float]]):
+    """在类上包装关键方法以记录耗时（并行模式下的标签页工作副本同样生效）"""
+    for name in TIMED_METHODS:
+        original = getattr(rpa_main.AwinRPA, name)
+
+        def wrapper(self, *args, __original=original, __name=name, **kwargs):
+            started = time.perf_counter()
+            try:
+                return __original(self, *args, **kwargs)
+            finally:
+                samples.setdefault(__name, []).append(time.perf_counter() - started)
+
+        setattr(rpa_main.AwinRPA, name, functools.wraps(original)(wrapper))
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def process_rss_mb(pid: int | None, include_children: bool = False) -> float | None:
+    """进程（及子进程）的 RSS；未安装 psutil 时返回 None"""
+    if psutil is None:
+        return None
+    if not pid:
+        return 0.0
+    try:
+        proc = psutil.Process(pid)
+        procs = [proc] + (proc.children(recursive=True) if include_children else [])
+        return sum(p.memory_info().rss for p in procs) / 1024 / 1024
+    except psutil.Error:
+        return 0.0
+
+
+def rounded(value: float | None) -> float | None:
+    return round(value, 1) if value is not None else None
+
+
+def isolate_state(tmp_dir: Path):
+    """把 main 模块的状态文件与审计日志路径指向临时目录"""
+    logger.remove()
+    rpa_main.AUDIT_LOG_PATH = tmp_dir / "awin_audit.jsonl"
+    rpa_main.PUBLISHER_IDS_DB_PATH = tmp_dir / "publisher_ids.sqlite3"
+    rpa_main.SEEN_IDS_PATH = tmp_dir / "seen_publisher_ids.txt"
+    rpa_main.CLICKED_IDS_PATH = tmp_dir / "clicked_publisher_ids.txt"
+    rpa_main.HTML_DUMP_DIR = tmp_dir / "html_dumps"
+    rpa_main.SETTLE_STATS_PATH = tmp_dir / "settle_times.json"
+    rpa_main.PAGE_INDEX_PATH = tmp_dir / "page_index.json"
+    rpa_main.METRICS_JSONL_PATH = tmp_dir / "stage_metrics.jsonl"
+    rpa_main.METRICS_PROM_PATH = tmp_dir / "stage_metrics.prom"
+    rpa_main.CHECKPOINT_PATH = tmp_dir / "run_checkpoint.json"
+    rpa_main.QUOTA_DB_PATH = tmp_dir / "invite_quota.sqlite3"
+    rpa_main.SCORING_RULES_PATH = tmp_dir / "scoring_rules.json"
+    rpa_main.MERCHANT_STATE_ROOT = tmp_dir / "merchants"
+
+
+def memory_limits(args: argparse.Namespace) -> MemoryLimits | None:
+    """--long-run 时按阈值回收；只给出 --memory-check-every 时阈值设为无穷大，只采样不回收"""
+    if args.long_run:
+        return MemoryLimits(
+            check_every=args.memory_check_every or 100, tab_heap_mb=args.tab_heap_mb, tab_nodes=args.tab_nodes,
+            recycle_every=args.recycle_every,
+        )
+    if args.memory_check_every:
+        inf = float("inf")
+        return MemoryLimits(
+            check_every=args.memory_check_every, tab_heap_mb=inf, tab_nodes=inf, tab_listeners=inf, python_rss_mb=inf
+        )
+    return None
+
+
+def memory_table(result: dict, long_run: bool, rows: int = 12) -> Table:
+    """内存采样历史（均匀抽取 rows 行）与首尾变化"""
+    history = result["memory_history"]
+    memory = result["memory"] or {}
+    table = Table(title=(
+        f"内存变化（{'长时间运行模式' if long_run else '只采样不回收'}，"
+        f"采样 {memory.get('checks', 0)} 次，回收标签页 {memory.get('recycles', 0)} 次）"
+    ))
+    columns = ("invites", "tab_heap_mb", "tab_nodes", "tab_listeners", "python_rss_mb")
+    for column in columns:
+        table.add_column(column, justify="right")
+    step = max(1, len(history) // rows)
+    picked = history[::step]
+    if picked[-1] is not history[-1]:
+        picked.append(history[-1])
+    for sample in picked:
+        table.add_row(*("-" if sample[c] is None else str(sample[c]) for c in columns))
+    first, last = history[0], history[-1]
+    table.add_row(*(
+        ["首尾变化"] + [
+            "-" if first[c] is None or last[c] is None else f"{last[c] - first[c]:+.1f}" for c in columns[1:]
+        ]
+    ), style="bold")
+    return table
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--invites", type=int, default=50)
+    parser.add_argument("--tabs", type=int, default=1, help="大于 1 时使用 run_parallel")
+    parser.add_argument("--max-per-minute", type=float, default=None)
+    parser.add_argument("--invite-interval", type=float, default=0.0, help="礼貌性邀请间隔（秒）")
+    parser.add_argument("--page-interval", type=float, default=0.0, help="礼貌性翻页间隔（秒）")
+    parser.add_argument("--extract-mode", default="batch", choices=rpa_main.AwinRPA.EXTRACT_MODES)
+    parser.add_argument("--input-mode", default="inject", choices=rpa_main.AwinRPA.INPUT_MODES, help="邀请信息写入方式")
+    parser.add_argument("--headed", action="store_true", help="显示浏览器窗口")
+    parser.add_argument("--resource-policy", default="off", choices=("off", "on"), help="是否拦截图片/字体/媒体与统计请求")
+    parser.add_argument("--deny", nargs="*", default=["*/analytics/*"], help="额外拦截的 URL 通配符（默认拦截模拟的统计脚本）")
+    parser.add_argument("--long-run", action="store_true", help="超过内存阈值时回收标签页")
+    parser.add_argument("--memory-check-every", type=int, default=None, help="每 N 次邀请采样一次内存（--long-run 时默认 100）")
+    parser.add_argument("--tab-heap-mb", type=float, default=MemoryLimits.tab_heap_mb)
+    parser.add_argument("--tab-nodes", type=int, default=MemoryLimits.tab_nodes)
+    parser.add_argument("--recycle-every", type=int, default=None, help="不论内存多少，每 N 次邀请回收一次标签页")
+    parser.add_argument("--json", type=Path, help="把结果另存为 JSON")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    tmp_dir = Path(tempfile.mkdtemp(prefix="awin_e2e_"))
+    isolate_state(tmp_dir)
+    samples: dict[str, list[float]] = {}
+    instrument(samples)
+    messages = rpa_main.MessageManager().load()
+    msg = messages[0]["content"] if messages else "Benchmark invitation message"
+    policy = ResourcePolicy(deny=DEFAULT_DENY + tuple(args.deny)) if args.resource_policy == "on" else None
+    rpa_main.RESOURCE_POLICY = policy
+
+    with MockAwinServer(config_from_args(args)) as server:
+        co = ChromiumOptions().auto_port().headless(not args.headed)
+        if policy is not None:
+            policy.apply_options(co)
+        browser = Chromium(co)
+        try:
+            rpa = rpa_main.AwinRPA(
+                browser=browser,
+                extract_mode=args.extract_mode,
+                input_mode=args.input_mode,
+                invite_interval=args.invite_interval,
+                page_interval=args.page_interval,
+                live_metrics=False,
+                resource_policy=policy,
+                memory_limits=memory_limits(args),
+            )
+            rpa.PAGE_PARAM = "page"
+            rpa.goto_page(server.directory_url)
+
+            rss_before = python_rss_mb()
+            started = time.perf_counter()
+            if args.tabs > 1:
+                rpa.run_parallel(args.invites, msg, tabs=args.tabs, max_per_minute=args.max_per_minute)
+            else:
+                rpa.run(args.invites, msg)
+            elapsed = time.perf_counter() - started
+
+            result = {
+                "invites": args.invites,
+                "tabs": args.tabs,
+                "elapsed_s": round(elapsed, 2),
+                "invites_per_minute": round(args.invites / elapsed * 60, 1),
+                "stages": {
+                    name: {
+                        "count": len(values),
+                        "p50_ms": round(statistics.median(values) * 1000, 1),
+                        "p95_ms": round(percentile(values, 0.95) * 1000, 1),
+                    }
+                    for name, values in samples.items() if values
+                } | {
+                    name: {"count": s["count"], "p50_ms": s["p50_ms"], "p95_ms": s["p95_ms"]}
+                    for name, s in rpa.waiter.stats.summary().items()
+                } | {
+                    name: {"count": s["count"], "p50_ms": s["p50_ms"], "p95_ms": s["p95_ms"]}
+                    for name, s in rpa.metrics.summary().items() if name in INPUT_STAGES and s["count"]
+                },
+                "input_mode": args.input_mode,
+                "python_rss_mb": rounded(rss_after := python_rss_mb()),
+                "python_rss_growth_mb": rounded(None if rss_after is None or rss_before is None else rss_after - rss_before),
+                "browser_rss_mb": rounded(process_rss_mb(browser.process_id, include_children=True)),
+                "server": server.state.stats(),
+                "resource_policy": args.resource_policy,
+                "resources": policy.stats() if policy is not None else None,
+                "memory": rpa.memory_guard.stats() if rpa.memory_guard is not None else None,
+                "memory_history": [asdict(sample) for sample in rpa.memory_guard.history] if rpa.memory_guard else [],
+            }
+        finally:
+            browser.quit()
+
+    table = Table(title=(
+        f"端到端: {result['invites']} 条邀请, {result['tabs']} 个标签页, 写入方式 {result['input_mode']}, "
+        f"{result['elapsed_s']} s, [bold]{result['invites_per_minute']} 条/分钟[/bold]"
+    ))
+    table.add_column("阶段")
+    table.add_column("次数", justify="right")
+    table.add_column("p50 ms", justify="right")
+    table.add_column("p95 ms", justify="right")
+    for name, stage in result["stages"].items():
+        table.add_row(name, str(stage["count"]), f"{stage['p50_ms']}", f"{stage['p95_ms']}")
+    console.print(table)
+    server_stats = result["server"]
+    mib = {key: "-" if result[key] is None else result[key] for key in ("python_rss_mb", "python_rss_growth_mb", "browser_rss_mb")}
+    console.print(
+        f"内存: Python {mib['python_rss_mb']} MiB (增长 {mib['python_rss_growth_mb']} MiB), "
+        f"浏览器 {mib['browser_rss_mb']} MiB" + ("（未安装 psutil，不统计浏览器内存）" if psutil is None else "")
+    )
+    console.print(
+        f"服务器: 收到 {server_stats['invites_received']} 次邀请, 去重后 {server_stats['unique_invited']}, "
+        f"重复 {server_stats['duplicate_invites']}, 失败 {server_stats['failed_invites']}, "
+        f"空白邀请信息 {server_stats['empty_messages']}, "
+        f"页面访问 {server_stats['page_views']}"
+    )
+    if server_stats["asset_requests"] or result["resources"]:
+        console.print(
+            f"静态资源: 服务器收到 {server_stats['asset_requests']}, "
+            f"浏览器拦截 {(result['resources'] or {}).get('blocked', {})}"
+        )
+    if result["memory_history"]:
+        console.print(memory_table(result, args.long_run))
+    if args.json:
+        args.json.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+publisher ID 存储基准测试
+
+生成 N 个 ID 的旧版文本文件，对比：
+- 旧做法：启动时把整个文本文件读入 set
+- SqliteIdStore：一次性迁移成本，之后每次启动的打开 + 成员判断耗时与内存占用
+
+用法: python benchmarks/bench_id_store.py [--ids 500000] [--lookups 2000]
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from loguru import logger
+from rich.console import Console
+from rich.table import Table
+
+from id_store import SqliteIdStore
+
+console = Console()
+
+
+def measure(func):
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed * 1000, peak / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ids", type=int, default=500_000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    args = parser.parse_args()
+
+    logger.remove()
+    tmp_dir = Path(tempfile.mkdtemp(prefix="awin_bench_"))
+    ids = [str(i) for i in random.sample(range(100_000, 10_000_000), args.ids)]
+    legacy = tmp_dir / "clicked_publisher_ids.txt"
+    legacy.write_text("\n".join(ids) + "\n", encoding="utf-8")
+    probes = random.sample(ids, args.lookups // 2) + [str(i) for i in range(args.lookups // 2)]
+
+    def legacy_startup():
+        loaded = set(line.strip() for line in legacy.read_text(encoding="utf-8").splitlines() if line.strip())
+        return sum(pid in loaded for pid in probes)
+
+    hits_legacy, legacy_ms, legacy_mb = measure(legacy_startup)
+
+    db = tmp_dir / "publisher_ids.sqlite3"
+    _, migrate_ms, _ = measure(lambda: len(SqliteIdStore(db, "clicked", legacy_path=legacy)))
+
+    def sqlite_startup():
+        store = SqliteIdStore(db, "clicked")
+        hits = sum(pid in store for pid in probes)
+        store.close()
+        return hits
+
+    hits_sqlite, sqlite_ms, sqlite_mb = measure(sqlite_startup)
+    assert hits_legacy == hits_sqlite
+
+    def batch_startup():
+        store = SqliteIdStore(db, "clicked")
+        hits = len(probes) - len(store.missing(probes))
+        store.close()
+        return hits
+
+    hits_batch, batch_ms, batch_mb = measure(batch_startup)
+    assert hits_batch == hits_legacy
+
+    table = Table(title=f"{args.ids} 个历史 ID, {args.lookups} 次成员判断")
+    table.add_column("方式")
+    table.add_column("启动 + 查询 ms", justify="right")
+    table.add_column("峰值内存 MiB", justify="right")
+    table.add_row("文本文件读入 set (旧)", f"{legacy_ms:.0f}", f"{legacy_mb:.1f}")
+    table.add_row("SQLite 逐个判断", f"{sqlite_ms:.0f}", f"{sqlite_mb:.1f}")
+    table.add_row("SQLite 批量 missing()", f"{batch_ms:.0f}", f"{batch_mb:.1f}")
+    console.print(table)
+    console.print(f"一次性迁移耗时: {migrate_ms:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+导入耗时基准与启动预算检查
+
+用 python -X importtime 在子进程中测量各使用场景的导入耗时（不含解释器自身启动时已导入的模块），
+并检查各场景没有加载不该加载的重量级依赖：
+- main:      只导入 main（脚本化使用、设置界面之前），不应加载 DrissionPage / questionary / lxml / pandas
+- settings:  设置界面首次显示提示，只加载 questionary，不加载 DrissionPage / pandas
+- rpa:       RPA 运行时构造浏览器选项，加载 DrissionPage，不加载 questionary / pandas
+- analytics: 导入 audit_analytics（report/reset 不需要 pandas）
+超出预算或加载了禁止的模块时以退出码 1 结束，可放在 CI 中作为回归检查。
+
+用法: python benchmarks/bench_import.py [--repeat 5] [--budget-scale 1.0] [--json out.json]
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from rich.console import Console
+from rich.table import Table
+
+ROOT = Path(__file__).resolve().parent.parent
+
+console = Console()
+
+HEAVY = ("DrissionPage", "questionary", "prompt_toolkit", "pyperclip", "bs4", "lxml", "pandas")
+
+# (名称, 代码, 导入耗时预算 ms, 禁止加载的顶层包)
+SCENARIOS = [
+    ("main", "import main", 250, HEAVY),
+    ("settings", "import main, prompts; prompts._questionary()", 450, ("DrissionPage", "bs4", "lxml", "pandas")),
+    ("rpa", "import main; main.browser_options()", 800, ("questionary", "prompt_toolkit", "pyperclip", "pandas")),
+    ("analytics", "import audit_analytics", 250, ("pandas", "DrissionPage", "questionary")),
+]
+
+
+def import_times(code: str) -> tuple[dict[str, int], set[str], float]:
+    """在子进程中执行 code，返回 ({顶层导入: 累计微秒}, 导入的全部顶层包, 子进程墙钟秒数)"""
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    elapsed = time.perf_counter() - started
+    top_level: dict[str, int] = {}
+    packages: set[str] = set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        packages.add(name.strip().split(".")[0])
+        if not name[1:].startswith(" "):
+            top_level[name.strip()] = int(cumulative)
+    return top_level, packages, elapsed
+
+
+def measure(code: str, baseline: set[str], repeat: int) -> dict:
+    best = None
+    for _ in range(repeat):
+        top_level, packages, elapsed = import_times(code)
+        # 解释器启动时（site 等）已导入的模块不计入
+        own = {name: us for name, us in top_level.items() if name not in baseline}
+        total_ms = sum(own.values()) / 1000
+        if best is None or total_ms < best["import_ms"]:
+            slowest = sorted(own.items(), key=lambda item: item[1], reverse=True)[:5]
+            best = {
+                "import_ms": round(total_ms, 1),
+                "process_ms": round(elapsed * 1000, 1),
+                "slowest": {name: round(us / 1000, 1) for name, us in slowest},
+                "packages": packages,
+            }
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="每个场景测量次数，取最快一次")
+    parser.add_argument("--budget-scale", type=float, default=1.0, help="预算倍数（较慢的机器上放宽）")
+    parser.add_argument("--json", type=Path, help="把结果另存为 JSON")
+    args = parser.parse_args()
+
+    baseline, _, _ = import_times("pass")
+    table = Table(title="导入耗时（最快一次）")
+    table.add_column("场景")
+    table.add_column("导入 ms", justify="right")
+    table.add_column("预算 ms", justify="right")
+    table.add_column("进程 ms", justify="right")
+    table.add_column("最慢的导入")
+    table.add_column("违规加载")
+    results = {}
+    failed = False
+    for name, code, budget_ms, forbidden in SCENARIOS:
+        result = measure(code, set(baseline), args.repeat)
+        budget = budget_ms * args.budget_scale
+        violations = sorted(set(forbidden) & result.pop("packages"))
+        over = result["import_ms"] > budget
+        failed = failed or over or bool(violations)
+        results[name] = {**result, "budget_ms": budget, "violations": violations}
+        table.add_row(
+            name,
+            f"[red]{result['import_ms']}[/red]" if over else f"{result['import_ms']}",
+            f"{budget:.0f}",
+            f"{result['process_ms']}",
+            ", ".join(f"{mod} {ms}" for mod, ms in result["slowest"].items()),
+            f"[red]{', '.join(violations)}[/red]" if violations else "",
+        )
+    console.print(table)
+    if args.json:
+        args.json.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+    if failed:
+        console.print("[red]超出启动预算或加载了不该加载的模块[/red]")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+邀请信息模板渲染与加载基准
+
+用合成的目录行渲染 --renders 条个性化邀请信息，对比：
+- 编译后的模板（MessageTemplate.render，一次 str.format）
+- 每次按占位符逐个 str.replace 的朴素实现（基线），并校验两者输出一致
+以及 MessageManager.load 在文件未变化时（只 stat 一次）与每次重新读取、解析 JSON 的耗时。
+
+用法: python benchmarks/bench_message_templates.py [--renders 10000] [--messages 50] [--rounds 5]
+"""
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from rich.console import Console
+from rich.table import Table
+
+from bench_scoring import synthetic_rows
+from main import MessageManager
+from message_templates import FIELDS, compile_template
+
+console = Console()
+
+TEMPLATE = (
+    "Hi {publisher_name|there},\n\n"
+    "We are an Awin advertiser (merchant {merchant_id}) and think your {sector} audience in {region} "
+    "would be a great fit. We support {promotion_type} partners with tailored commission {tiers}.\n\n"
+    "Publisher ref: {publisher_id}\nKind regards"
+)
+MERCHANT_ID = "45307"
+
+
+def naive_render(source: str, row, merchant_id: str) -> str:
+    """基线：每次渲染都对每个占位符做一次 str.replace"""
+    text = source.replace("{publisher_name|there}", row.name or "there")
+    for name, getter in FIELDS.items():
+        text = text.replace("{" + name + "}", getter(row, merchant_id))
+    return text
+
+
+def median_us(func, count: int, rounds: int) -> float:
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) / count * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--renders", type=int, default=10000)
+    parser.add_argument("--messages", type=int, default=50, help="邀请信息文件中的信息条数")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = [row for _, row in synthetic_rows(args.renders)]
+    template = compile_template(TEMPLATE)
+    # 不受支持的 {tiers} 原样输出
+    mismatches = sum(
+        template.render(row, MERCHANT_ID) != naive_render(TEMPLATE, row, MERCHANT_ID) for row in rows
+    )
+
+    def compiled():
+        for row in rows:
+            template.render(row, MERCHANT_ID)
+
+    def naive():
+        for row in rows:
+            naive_render(TEMPLATE, row, MERCHANT_ID)
+
+    def compile_each():
+        for row in rows:
+            type(template)(TEMPLATE).render(row, MERCHANT_ID)
+
+    render_results = {
+        "编译后的模板": median_us(compiled, len(rows), args.rounds),
+        "每次重新编译（无缓存）": median_us(compile_each, len(rows), args.rounds),
+        "逐个 str.replace（基线）": median_us(naive, len(rows), args.rounds),
+    }
+
+    path = Path(tempfile.mkdtemp(prefix="awin_bench_")) / "invitation_messages.json"
+    path.write_text(json.dumps(
+        [{"name": f"message {i}", "content": TEMPLATE * 3} for i in range(args.messages)], ensure_ascii=False, indent=2
+    ), encoding="utf-8")
+    loads = 1000
+    cached = MessageManager(path)
+
+    def load_cached():
+        for _ in range(loads):
+            cached.load()
+
+    def load_cold():
+        for _ in range(loads):
+            MessageManager(path).load()
+
+    load_results = {
+        "MessageManager.load（文件未变化）": median_us(load_cached, loads, args.rounds),
+        "MessageManager.load（每次解析）": median_us(load_cold, loads, args.rounds),
+    }
+
+    table = Table(title=f"邀请信息模板（{args.renders} 次渲染，{args.messages} 条信息，{args.rounds} 次取中位数）")
+    table.add_column("操作")
+    table.add_column("µs/次", justify="right")
+    for name, us in {**render_results, **load_results}.items():
+        table.add_row(name, f"{us:.2f}")
+    console.print(table)
+    speedup = render_results["逐个 str.replace（基线）"] / max(render_results["编译后的模板"], 1e-9)
+    console.print(f"编译后渲染相对逐个替换: {speedup:.1f}x，输出不一致: {mismatches}")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+get_publisher_ids 批量抽取基准测试
+
+在无头 Chromium 中打开保存的目录页 fixture，分别以逐元素读取、批量 run_js 与 HTML 快照离线解析
+三种方式获取 publisher ID，统计 CDP 往返次数与耗时。
+
+用法: python benchmarks/bench_publisher_ids.py [--rounds 20] [--html benchmarks/fixtures/directory_page.html]
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from DrissionPage import Chromium, ChromiumOptions
+from loguru import logger
+from rich.console import Console
+from rich.table import Table
+
+import main as rpa_main
+
+FIXTURE_PATH = Path(__file__).parent / "fixtures" / "directory_page.html"
+
+console = Console()
+
+
+class CdpCounter:
+    """包装 tab.driver.run，统计 CDP 调用次数"""
+
+    def __init__(self, tab):
+        self.count = 0
+        driver = tab.driver
+        original_run = driver.run
+
+        def counting_run(*args, **kwargs):
+            self.count += 1
+            return original_run(*args, **kwargs)
+
+        driver.run = counting_run
+
+
+def bench(rpa: rpa_main.AwinRPA, counter: CdpCounter, mode: str, rounds: int) -> dict:
+    rpa.extract_mode = mode
+    # 预热一次，排除首次 DOM 初始化的影响
+    expected = rpa.get_publisher_ids()
+
+    counter.count = 0
+    started = time.perf_counter()
+    for _ in range(rounds):
+        ids = rpa.get_publisher_ids()
+        assert ids == expected
+    elapsed = time.perf_counter() - started
+    return {
+        "ids": expected,
+        "round_trips": counter.count / rounds,
+        "ms": elapsed / rounds * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--html", type=Path, default=FIXTURE_PATH)
+    args = parser.parse_args()
+
+    # 基准测试不写入正式的审计日志与 ID 历史
+    logger.remove()
+    tmp_dir = Path(tempfile.mkdtemp(prefix="awin_bench_"))
+    rpa_main.AUDIT_LOG_PATH = tmp_dir / "awin_audit.jsonl"
+    rpa_main.PUBLISHER_IDS_DB_PATH = tmp_dir / "publisher_ids.sqlite3"
+    rpa_main.SEEN_IDS_PATH = tmp_dir / "seen_publisher_ids.txt"
+    rpa_main.CLICKED_IDS_PATH = tmp_dir / "clicked_publisher_ids.txt"
+
+    co = ChromiumOptions().headless().auto_port()
+    browser = Chromium(co)
+    try:
+        rpa = rpa_main.AwinRPA(browser=browser)
+        rpa.tab.get(args.html.resolve().as_uri())
+        counter = CdpCounter(rpa.tab)
+
+        before = bench(rpa, counter, mode="per_element", rounds=args.rounds)
+        after = bench(rpa, counter, mode="batch", rounds=args.rounds)
+        snapshot = bench(rpa, counter, mode="html", rounds=args.rounds)
+        assert before["ids"] == after["ids"] == snapshot["ids"], "各抽取方式结果不一致"
+
+        table = Table(title=f"get_publisher_ids ({len(after['ids'])} 个 publisher, {args.rounds} 轮)")
+        table.add_column("模式")
+        table.add_column("CDP 往返/次", justify="right")
+        table.add_column("耗时 ms/次", justify="right")
+        table.add_row("逐元素 (before)", f"{before['round_trips']:.0f}", f"{before['ms']:.1f}")
+        table.add_row("批量 run_js (after)", f"{after['round_trips']:.0f}", f"{after['ms']:.1f}")
+        table.add_row("HTML 快照 + 离线解析", f"{snapshot['round_trips']:.0f}", f"{snapshot['ms']:.1f}")
+        console.print(table)
+        console.print(f"批量行元数据示例: {rpa.last_publisher_rows[:1]}")
+    finally:
+        browser.quit()
+
+
+if __name__ == "__main__":
+    main()
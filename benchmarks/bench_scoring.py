@@ -0,0 +1,112 @@
+"""
+publisher 评分微基准
+
+生成 --rows 行合成的目录行（取值分布与目录表格相近：少量行业/推广类型/地区取值，名称各不相同），
+分别测量构造 DataFrame、向量化评分、排序（rank_rows 全流程）的耗时，
+并与逐行 Python 循环评分的基线对比，同时校验两者分数一致。
+
+用法: python benchmarks/bench_scoring.py [--rows 50000] [--rounds 5] [--rules scoring_rules.example.json]
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from rich.console import Console
+from rich.table import Table
+
+from directory_parser import PublisherRow
+from publisher_scoring import ScoringRules, rank_rows, rows_frame, score_frame
+
+ROOT = Path(__file__).resolve().parent.parent
+
+console = Console()
+
+SECTORS = ["Fashion", "Gifts & Flowers", "Home & Garden", "Travel", "Finance", "Health & Beauty", "Electronics",
+           "Sports & Outdoors", "Food & Drink", "Toys"]
+PROMOTION_TYPES = ["Content", "Cashback", "Voucher Code", "Comparison", "Social Media", "Email", "Sub Networks"]
+REGIONS = ["United Kingdom", "Germany", "France", "United States", "Netherlands", "Spain", "Italy"]
+WORDS = ["gift", "deal", "blog", "style", "home", "travel", "money", "save", "media", "hub", "box", "daily"]
+
+
+def synthetic_rows(count: int, pages_of: int = 20) -> list[tuple[int, PublisherRow]]:
+    rng = random.Random(0)
+    rows = []
+    for i in range(count):
+        name = f"{rng.choice(WORDS)}{rng.choice(WORDS)} {i}"
+        sector, promotion, region = rng.choice(SECTORS), rng.choice(PROMOTION_TYPES), rng.choice(REGIONS)
+        rows.append((i // pages_of + 1, PublisherRow(
+            publisher_id=str(100000 + i), name=name, sector=sector, promotion_type=promotion, region=region,
+            cells=[name, sector, promotion, region, "Invite"],
+        )))
+    return rows
+
+
+def python_scores(rows: list[tuple[int, PublisherRow]], rules: ScoringRules) -> list[float]:
+    """基线：逐行匹配全部规则"""
+    scores = []
+    for _, row in rows:
+        score = 0.0
+        for column in ("sector", "promotion_type", "region"):
+            value = getattr(row, column).lower()
+            score += sum(w for key, w in getattr(rules, column).items() if key in value)
+        text = " ".join((row.name, row.sector, row.promotion_type, row.region)).lower()
+        score += sum(w for key, w in rules.keywords.items() if key in text)
+        scores.append(score)
+    return scores
+
+
+def median_ms(func, rounds: int) -> float:
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--rules", type=Path, default=ROOT / "scoring_rules.example.json")
+    args = parser.parse_args()
+
+    rules = ScoringRules.load(args.rules)
+    if rules is None:
+        console.print(f"[red]找不到评分规则文件: {args.rules}[/red]")
+        sys.exit(1)
+    rows = synthetic_rows(args.rows)
+    frame = rows_frame(rows)
+    # 预热（pandas 导入与首次调用）
+    rank_rows(rows[:100], rules)
+
+    vectorized = score_frame(frame, rules).to_numpy()
+    baseline = python_scores(rows, rules)
+    mismatches = sum(abs(a - b) > 1e-9 for a, b in zip(vectorized, baseline))
+
+    results = {
+        "构造 DataFrame": median_ms(lambda: rows_frame(rows), args.rounds),
+        "向量化评分": median_ms(lambda: score_frame(frame, rules), args.rounds),
+        "rank_rows 全流程": median_ms(lambda: rank_rows(rows, rules), args.rounds),
+        "逐行 Python 评分（基线）": median_ms(lambda: python_scores(rows, rules), args.rounds),
+    }
+    table = Table(title=f"publisher 评分（{args.rows} 行，{args.rounds} 次取中位数）")
+    table.add_column("阶段")
+    table.add_column("耗时 ms", justify="right")
+    table.add_column("每千行 ms", justify="right")
+    for name, ms in results.items():
+        table.add_row(name, f"{ms:.1f}", f"{ms / args.rows * 1000:.3f}")
+    console.print(table)
+    speedup = results["逐行 Python 评分（基线）"] / max(results["向量化评分"], 1e-6)
+    console.print(f"向量化评分相对逐行基线: {speedup:.1f}x，分数不一致的行: {mismatches}")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
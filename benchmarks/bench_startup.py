@@ -0,0 +1,133 @@
+"""
+启动到首次邀请耗时基准
+
+在本地模拟目录服务器上对比三种启动方式从程序开始到首次邀请成功的耗时（--prompt-seconds 模拟填写交互式提示的时间）：
+- cold:   原流程，先同步启动浏览器，填写提示后再打开目录页
+- lazy:   构造时不启动浏览器，start_browser 在后台启动浏览器并预热目录页，与填写提示重叠
+- attach: 接管已在运行、已打开目录页的浏览器（调试地址），直接复用该标签页
+每种方式使用独立的临时状态目录，避免已点击记录互相影响。
+
+用法: python benchmarks/bench_startup.py [--prompt-seconds 3] [--repeat 3] [--headed]
+"""
+import argparse
+import functools
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from DrissionPage import Chromium, ChromiumOptions
+from rich.console import Console
+from rich.table import Table
+
+import main as rpa_main
+from bench_e2e import isolate_state
+from mock_awin_server import MockAwinServer, add_config_arguments, config_from_args
+
+console = Console()
+
+MODES = ("cold", "lazy", "attach")
+
+
+def track_first_invite(marks: dict[str, float]):
+    """在类上包装 send_invite_to_publisher，记录首次发送成功的时刻"""
+    original = rpa_main.AwinRPA.send_invite_to_publisher
+
+    @functools.wraps(original)
+    def wrapper(self, *args, **kwargs):
+        success = original(self, *args, **kwargs)
+        if success:
+            marks.setdefault("first_invite", time.perf_counter())
+        return success
+
+    rpa_main.AwinRPA.send_invite_to_publisher = wrapper
+
+
+def run_once(mode: str, url: str, args: argparse.Namespace, marks: dict[str, float], running: Chromium | None) -> dict:
+    isolate_state(Path(tempfile.mkdtemp(prefix=f"awin_startup_{mode}_")))
+    marks.clear()
+    options = dict(invite_interval=0, page_interval=0, live_metrics=False)
+    started = time.perf_counter()
+    if mode == "cold":
+        rpa = rpa_main.AwinRPA(browser=Chromium(ChromiumOptions().auto_port().headless(not args.headed)), **options)
+        time.sleep(args.prompt_seconds)
+        rpa.goto_page(url)
+    else:
+        if mode == "attach":
+            co = ChromiumOptions().set_address(running.address)
+        else:
+            co = ChromiumOptions().auto_port().headless(not args.headed)
+        rpa = rpa_main.AwinRPA(browser_options=co, lazy_browser=True, **options)
+        rpa.start_browser(url)
+        time.sleep(args.prompt_seconds)
+    rpa.PAGE_PARAM = "page"
+    try:
+        rpa.run(1, "Benchmark invitation message")
+    finally:
+        if mode != "attach":
+            rpa.browser.quit()
+    return {
+        "first_invite_s": round(marks["first_invite"] - started, 3),
+        "browser_wait_s": rpa.startup.get("browser_wait_s", 0.0),
+        "tab_reused": bool(rpa.startup.get("tab_reused")),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--prompt-seconds", type=float, default=3.0, help="模拟填写交互式提示的时间")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=MODES)
+    parser.add_argument("--headed", action="store_true", help="显示浏览器窗口")
+    parser.add_argument("--json", type=Path, help="把结果另存为 JSON")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    marks: dict[str, float] = {}
+    track_first_invite(marks)
+    results: dict[str, list[dict]] = {mode: [] for mode in args.modes}
+    with MockAwinServer(config_from_args(args)) as server:
+        running = None
+        if "attach" in args.modes:
+            # 模拟已在运行、已打开目录页的浏览器
+            running = Chromium(ChromiumOptions().auto_port().headless(not args.headed))
+            running.latest_tab.get(server.directory_url)
+        try:
+            for _ in range(args.repeat):
+                for mode in args.modes:
+                    results[mode].append(run_once(mode, server.directory_url, args, marks, running))
+        finally:
+            if running is not None:
+                running.quit()
+
+    table = Table(title=f"启动到首次邀请（模拟提示 {args.prompt_seconds} s，重复 {args.repeat} 次）")
+    table.add_column("方式")
+    table.add_column("首次邀请 p50 s", justify="right")
+    table.add_column("最慢 s", justify="right")
+    table.add_column("提示后等待浏览器 s", justify="right")
+    table.add_column("复用标签页", justify="right")
+    summary = {}
+    for mode, runs in results.items():
+        times = [r["first_invite_s"] for r in runs]
+        summary[mode] = {
+            "first_invite_p50_s": round(statistics.median(times), 3),
+            "first_invite_max_s": max(times),
+            "browser_wait_p50_s": round(statistics.median(r["browser_wait_s"] for r in runs), 3),
+            "tab_reused": all(r["tab_reused"] for r in runs),
+            "runs": runs,
+        }
+        table.add_row(
+            mode, f"{summary[mode]['first_invite_p50_s']:.2f}", f"{summary[mode]['first_invite_max_s']:.2f}",
+            f"{summary[mode]['browser_wait_p50_s']:.2f}", "是" if summary[mode]["tab_reused"] else "",
+        )
+    console.print(table)
+    if args.json:
+        args.json.write_text(json.dumps(summary, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,384 @@
+"""
+本地 Awin 联盟目录模拟服务器
+
+提供与 AwinRPA 依赖的结构一致的 affiliate-directory 页面：
+#directoryResults 表格、a[data-publisherid] 邀请链接、#nextPage、#customMessage 弹窗、
+button.btn-small-green.modal_save 发送按钮与 #popup_ok 确认弹窗。
+支持配置 publisher 数量、每页条数、各环节延迟与失败注入，并统计收到的邀请（含重复邀请与空白邀请信息）。
+弹窗的发送按钮在 #customMessage 收到非空的 input 事件后才启用；--trusted-input-only 时只认真实的键盘输入。
+--assets 时页面与弹窗还会加载 AwinRPA 用不到的 logo 图片、网页字体、统计脚本（/analytics/）与跟踪像素，
+用于对比资源拦截的效果，服务器按类型统计这些请求。
+
+用法: python benchmarks/mock_awin_server.py [--port 8765] [--publishers 1000] [--page-size 100]
+      浏览器打开 http://127.0.0.1:8765/awin/merchant/45307/affiliate-directory/index/tab/notInvited
+"""
+import argparse
+import base64
+import html
+import json
+import random
+import threading
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+DIRECTORY_PATH = "/awin/merchant/{merchant_id}/affiliate-directory/index/tab/notInvited"
+
+SECTORS = ["Gifts & Flowers", "Fashion", "Home & Garden", "Technology", "Health & Beauty", "Travel", "Food & Drink"]
+PROMOTION_TYPES = ["Content", "Cashback", "Voucher Code", "Social Media", "Comparison Engine", "Email"]
+REGIONS = ["US", "GB", "DE", "FR", "AU", "CA", "NL", "IT"]
+
+# 1x1 透明 PNG / GIF，作为 logo 与跟踪像素的响应
+PNG_1X1 = base64.b64decode("iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNkYAAAAAYAAjCB0C8AAAAASUVORK5CYII=")
+GIF_1X1 = base64.b64decode("R0lGODlhAQABAIAAAAAAAP///yH5BAEAAAAALAAAAAABAAEAAAIBRAA7")
+ASSET_TYPES = {
+    ".png": ("image", "image/png"),
+    ".gif": ("pixel", "image/gif"),
+    ".woff2": ("font", "font/woff2"),
+    ".js": ("script", "application/javascript"),
+}
+
+
+@dataclass
+class MockConfig:
+    merchant_id: int = 45307
+    publishers: int = 1000
+    page_size: int = 100
+    # 目录页响应延迟
+    page_latency_ms: float = 150
+    # 点击邀请链接到弹窗出现的延迟
+    modal_latency_ms: float = 100
+    # 发送邀请接口的延迟
+    send_latency_ms: float = 200
+    # 发送失败（不出现 #popup_ok）的概率
+    fail_rate: float = 0.0
+    # 点击邀请链接后弹窗不出现的概率
+    modal_fail_rate: float = 0.0
+    # True 时已邀请的 publisher 从列表中消失（排序随之变化），False 时保留并显示 Invited
+    hide_invited: bool = False
+    # 页面与弹窗是否加载图片、字体、统计脚本与跟踪像素
+    assets: bool = False
+    # True 时弹窗只接受真实的键盘输入（isTrusted 的 input 事件），脚本注入的值不会启用发送按钮
+    trusted_input_only: bool = False
+    # 上述资源各自的响应延迟
+    asset_latency_ms: float = 40
+    seed: int = 45307
+
+
+class MockState:
+    """服务器端状态：publisher 列表与收到的邀请"""
+
+    def __init__(self, config: MockConfig):
+        self.config = config
+        rng = random.Random(config.seed)
+        ids = rng.sample(range(100_000, 2_000_000), config.publishers)
+        self.publishers = [
+            {
+                "id": str(pid),
+                "name": f"{rng.choice(['Smart', 'Happy', 'Urban', 'Green', 'Bright', 'Golden'])} Publisher {i + 1}",
+                "promotion_type": rng.choice(PROMOTION_TYPES),
+                "sector": rng.choice(SECTORS),
+                "region": rng.choice(REGIONS),
+            }
+            for i, pid in enumerate(ids)
+        ]
+        self.lock = threading.Lock()
+        self.invited: dict[str, float] = {}
+        self.invites_received = 0
+        self.duplicate_invites = 0
+        self.failed_invites = 0
+        self.empty_messages = 0
+        self.page_views = 0
+        self.asset_requests: Counter = Counter()
+        self.started = time.time()
+
+    def listing(self) -> list[dict]:
+        if not self.config.hide_invited:
+            return self.publishers
+        with self.lock:
+            return [p for p in self.publishers if p["id"] not in self.invited]
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "invites_received": self.invites_received,
+                "unique_invited": len(self.invited),
+                "duplicate_invites": self.duplicate_invites,
+                "failed_invites": self.failed_invites,
+                "empty_messages": self.empty_messages,
+                "page_views": self.page_views,
+                "asset_requests": dict(self.asset_requests),
+                "uptime_s": round(time.time() - self.started, 1),
+                "config": asdict(self.config),
+            }
+
+
+# 弹窗与确认框在需要时才插入 DOM、关闭时移除，与 AwinRPA 等待元素出现/消失的逻辑对应
+PAGE_SCRIPT = """
+(function () {
+  const cfg = %(cfg)s;
+  let current = null;
+  function closeModal() {
+    const modal = document.getElementById('inviteModal');
+    if (modal) modal.remove();
+  }
+  document.addEventListener('click', function (ev) {
+    const link = ev.target.closest('a[data-publisherid]');
+    if (link) {
+      ev.preventDefault();
+      if (link.classList.contains('disabled')) return;
+      current = link;
+      closeModal();
+      if (Math.random() < cfg.modal_fail_rate) return;
+      setTimeout(function () {
+        const modal = document.createElement('div');
+        modal.id = 'inviteModal';
+        modal.className = 'modal';
+        modal.innerHTML = (cfg.assets ? '<img class="banner" src="/static/modal-banner.png?' + Date.now() + '">' : '') +
+          '<textarea id="customMessage" rows="8" cols="60"></textarea>' +
+          '<button type="button" class="btn-small-green modal_save" disabled>Send invite</button>';
+        document.body.appendChild(modal);
+        modal.querySelector('#customMessage').addEventListener('input', function (inputEv) {
+          if (cfg.trusted_input_only && !inputEv.isTrusted) return;
+          modal.querySelector('.modal_save').disabled = !this.value.trim();
+        });
+      }, cfg.modal_latency_ms);
+      return;
+    }
+    if (ev.target.closest('#inviteModal .modal_save')) {
+      const pid = current && current.getAttribute('data-publisherid');
+      const message = document.getElementById('customMessage').value;
+      closeModal();
+      fetch('/api/invite', {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({publisher_id: pid, message: message}),
+      }).then(r => r.json()).then(function (result) {
+        if (!result.ok) return;
+        current.classList.add('disabled');
+        current.setAttribute('aria-disabled', 'true');
+        current.textContent = 'Invited';
+        const popup = document.createElement('div');
+        popup.id = 'popup';
+        popup.className = 'modal';
+        popup.innerHTML = '<p>Invitation sent</p><button type="button" id="popup_ok">OK</button>';
+        document.body.appendChild(popup);
+      });
+      return;
+    }
+    if (ev.target.closest('#popup_ok')) {
+      document.getElementById('popup').remove();
+    }
+  });
+})();
+"""
+
+
+def render_directory(state: MockState, page: int) -> str:
+    config = state.config
+    listing = state.listing()
+    pages = max(1, -(-len(listing) // config.page_size))
+    page = min(max(page, 1), pages)
+    rows = []
+    logo = '<img src="/static/logo/%(pid)s.png" width="40" height="40" alt="">' if config.assets else ""
+    with state.lock:
+        invited = set(state.invited)
+    for p in listing[(page - 1) * config.page_size: page * config.page_size]:
+        pid = html.escape(p["id"])
+        if p["id"] in invited:
+            action = (f'<a href="#" class="btn-small-grey inviteLink disabled" aria-disabled="true" '
+                      f'data-publisherid="{pid}">Invited</a>')
+        else:
+            action = f'<a href="#" class="btn-small-green inviteLink" data-publisherid="{pid}">Invite</a>'
+        rows.append(
+            f'<tr class="publisherRow"><td class="logo">{logo % {"pid": pid}}</td>'
+            f'<td class="publisherName"><a href="/awin/merchant/{config.merchant_id}/profile/publisher/{pid}">'
+            f'{html.escape(p["name"])}</a> <span class="publisherIdLabel">ID: {pid}</span></td>'
+            f'<td class="promotionType">{html.escape(p["promotion_type"])}</td>'
+            f'<td class="sector">{html.escape(p["sector"])}</td>'
+            f'<td class="region">{html.escape(p["region"])}</td>'
+            f'<td class="action">{action}</td></tr>'
+        )
+    next_link = f'<a id="nextPage" href="?page={page + 1}">Next</a>' if page < pages else ""
+    script = PAGE_SCRIPT % {"cfg": json.dumps({
+        "modal_latency_ms": config.modal_latency_ms,
+        "modal_fail_rate": config.modal_fail_rate,
+        "assets": config.assets,
+        "trusted_input_only": config.trusted_input_only,
+    })}
+    head_assets = body_assets = ""
+    if config.assets:
+        head_assets = (
+            '<style>@font-face { font-family: "AwinSans"; src: url("/static/awin-sans.woff2") format("woff2"); }'
+            ' body { font-family: "AwinSans", sans-serif; }</style>\n'
+            '<script src="/analytics/collect.js"></script>'
+        )
+        body_assets = f'<img src="/analytics/pixel.gif?page={page}" width="1" height="1" alt="">'
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head><meta charset="utf-8"><title>Affiliate Directory - Awin (mock)</title>
+<style>
+  .modal {{ position: fixed; top: 20%; left: 30%; background: #fff; border: 1px solid #999; padding: 16px; }}
+</style>
+{head_assets}
+</head>
+<body>
+  <div id="content">
+    <h1>Affiliate Directory</h1>
+    <div id="directoryResults">
+      <table class="table directoryTable">
+        <thead><tr><th></th><th>Publisher</th><th>Promotion Type</th><th>Sector</th><th>Region</th><th></th></tr></thead>
+        <tbody>
+{chr(10).join(rows)}
+        </tbody>
+      </table>
+    </div>
+    <div class="pagination"><span class="currentPage">{page}</span> / {pages} {next_link}</div>
+  </div>
+  <script>{script}</script>
+  {body_assets}
+</body>
+</html>
+"""
+
+
+def make_handler(state: MockState):
+    config = state.config
+    directory_path = DIRECTORY_PATH.format(merchant_id=config.merchant_id)
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status: int, body: str | bytes, content_type: str):
+            data = body if isinstance(body, bytes) else body.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.send_header("Cache-Control", "no-store")
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            parts = urlsplit(self.path)
+            if parts.path.rstrip("/") == directory_path:
+                time.sleep(config.page_latency_ms / 1000)
+                with state.lock:
+                    state.page_views += 1
+                page = parse_qs(parts.query).get("page", ["1"])[0]
+                self._send(200, render_directory(state, int(page) if page.isdigit() else 1), "text/html; charset=utf-8")
+            elif parts.path.startswith(("/static/", "/analytics/")):
+                self._send_asset(parts.path)
+            elif parts.path == "/api/stats":
+                self._send(200, json.dumps(state.stats()), "application/json")
+            else:
+                self._send(404, "not found", "text/plain")
+
+        def _send_asset(self, path: str):
+            kind, content_type = next(
+                (value for suffix, value in ASSET_TYPES.items() if path.endswith(suffix)), ("other", "text/plain")
+            )
+            if path.startswith("/analytics/"):
+                kind = "tracker_" + kind
+            time.sleep(config.asset_latency_ms / 1000)
+            with state.lock:
+                state.asset_requests[kind] += 1
+            body = {"image/png": PNG_1X1, "image/gif": GIF_1X1}.get(content_type, b"")
+            if content_type == "font/woff2":
+                # 字体内容无效，浏览器会放弃使用，但请求与等待仍会发生
+                body = b"wOF2" + bytes(1020)
+            self._send(200, body, content_type)
+
+        def do_POST(self):
+            if urlsplit(self.path).path != "/api/invite":
+                self._send(404, "not found", "text/plain")
+                return
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                payload = json.loads(self.rfile.read(length) or b"{}")
+            except json.JSONDecodeError:
+                payload = {}
+            time.sleep(config.send_latency_ms / 1000)
+            pid = str(payload.get("publisher_id") or "")
+            ok = bool(pid) and random.random() >= config.fail_rate
+            with state.lock:
+                state.invites_received += 1
+                if not str(payload.get("message") or "").strip():
+                    state.empty_messages += 1
+                if not ok:
+                    state.failed_invites += 1
+                elif pid in state.invited:
+                    state.duplicate_invites += 1
+                else:
+                    state.invited[pid] = time.time()
+            self._send(200, json.dumps({"ok": ok}), "application/json")
+
+    return Handler
+
+
+class MockAwinServer:
+    """在后台线程中运行的模拟服务器"""
+
+    def __init__(self, config: MockConfig | None = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or MockConfig()
+        self.state = MockState(self.config)
+        self.httpd = ThreadingHTTPServer((host, port), make_handler(self.state))
+        self.httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="mock-awin", daemon=True)
+
+    @property
+    def directory_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}" + DIRECTORY_PATH.format(merchant_id=self.config.merchant_id)
+
+    def start(self) -> "MockAwinServer":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def add_config_arguments(parser: argparse.ArgumentParser):
+    """把 MockConfig 的字段注册为命令行参数（--page-size 等）"""
+    for name, default in asdict(MockConfig()).items():
+        flag = "--" + name.replace("_", "-")
+        if isinstance(default, bool):
+            parser.add_argument(flag, action="store_true", default=default)
+        else:
+            parser.add_argument(flag, type=type(default), default=default)
+
+
+def config_from_args(args: argparse.Namespace) -> MockConfig:
+    return MockConfig(**{name: getattr(args, name) for name in asdict(MockConfig())})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    server = MockAwinServer(config_from_args(args), host=args.host, port=args.port)
+    print(f"模拟目录页: {server.directory_url}")
+    print(f"统计信息: http://{args.host}:{args.port}/api/stats")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+HTML 快照采集策略
+
+每次采集都要通过 CDP 取回整个 DOM（完整目录页可达数 MB），成功路径上的 before_click / after_click
+快照绝大多数用不到。采集策略决定每个阶段是否取 DOM、是否落盘：
+- always:  每次邀请都采集并保存 before_click 与 after_click（原行为）
+- sample:  每 sample_every 次邀请采集并保存一次 before_click 与 after_click
+- failure: 不采集 before_click / after_click，只保存失败现场
+- ring:    采集 before_click 但只保存在内存中最近 ring_size 个的环形缓冲里，不采集 after_click；
+           某次邀请的后续阶段失败时，把缓冲中的快照连同失败现场一起落盘
+所有模式下失败阶段（button_not_found、click_failed 等）的快照都会保存。
+keep_after_click 为 True 时，不论哪种模式都采集并保存 after_click，invite_sent_success 审计记录的 html_path
+始终指向成功后的快照（与 always 模式之前的审计输出一致）；AwinRPA 的默认策略（main.CAPTURE_POLICY）开启此项。
+"""
+import threading
+from collections import Counter, deque
+from dataclasses import dataclass
+
+CAPTURE_MODES = ("always", "sample", "failure", "ring")
+
+# 成功路径上的例行快照阶段，其余阶段均视为失败现场
+ROUTINE_PHASES = frozenset({"before_click", "after_click"})
+
+
+@dataclass
+class CapturePolicy:
+    mode: str = "ring"
+    sample_every: int = 20
+    ring_size: int = 5
+    keep_after_click: bool = False
+
+    def __post_init__(self):
+        if self.mode not in CAPTURE_MODES:
+            raise ValueError(f"未知的快照采集模式: {self.mode}（可选: {', '.join(CAPTURE_MODES)}）")
+        if self.sample_every < 1 or self.ring_size < 1:
+            raise ValueError("sample_every 与 ring_size 必须为正整数")
+
+
+class SnapshotCapture:
+    """按 CapturePolicy 决定各阶段的采集，保存 ring 模式的环形缓冲与采集统计（线程安全）"""
+
+    def __init__(self, policy: CapturePolicy):
+        self.policy = policy
+        self._ring: deque[tuple[int, str, str]] = deque(maxlen=policy.ring_size)
+        self._lock = threading.Lock()
+        self._stats: Counter = Counter()
+
+    def wants(self, phase: str, click_seq: int) -> bool:
+        """该阶段是否需要取 DOM"""
+        if phase not in ROUTINE_PHASES:
+            return True
+        if phase == "after_click" and self.policy.keep_after_click:
+            return True
+        mode = self.policy.mode
+        if mode == "always":
+            return True
+        if mode == "sample":
+            return (click_seq - 1) % self.policy.sample_every == 0
+        if mode == "ring":
+            return phase == "before_click"
+        return False
+
+    def holds(self, phase: str) -> bool:
+        """该阶段的快照是否只暂存在内存中"""
+        return self.policy.mode == "ring" and phase == "before_click"
+
+    def hold(self, click_seq: int, publisher_id: str, html: str):
+        with self._lock:
+            if len(self._ring) == self._ring.maxlen:
+                self._stats["dropped"] += 1
+            self._ring.append((click_seq, publisher_id, html))
+            self._stats["held"] += 1
+
+    def release(self) -> list[tuple[int, str, str]]:
+        """取出并清空环形缓冲中暂存的快照 [(click_seq, publisher_id, html)]"""
+        with self._lock:
+            held = list(self._ring)
+            self._ring.clear()
+            self._stats["released"] += len(held)
+            return held
+
+    def record(self, html: str, persisted: bool):
+        """记录一次 DOM 采集（字节数按字符计）与是否直接落盘"""
+        with self._lock:
+            self._stats["captured"] += 1
+            self._stats["captured_chars"] += len(html)
+            if persisted:
+                self._stats["persisted"] += 1
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"mode": self.policy.mode, **self._stats}
@@ -0,0 +1,70 @@
+"""
+运行检查点
+
+AwinRPA.run 在每次邀请成功与每次翻页后保存当前进度（目标数量、已发送数量、目录页 URL 与页码、
+筛选条件、邀请信息名称与内容摘要），写入临时文件后原子替换，进程崩溃时文件要么是旧版本要么是新版本。
+run(resume=True) 读取未完成的检查点，恢复已发送数量并直接回到中断时的目录页。
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, field, fields
+from pathlib import Path
+
+from loguru import logger
+
+
+def message_hash(msg: str) -> str:
+    return hashlib.sha256(msg.encode("utf-8")).hexdigest()[:16]
+
+
+@dataclass
+class Checkpoint:
+    invite_count: int
+    sent_count: int
+    message_hash: str
+    message_name: str | None = None
+    url: str | None = None
+    page_number: int = 1
+    filters: list[str] = field(default_factory=list)
+    extract_mode: str | None = None
+    started: float = field(default_factory=time.time)
+    updated: float = field(default_factory=time.time)
+    # True 表示运行已正常结束（达到目标或目录已无可邀请的 publisher），不再用于恢复
+    finished: bool = False
+
+
+class CheckpointStore:
+    """单个检查点文件，save 可在后台线程中调用"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def load(self) -> Checkpoint | None:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"读取检查点失败，忽略: {e}")
+            return None
+        known = {f.name for f in fields(Checkpoint)}
+        try:
+            return Checkpoint(**{key: value for key, value in data.items() if key in known})
+        except TypeError as e:
+            logger.warning(f"检查点内容不完整，忽略: {e}")
+            return None
+
+    def save(self, checkpoint: Checkpoint):
+        payload = json.dumps(asdict(checkpoint), ensure_ascii=False)
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            tmp.replace(self.path)
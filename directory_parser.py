@@ -0,0 +1,244 @@
+"""
+Awin 联盟目录页离线解析
+
+从一次 HTML 快照（AwinRPA._safe_get_html 的返回值或 html_dumps/ 下的文件）中解析
+#directoryResults 表格，得到类型化的 publisher 行，替代逐元素的浏览器查询。
+"""
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+
+# 邀请链接状态
+INVITE_AVAILABLE = "available"
+INVITE_DISABLED = "disabled"
+INVITE_INVITED = "invited"
+
+# 邀请计划中跳过某行的原因（另外两种为 INVITE_DISABLED / INVITE_INVITED）
+SKIP_CLICKED = "clicked"
+SKIP_FAILED = "failed"
+
+# 已邀请的链接文本：整词 invited，排除 Not invited / Uninvited 等否定形式
+_INVITED_LABEL = re.compile(r"\binvited\b")
+_NOT_INVITED_LABEL = re.compile(r"\b(?:not\s+(?:yet\s+)?|un-?)invited\b")
+
+# 表头关键字 -> PublisherRow 字段，按顺序匹配（小写包含）
+HEADER_FIELDS = (
+    ("sector", "sector"),
+    ("promotion", "promotion_type"),
+    ("type", "promotion_type"),
+    ("region", "region"),
+    ("country", "region"),
+    ("publisher", "name"),
+    ("name", "name"),
+)
+
+
+@dataclass(slots=True)
+class PublisherRow:
+    """目录表格中的一行 publisher"""
+    publisher_id: str
+    name: str = ""
+    sector: str = ""
+    promotion_type: str = ""
+    region: str = ""
+    invite_state: str = INVITE_AVAILABLE
+    href: str | None = None
+    cells: list[str] = field(default_factory=list)
+
+    @property
+    def invitable(self) -> bool:
+        return self.invite_state == INVITE_AVAILABLE
+
+
+@dataclass(slots=True)
+class PlannedInvite:
+    """邀请计划中的一项：目录行、它在页面邀请链接中的下标，以及（可选）已解析的链接元素句柄"""
+    row: PublisherRow
+    index: int
+    link: Any = None
+
+    @property
+    def publisher_id(self) -> str:
+        return self.row.publisher_id
+
+
+@dataclass(slots=True)
+class PagePlan:
+    """一页的邀请计划：按页面顺序排列的待邀请项，以及被跳过的 publisher 及原因"""
+    publisher_ids: list[str]
+    work: list[PlannedInvite]
+    skipped: dict[str, str]
+
+    @property
+    def complete(self) -> bool:
+        """本页已没有需要再尝试的 publisher（失败的 publisher 下次运行仍可重试，不算完成）"""
+        return not self.work and SKIP_FAILED not in self.skipped.values()
+
+
+def plan_rows(rows: list[PublisherRow], unclicked: set[str], failed: set[str] = frozenset()) -> PagePlan:
+    """
+    把页面行与未点击集合做连接，得到邀请计划
+    unclicked: 页面 ID 中尚未点击的部分（调用方一次批量查询得到）
+    failed: 本次运行中已经失败过的 ID，不再重复尝试
+    """
+    seen: set[str] = set()
+    publisher_ids: list[str] = []
+    work: list[PlannedInvite] = []
+    skipped: dict[str, str] = {}
+    for index, row in enumerate(rows):
+        pid = row.publisher_id
+        if not pid or pid in seen:
+            continue
+        seen.add(pid)
+        publisher_ids.append(pid)
+        if pid not in unclicked:
+            skipped[pid] = SKIP_CLICKED
+        elif not row.invitable:
+            skipped[pid] = row.invite_state
+        elif pid in failed:
+            skipped[pid] = SKIP_FAILED
+        else:
+            work.append(PlannedInvite(row, index))
+    return PagePlan(publisher_ids, work, skipped)
+
+
+def _clean(text: str | None) -> str:
+    return " ".join((text or "").split())
+
+
+def invite_state_of(link_text: str | None, link_class: str | None, aria_disabled: str | None) -> str:
+    """根据邀请链接的文本/class/aria-disabled 判断邀请状态"""
+    text = _clean(link_text).lower()
+    if _INVITED_LABEL.search(text) and not _NOT_INVITED_LABEL.search(text):
+        return INVITE_INVITED
+    classes = (link_class or "").split()
+    if "disabled" in classes or (aria_disabled or "").lower() == "true":
+        return INVITE_DISABLED
+    return INVITE_AVAILABLE
+
+
+def column_map(headers: list[str]) -> dict[str, int]:
+    """把表头文本映射为 {字段名: 列下标}，同一字段只取第一个匹配的列"""
+    mapping: dict[str, int] = {}
+    for idx, header in enumerate(headers):
+        text = _clean(header).lower()
+        if not text:
+            continue
+        for keyword, field_name in HEADER_FIELDS:
+            if keyword in text:
+                mapping.setdefault(field_name, idx)
+                break
+    return mapping
+
+
+def build_row(columns: dict[str, int], raw: dict) -> PublisherRow:
+    """
+    由原始行数据构造 PublisherRow
+    raw 的键: publisher_id, link_text, link_class, aria_disabled, href, name, cells
+    （与 main.DIRECTORY_ROWS_JS 的返回结构一致）
+    """
+    cells = [_clean(c) for c in raw.get("cells") or []]
+
+    def cell(field_name: str) -> str:
+        idx = columns.get(field_name)
+        return cells[idx] if idx is not None and idx < len(cells) else ""
+
+    return PublisherRow(
+        publisher_id=str(raw.get("publisher_id") or ""),
+        name=_clean(raw.get("name")) or cell("name"),
+        sector=cell("sector"),
+        promotion_type=cell("promotion_type"),
+        region=cell("region"),
+        invite_state=invite_state_of(raw.get("link_text"), raw.get("link_class"), raw.get("aria_disabled")),
+        href=raw.get("href"),
+        cells=cells,
+    )
+
+
+# 解析后端在首次解析时才导入，导入 main 不承担 lxml/bs4 的加载开销
+def _extract_lxml(html: str) -> tuple[list[str], list[dict]] | None:
+    import lxml.html as lxml_html
+
+    root = lxml_html.fromstring(html)
+    tables = root.xpath('//*[@id="directoryResults"]//table')
+    if not tables:
+        return None
+    table = tables[0]
+    headers = [th.text_content() for th in table.xpath(".//thead//th")]
+    raw_rows = []
+    for link in table.xpath(".//a[@data-publisherid]"):
+        tr = next((el for el in link.iterancestors("tr")), None)
+        name_links = tr.xpath(".//a[not(@data-publisherid)]") if tr is not None else []
+        raw_rows.append({
+            "publisher_id": link.get("data-publisherid") or "",
+            "link_text": link.text_content(),
+            "link_class": link.get("class"),
+            "aria_disabled": link.get("aria-disabled"),
+            "href": link.get("href"),
+            "name": name_links[0].text_content() if name_links else "",
+            "cells": [td.text_content() for td in tr.xpath("./td|./th")] if tr is not None else [],
+        })
+    return headers, raw_rows
+
+
+def _extract_bs4(html: str) -> tuple[list[str], list[dict]] | None:
+    from bs4 import BeautifulSoup, SoupStrainer
+
+    # 只构建 #directoryResults 子树，html.parser 无需为整页建树
+    soup = BeautifulSoup(html, "html.parser", parse_only=SoupStrainer(id="directoryResults"))
+    table = soup.find("table")
+    if table is None:
+        return None
+    thead = table.find("thead")
+    headers = [th.get_text() for th in thead.find_all("th")] if thead else []
+    raw_rows = []
+    for link in table.find_all("a", attrs={"data-publisherid": True}):
+        tr = link.find_parent("tr")
+        name_link = None
+        if tr is not None:
+            name_link = next((a for a in tr.find_all("a") if not a.has_attr("data-publisherid")), None)
+        link_class = link.get("class")
+        raw_rows.append({
+            "publisher_id": link.get("data-publisherid") or "",
+            "link_text": link.get_text(),
+            "link_class": " ".join(link_class) if isinstance(link_class, list) else link_class,
+            "aria_disabled": link.get("aria-disabled"),
+            "href": link.get("href"),
+            "name": name_link.get_text() if name_link else "",
+            "cells": [td.get_text() for td in tr.find_all(["td", "th"], recursive=False)] if tr is not None else [],
+        })
+    return headers, raw_rows
+
+
+# 可选解析后端；均明显快于 html5lib（见 benchmarks/bench_directory_parser.py）
+BACKENDS = {
+    "lxml": _extract_lxml,
+    "html.parser": _extract_bs4,
+}
+
+DEFAULT_BACKEND = "lxml"
+
+
+def parse_directory_html(html: str, backend: str | None = None) -> list[PublisherRow] | None:
+    """
+    解析目录页 HTML，返回表格中每个邀请链接对应的 PublisherRow（保持页面顺序，不去重）
+    返回 None 表示页面中没有 #directoryResults 表格
+    """
+    backend = backend or DEFAULT_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"未知的解析后端: {backend}，可选: {', '.join(BACKENDS)}")
+    if not html:
+        return None
+    extracted = BACKENDS[backend](html)
+    if extracted is None:
+        return None
+    headers, raw_rows = extracted
+    columns = column_map(headers)
+    return [build_row(columns, raw) for raw in raw_rows]
+
+
+def parse_directory_file(path: Path, backend: str | None = None) -> list[PublisherRow] | None:
+    """解析保存到磁盘的目录页（例如 html_dumps/ 下的文件）"""
+    return parse_directory_html(Path(path).read_text(encoding="utf-8", errors="ignore"), backend)
@@ -0,0 +1,255 @@
+"""
+publisher ID 存储
+
+替代 seen/clicked 文本文件 + 内存 set 的做法：
+- SqliteIdStore: SQLite 主键索引，O(log n) 成员判断，不在启动时加载全部历史
+- 首次访问时才打开数据库，并自动导入旧版文本文件（导入后重命名为 *.migrated）
+- add/add_many 只写入内存待提交缓冲区，flush() 在一个事务里批量持久化；缓冲区超过 max_pending 条时自动落盘
+- SQLite 页缓存上限为 cache_kib，长时间运行时可用 shrink_memory() 释放
+- 每条记录保存首次写入时间与邀请信息名称；从旧版文本文件导入的记录标记为 legacy，
+  其写入时间只是文件修改时间，不计入 records_since/count_since
+"""
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+from loguru import logger
+
+
+class IdStore(ABC):
+    """ID 存储接口，缺少任一抽象方法的实现在构造时即报错"""
+
+    @abstractmethod
+    def __contains__(self, publisher_id: str) -> bool:
+        ...
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+    @abstractmethod
+    def add_many(self, publisher_ids: list[str], message: str | None = None) -> list[str]:
+        """添加 ID，返回其中此前不存在的 ID（保持顺序）"""
+
+    def add(self, publisher_id: str, message: str | None = None) -> bool:
+        return bool(self.add_many([publisher_id], message))
+
+    def missing(self, publisher_ids: list[str]) -> list[str]:
+        """返回不在存储中的 ID（保持顺序）"""
+        return [pid for pid in publisher_ids if pid not in self]
+
+    @abstractmethod
+    def records_since(self, ts: float) -> list[tuple[str, float]]:
+        """写入时间不早于 ts 的 (id, 写入时间)，按写入时间排序；不含旧版文件导入的记录"""
+
+    def count_since(self, ts: float) -> int:
+        """写入时间不早于 ts 的记录数，用于按天统计配额"""
+        return len(self.records_since(ts))
+
+    def flush(self):
+        pass
+
+    def shrink_memory(self):
+        """落盘并释放可以释放的内存缓存"""
+        self.flush()
+
+    def close(self):
+        self.flush()
+
+
+class MemoryIdStore(IdStore):
+    """纯内存实现，不持久化（用于基准测试与试运行）"""
+
+    def __init__(self, publisher_ids=()):
+        self._ids: dict[str, tuple[float, str | None]] = {pid: (time.time(), None) for pid in publisher_ids}
+        self._lock = threading.Lock()
+
+    def __contains__(self, publisher_id: str) -> bool:
+        return publisher_id in self._ids
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add_many(self, publisher_ids: list[str], message: str | None = None) -> list[str]:
+        now = time.time()
+        added = []
+        with self._lock:
+            for pid in publisher_ids:
+                if pid and pid not in self._ids:
+                    self._ids[pid] = (now, message)
+                    added.append(pid)
+        return added
+
+    def records_since(self, ts: float) -> list[tuple[str, float]]:
+        with self._lock:
+            return sorted(((pid, added) for pid, (added, _) in self._ids.items() if added >= ts), key=lambda r: r[1])
+
+
+class SqliteIdStore(IdStore):
+    """SQLite 实现，同一个数据库文件中每个 table 存一类 ID（seen/clicked）"""
+
+    def __init__(
+        self,
+        path: Path,
+        table: str,
+        legacy_path: Path | None = None,
+        max_pending: int = 5000,
+        cache_kib: int = 2048,
+    ):
+        if not table.isidentifier():
+            raise ValueError(f"非法的表名: {table}")
+        self.path = Path(path)
+        self.table = table
+        self.legacy_path = legacy_path
+        self.max_pending = max_pending
+        self.cache_kib = cache_kib
+        self._conn: sqlite3.Connection | None = None
+        self._count: int | None = None
+        # 尚未提交到数据库的记录 {id: (ts, message)}
+        self._pending: dict[str, tuple[float, str | None]] = {}
+        self._lock = threading.RLock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is not None:
+            return self._conn
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA cache_size=-{int(self.cache_kib)}")
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} ("
+            "id TEXT PRIMARY KEY, ts REAL NOT NULL, message TEXT, legacy INTEGER NOT NULL DEFAULT 0) WITHOUT ROWID"
+        )
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_ts ON {self.table} (ts)")
+        conn.commit()
+        self._conn = conn
+        self._add_legacy_column()
+        self._migrate_legacy()
+        return conn
+
+    def _add_legacy_column(self):
+        """旧数据库补上 legacy 列，并按已导入文件（*.migrated）的修改时间标记当时导入的记录"""
+        columns = {row[1] for row in self._conn.execute(f"PRAGMA table_info({self.table})")}
+        if "legacy" in columns:
+            return
+        with self._conn:
+            self._conn.execute(f"ALTER TABLE {self.table} ADD COLUMN legacy INTEGER NOT NULL DEFAULT 0")
+            migrated = self.legacy_path.with_name(self.legacy_path.name + ".migrated") if self.legacy_path else None
+            if migrated is not None and migrated.exists():
+                self._conn.execute(
+                    f"UPDATE {self.table} SET legacy = 1 WHERE message IS NULL AND ts = ?",
+                    (migrated.stat().st_mtime,),
+                )
+
+    def _migrate_legacy(self):
+        """导入旧版每行一个 ID 的文本文件，导入成功后重命名，避免重复导入"""
+        legacy = self.legacy_path
+        if legacy is None or not legacy.exists():
+            return
+        ts = legacy.stat().st_mtime
+        with open(legacy, "r", encoding="utf-8", errors="ignore") as f:
+            rows = ((line.strip(), ts) for line in f if line.strip())
+            with self._conn:
+                self._conn.executemany(
+                    f"INSERT OR IGNORE INTO {self.table} (id, ts, legacy) VALUES (?, ?, 1)", rows
+                )
+        migrated = legacy.with_name(legacy.name + ".migrated")
+        legacy.replace(migrated)
+        logger.info(f"已将 {legacy.name} 导入 {self.path.name}:{self.table}，原文件重命名为 {migrated.name}")
+
+    def _in_db(self, publisher_ids: list[str]) -> set[str]:
+        conn = self._connect()
+        found: set[str] = set()
+        # SQLite 默认最多 999 个绑定参数
+        for i in range(0, len(publisher_ids), 900):
+            chunk = publisher_ids[i:i + 900]
+            placeholders = ",".join("?" * len(chunk))
+            found.update(row[0] for row in conn.execute(
+                f"SELECT id FROM {self.table} WHERE id IN ({placeholders})", chunk
+            ))
+        return found
+
+    def __contains__(self, publisher_id: str) -> bool:
+        with self._lock:
+            if publisher_id in self._pending:
+                return True
+            return bool(self._in_db([publisher_id]))
+
+    def missing(self, publisher_ids: list[str]) -> list[str]:
+        with self._lock:
+            candidates = [pid for pid in dict.fromkeys(publisher_ids) if pid not in self._pending]
+            found = self._in_db(candidates) if candidates else set()
+            return [pid for pid in publisher_ids if pid not in self._pending and pid not in found]
+
+    def __len__(self) -> int:
+        with self._lock:
+            if self._count is None:
+                self._count = self._connect().execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+            return self._count + len(self._pending)
+
+    def add_many(self, publisher_ids: list[str], message: str | None = None) -> list[str]:
+        now = time.time()
+        with self._lock:
+            added = [pid for pid in self.missing([pid for pid in dict.fromkeys(publisher_ids) if pid])]
+            for pid in added:
+                self._pending[pid] = (now, message)
+            if len(self._pending) >= self.max_pending:
+                self.flush()
+            return added
+
+    def flush(self):
+        """把待提交记录在一个事务中写入数据库"""
+        with self._lock:
+            if not self._pending:
+                return
+            conn = self._connect()
+            pending = self._pending
+            with conn:
+                cursor = conn.executemany(
+                    f"INSERT OR IGNORE INTO {self.table} (id, ts, message) VALUES (?, ?, ?)",
+                    ((pid, ts, message) for pid, (ts, message) in pending.items()),
+                )
+            if self._count is not None:
+                self._count += max(cursor.rowcount, 0)
+            self._pending = {}
+
+    def shrink_memory(self):
+        with self._lock:
+            self.flush()
+            if self._conn is not None:
+                self._conn.execute("PRAGMA shrink_memory")
+
+    def count_since(self, ts: float) -> int:
+        """写入时间不早于 ts 的记录数（含尚未提交的，不含旧版文件导入的），用于按天统计配额"""
+        with self._lock:
+            pending = sum(1 for added, _ in self._pending.values() if added >= ts)
+            stored = self._connect().execute(
+                f"SELECT COUNT(*) FROM {self.table} WHERE ts >= ? AND NOT legacy", (ts,)
+            ).fetchone()[0]
+            return stored + pending
+
+    def records_since(self, ts: float) -> list[tuple[str, float]]:
+        self.flush()
+        with self._lock:
+            return self._connect().execute(
+                f"SELECT id, ts FROM {self.table} WHERE ts >= ? AND NOT legacy ORDER BY ts", (ts,)
+            ).fetchall()
+
+    def records(self, limit: int | None = None):
+        """按写入时间倒序返回 (id, ts, message)"""
+        self.flush()
+        sql = f"SELECT id, ts, message FROM {self.table} ORDER BY ts DESC"
+        with self._lock:
+            if limit:
+                return self._connect().execute(sql + " LIMIT ?", (limit,)).fetchall()
+            return self._connect().execute(sql).fetchall()
+
+    def close(self):
+        with self._lock:
+            self.flush()
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
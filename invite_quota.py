@@ -0,0 +1,233 @@
+"""
+跨运行共享的邀请配额（令牌桶）
+
+AwinRPA 原来的发送节奏只有每个实例内的最小间隔（invite_interval 加随机抖动），不知道之前的运行已经发了多少邀请。
+InviteQuota 把令牌桶状态与发送记录保存在 SQLite 中，同一台机器上的所有标签页与进程共用同一个数据库文件：
+- per_hour: 令牌桶每小时补充的令牌数；burst 为桶容量，即空闲之后允许连续发送的数量
+- per_day: 每天（本地时间）最多发送的邀请数，达到后 acquire 抛出 QuotaExhausted
+acquire 在 BEGIN IMMEDIATE 事务中补充并扣减令牌，SQLite 的写锁保证多个进程之间不会超发；
+令牌不足时按补充速率算出需要等待的时间，sleep 后重试。还没有点击发送按钮就失败的邀请用 refund 退回令牌。
+数据库中还没有发送记录时，先用 history（clicked ID 存储与审计日志中最近 24 小时的成功发送时间）回放令牌桶，
+接着之前的运行计算配额。
+
+用法: python invite_quota.py status [--db invite_quota.sqlite3] [--per-hour 60] [--per-day 500] [--burst 5]
+"""
+import argparse
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Iterable
+
+from loguru import logger
+
+DEFAULT_DB_PATH = Path(__file__).parent / "invite_quota.sqlite3"
+
+# 发送记录保留的时间（秒），超过后清理
+LEDGER_RETENTION = 2 * 86400
+# 首次使用时从历史记录导入的时间范围（秒）
+SEED_WINDOW = 86400
+
+
+def today_start() -> float:
+    """本地时间今天 0 点的时间戳"""
+    return datetime.now().replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+
+
+class QuotaExhausted(Exception):
+    """今天的邀请配额已用完"""
+
+
+@dataclass
+class QuotaPolicy:
+    per_hour: float | None = 60
+    per_day: int | None = 500
+    burst: int = 5
+
+    def __post_init__(self):
+        if self.per_hour is not None and self.per_hour <= 0:
+            raise ValueError("per_hour 必须为正数或 None")
+        if self.per_day is not None and self.per_day < 0:
+            raise ValueError("per_day 不能为负数")
+        if self.burst < 1:
+            raise ValueError("burst 必须为正整数")
+
+    @property
+    def rate(self) -> float | None:
+        """每秒补充的令牌数，None 表示不限速"""
+        return self.per_hour / 3600 if self.per_hour else None
+
+
+class InviteQuota:
+    """持久化的令牌桶与发送记录，线程安全，多进程通过 SQLite 写锁互斥"""
+
+    def __init__(
+        self,
+        path: Path,
+        policy: QuotaPolicy,
+        history: Callable[[float], Iterable[float]] | None = None,
+    ):
+        """history: 返回某时间戳之后已成功发送的时间列表，只在数据库中还没有发送记录时调用一次"""
+        self.path = Path(path)
+        self.policy = policy
+        self.history = history
+        self._conn: sqlite3.Connection | None = None
+        self._seeded = False
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is not None:
+            return self._conn
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # isolation_level=None: 事务由 BEGIN IMMEDIATE 显式控制
+        conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS quota_state (key TEXT PRIMARY KEY, value REAL NOT NULL)")
+        conn.execute("CREATE TABLE IF NOT EXISTS quota_sends (id INTEGER PRIMARY KEY, ts REAL NOT NULL)")
+        conn.execute("CREATE INDEX IF NOT EXISTS quota_sends_ts ON quota_sends (ts)")
+        self._conn = conn
+        return conn
+
+    def _transaction(self):
+        conn = self._connect()
+        if not self._seeded:
+            self._seed()
+            self._seeded = True
+        conn.execute("BEGIN IMMEDIATE")
+        return conn
+
+    def _state(self, conn: sqlite3.Connection) -> dict[str, float]:
+        return dict(conn.execute("SELECT key, value FROM quota_state"))
+
+    def _save_state(self, conn: sqlite3.Connection, **values: float):
+        conn.executemany(
+            "INSERT INTO quota_state (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            values.items(),
+        )
+
+    def _seed(self):
+        """首次使用时导入历史发送记录，并按记录回放令牌桶（历史记录在事务外读取，不长时间占用写锁）"""
+        conn = self._conn
+        if "seeded" in self._state(conn):
+            return
+        now = time.time()
+        since = now - SEED_WINDOW
+        sent = sorted(ts for ts in (self.history(since) if self.history else ()) if since <= ts <= now)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # 其他进程可能已抢先导入
+            if "seeded" in self._state(conn):
+                conn.execute("COMMIT")
+                return
+            conn.executemany("INSERT INTO quota_sends (ts) VALUES (?)", ((ts,) for ts in sent))
+            tokens, updated = float(self.policy.burst), since
+            for ts in sent:
+                tokens = self._refill(tokens, ts - updated) - 1
+                updated = ts
+            self._save_state(conn, seeded=now, tokens=tokens, updated=updated)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        if sent:
+            logger.info(f"邀请配额: 从历史记录导入最近 24 小时的 {len(sent)} 次发送")
+
+    def _refill(self, tokens: float, elapsed: float) -> float:
+        rate = self.policy.rate
+        if rate is None:
+            return float(self.policy.burst)
+        return min(float(self.policy.burst), tokens + max(elapsed, 0.0) * rate)
+
+    def acquire(self) -> int:
+        """
+        阻塞直到获得一个令牌，记录一次发送并返回记录 ID（失败时传给 refund）
+        今天的发送数已达到 per_day 时抛出 QuotaExhausted
+        """
+        while True:
+            with self._lock:
+                conn = self._transaction()
+                try:
+                    now = time.time()
+                    if self.policy.per_day is not None:
+                        used_today = conn.execute(
+                            "SELECT COUNT(*) FROM quota_sends WHERE ts >= ?", (today_start(),)
+                        ).fetchone()[0]
+                        if used_today >= self.policy.per_day:
+                            raise QuotaExhausted(f"今天已发送 {used_today} 次邀请，达到每日配额 {self.policy.per_day}")
+                    state = self._state(conn)
+                    tokens = self._refill(state.get("tokens", self.policy.burst), now - state.get("updated", now))
+                    if tokens >= 1:
+                        self._save_state(conn, tokens=tokens - 1, updated=now)
+                        send_id = conn.execute("INSERT INTO quota_sends (ts) VALUES (?)", (now,)).lastrowid
+                        conn.execute("DELETE FROM quota_sends WHERE ts < ?", (now - LEDGER_RETENTION,))
+                        conn.execute("COMMIT")
+                        return send_id
+                    conn.execute("COMMIT")
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    raise
+            wait = (1 - tokens) / self.policy.rate
+            if wait >= 5:
+                logger.info(f"邀请配额: 令牌不足，等待 {wait:.0f} 秒")
+            time.sleep(wait)
+
+    def refund(self, send_id: int):
+        """撤销一次尚未真正发出的发送：删除记录并退回令牌"""
+        with self._lock:
+            conn = self._transaction()
+            try:
+                if conn.execute("DELETE FROM quota_sends WHERE id = ?", (send_id,)).rowcount:
+                    now = time.time()
+                    state = self._state(conn)
+                    tokens = self._refill(state.get("tokens", self.policy.burst), now - state.get("updated", now))
+                    self._save_state(conn, tokens=min(tokens + 1, float(self.policy.burst)), updated=now)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def status(self) -> dict:
+        """当前可用令牌数、最近一小时与今天的发送数（不导入历史记录）"""
+        with self._lock:
+            conn = self._connect()
+            now = time.time()
+            state = self._state(conn)
+
+            def count_since(ts: float) -> int:
+                return conn.execute("SELECT COUNT(*) FROM quota_sends WHERE ts >= ?", (ts,)).fetchone()[0]
+
+            return {
+                "tokens": round(self._refill(state.get("tokens", self.policy.burst), now - state.get("updated", now)), 2),
+                "sent_last_hour": count_since(now - 3600),
+                "sent_today": count_since(today_start()),
+                "per_hour": self.policy.per_hour,
+                "per_day": self.policy.per_day,
+                "burst": self.policy.burst,
+            }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=("status",))
+    parser.add_argument("--db", type=Path, default=DEFAULT_DB_PATH)
+    parser.add_argument("--per-hour", type=float, default=QuotaPolicy.per_hour)
+    parser.add_argument("--per-day", type=int, default=QuotaPolicy.per_day)
+    parser.add_argument("--burst", type=int, default=QuotaPolicy.burst)
+    args = parser.parse_args()
+
+    quota = InviteQuota(args.db, QuotaPolicy(args.per_hour, args.per_day, args.burst))
+    for key, value in quota.status().items():
+        print(f"{key}: {value}")
+    quota.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,99 +1,148 @@
-from DrissionPage import Chromium
 from loguru import logger
-import questionary
-import inspect
-
-# 兼容性猴子补丁：尝试为 questionary 的多行输入替换默认提示文本
-# 不同版本的 questionary 实现细节不同：有的在类上提供 INSTRUCTIONS，有的没有。
-# 优先尝试修补模块内任意具有 INSTRUCTIONS 属性的类；若找不到则回退为包装 questionary.text
-try:
-    patched = False
-    for name, obj in inspect.getmembers(questionary.prompts.text):
-        if inspect.isclass(obj) and hasattr(obj, "INSTRUCTIONS"):
-            try:
-                obj.INSTRUCTIONS = "模板输入完成后，先按 esc 再按 enter。保存当前模板。\n"
-                patched = True
-                break
-            except Exception:
-                # 某些实现可能不允许写入，忽略并继续
-                continue
-
-    if not patched:
-        # 回退：包装 questionary.text 工厂函数，在调用时为多行输入尝试传递 instruction 参数（如果支持）
-        _orig_text = questionary.text
-        def _patched_text(*args, **kwargs):
-            try:
-                multiline = kwargs.get("multiline", False)
-                if multiline:
-                    # 仅当调用方没有指定 instruction 时才注入自定义提示
-                    if "instruction" not in kwargs:
-                        kwargs["instruction"] = "模板输入完成后，先按 esc 再按 enter。保存当前模板。\n"
-                return _orig_text(*args, **kwargs)
-            except TypeError:
-                # 如果原函数不接受 instruction 参数，尝试移除并调用原函数
-                #（这意味着无法通过该途径修改提示，保持原状）
-                kwargs.pop("instruction", None)
-                return _orig_text(*args, **kwargs)
-
-        questionary.text = _patched_text
-except Exception:
-    # 任何意外不应阻止程序启动，记录并继续
-    try:
-        logger.warning("未能应用 questionary 多行提示的猴子补丁，继续以默认行为运行。")
-    except Exception:
-        pass
 from rich.console import Console
 from rich.panel import Panel
+import copy
+import gc
 import json
+from dataclasses import asdict, dataclass
+from collections import Counter
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-import pyperclip
-from datetime import datetime, timezone
+from urllib.parse import parse_qsl, urlsplit
+from typing import TYPE_CHECKING
+
+from directory_parser import (
+    SKIP_FAILED,
+    PagePlan,
+    PublisherRow,
+    build_row,
+    column_map,
+    parse_directory_html,
+    plan_rows,
+)
+from snapshot_store import SnapshotStore
+from background_writer import BackgroundWriter, resolve
+from rate_limit import RateLimiter
+from adaptive_wait import AdaptiveWaiter, SettleStats
+from id_store import SqliteIdStore
+from page_index import PageIndex, listing_key, page_url
+from metrics import StageMetrics
+from audit_log import AuditSink, recent_events
+from resource_policy import ResourcePolicy
+from capture_policy import ROUTINE_PHASES, CapturePolicy, SnapshotCapture
+from memory_guard import MemoryGuard, MemoryLimits, MemorySample
+from invite_quota import InviteQuota, QuotaExhausted, QuotaPolicy
+from checkpoint import Checkpoint, CheckpointStore, message_hash
+from publisher_scoring import ScoringRules
+from message_templates import FIELDS as TEMPLATE_FIELDS, compile_template, merchant_id_from_url, unknown_placeholders
+import prompts
+
+if TYPE_CHECKING:
+    from DrissionPage import Chromium, ChromiumOptions
 
 console = Console()
-logger.add("file.log")
 
 
+def configure_logging():
+    """命令行运行时把日志同时写入 file.log（导入本模块或脚本化使用时不注册）"""
+    logger.add("file.log")
+
+
+# 结构化审计日志：只记录与「ID 获取/点击」相关的事件，便于后续分析重复/失效按钮问题
+# 后缀改为 .msgpack 即使用 msgpack 二进制帧（需要安装 msgpack）
 AUDIT_LOG_PATH = Path(__file__).parent / "awin_audit.jsonl"
+PUBLISHER_IDS_DB_PATH = Path(__file__).parent / "publisher_ids.sqlite3"
+# 旧版文本文件，首次访问 ID 存储时自动导入 PUBLISHER_IDS_DB_PATH
 SEEN_IDS_PATH = Path(__file__).parent / "seen_publisher_ids.txt"
 CLICKED_IDS_PATH = Path(__file__).parent / "clicked_publisher_ids.txt"
 HTML_DUMP_DIR = Path(__file__).parent / "html_dumps"
+SETTLE_STATS_PATH = Path(__file__).parent / "settle_times.json"
+PAGE_INDEX_PATH = Path(__file__).parent / "page_index.json"
+# 分阶段耗时：每次运行追加一行 JSONL 汇总，并覆盖写入 Prometheus 文本格式文件
+METRICS_JSONL_PATH = Path(__file__).parent / "stage_metrics.jsonl"
+METRICS_PROM_PATH = Path(__file__).parent / "stage_metrics.prom"
+# 邀请配额（见 invite_quota.py）：令牌桶状态与发送记录，同一商户的所有标签页与进程共用
+QUOTA_DB_PATH = Path(__file__).parent / "invite_quota.sqlite3"
+# 运行检查点：run 的进度（目标/已发送数量、目录页位置、筛选条件、邀请信息摘要），用于中断后恢复
+CHECKPOINT_PATH = Path(__file__).parent / "run_checkpoint.json"
+# publisher 评分规则（见 publisher_scoring.py）；文件存在时 run 按分数从高到低发送邀请
+SCORING_RULES_PATH = Path(__file__).parent / "scoring_rules.json"
+# 浏览器会话复用：BROWSER_ADDRESS 为已启动 Chromium 的调试地址（如 "127.0.0.1:9222"）时直接接管该浏览器，
+# BROWSER_USER_DATA_PATH 为持久化的用户数据目录，新启动的浏览器沿用其中的登录状态
+BROWSER_ADDRESS: str | None = None
+BROWSER_USER_DATA_PATH: Path | None = None
+# 多商户调度时每个商户的状态放在 MERCHANT_STATE_ROOT/<商户 ID>/ 下，互不混用
+MERCHANT_STATE_ROOT = Path(__file__).parent / "merchants"
+# 轻量页面模式：拦截图片/字体/媒体与统计跟踪请求，限制磁盘缓存；默认不拦截，
+# 命令行 --block-resources（main.py / batch_run.py / scheduler.py）或设为 ResourcePolicy() 启用
+RESOURCE_POLICY: ResourcePolicy | None = None
+# HTML 快照采集策略（见 capture_policy.py）：always / sample / failure / ring
+# 默认 before_click 只暂存在环形缓冲中，成功后的 after_click 仍每次保存，invite_sent_success 的 html_path 不为空；
+# 设为 CapturePolicy() 则不再采集 after_click（html_path 为 null），省去每次邀请成功后的一次取 DOM
+CAPTURE_POLICY = CapturePolicy(keep_after_click=True)
+# 长时间运行模式（见 memory_guard.py）：定期检查标签页 JS 堆/DOM 与 Python RSS，超限时回收标签页；None 为不检查
+MEMORY_LIMITS: MemoryLimits | None = None
+# 每小时/每天的邀请配额；设置后由配额代替 invite_interval 控制发送节奏，None 为只按 invite_interval 限速
+QUOTA_POLICY: QuotaPolicy | None = None
 
 
-def _audit_filter(record) -> bool:
-    return bool(record["extra"].get("audit"))
+def transient_browser_errors() -> tuple[type[Exception], ...]:
+    """浏览器断开、标签页关闭等可通过重连恢复的异常"""
+    from DrissionPage.errors import BrowserConnectError, ContextLostError, PageDisconnectedError, TargetNotFoundError
 
+    return (BrowserConnectError, ContextLostError, PageDisconnectedError, TargetNotFoundError, ConnectionError)
 
-def _load_id_set(path: Path) -> set[str]:
-    try:
-        if not path.exists():
-            return set()
-        ids: set[str] = set()
-        for line in path.read_text(encoding="utf-8").splitlines():
-            value = line.strip()
-            if value:
-                ids.add(value)
-        return ids
-    except Exception:
-        return set()
 
+def browser_options() -> "ChromiumOptions":
+    """按 BROWSER_ADDRESS / BROWSER_USER_DATA_PATH 构造浏览器启动选项"""
+    from DrissionPage import ChromiumOptions
 
-def _append_new_ids(path: Path, ids: list[str]):
-    if not ids:
-        return
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with open(path, "a", encoding="utf-8") as f:
-        for value in ids:
-            if value:
-                f.write(f"{value}\n")
+    co = ChromiumOptions()
+    if BROWSER_ADDRESS:
+        co.set_address(BROWSER_ADDRESS)
+    if BROWSER_USER_DATA_PATH:
+        co.set_user_data_path(str(BROWSER_USER_DATA_PATH))
+    return co
 
 
-# 结构化审计日志：只记录与「ID 获取/点击」相关的事件，便于后续分析重复/失效按钮问题
-logger.add(
-    AUDIT_LOG_PATH,
-    serialize=True,
-    filter=_audit_filter,
-    level="INFO",
-)
+# 一次 run_js 往返取回目录表格的表头、所有邀请链接及其所在行的元数据，
+# 替代逐个 link.attr() 的 CDP 调用（每行至少一次往返）。行结构与 directory_parser.build_row 一致
+DIRECTORY_ROWS_JS = """
+const table = document.querySelector('#directoryResults table');
+if (!table) return null;
+const text = el => (el && el.textContent || '').replace(/\\s+/g, ' ').trim();
+const rows = [];
+for (const link of table.querySelectorAll('a[data-publisherid]')) {
+    const tr = link.closest('tr');
+    rows.push({
+        publisher_id: link.getAttribute('data-publisherid') || '',
+        link_text: text(link),
+        link_class: link.getAttribute('class'),
+        aria_disabled: link.getAttribute('aria-disabled'),
+        href: link.getAttribute('href'),
+        name: tr ? text(tr.querySelector('a:not([data-publisherid])')) : '',
+        cells: tr ? Array.from(tr.cells, text) : [],
+    });
+}
+return {headers: Array.from(table.querySelectorAll('thead th'), text), rows: rows};
+"""
+
+
+# 一次 run_js 往返把邀请信息写入输入框：通过原型上的 value setter 赋值（绕过框架对实例 value 的拦截），
+# 再触发弹窗监听的 input/change 事件。返回页面是否接受了该值（未被脚本改写且通过约束校验）
+INJECT_MESSAGE_JS = """
+const value = arguments[0];
+const setter = Object.getOwnPropertyDescriptor(Object.getPrototypeOf(this), 'value').set;
+this.focus();
+setter.call(this, value);
+this.dispatchEvent(new Event('input', {bubbles: true}));
+this.dispatchEvent(new Event('change', {bubbles: true}));
+const expected = value.replace(/\\r\\n?/g, '\\n');
+return this.value === expected && this.checkValidity() && !(this.maxLength >= 0 && expected.length > this.maxLength);
+"""
 
 
 class MessageManager:
@@ -101,24 +150,34 @@ class MessageManager:
     
     def __init__(self, file_path: Path = None):
         self.file_path = file_path or Path(__file__).parent / "invitation_messages.json"
+        # 上次解析的结果，按文件的 (mtime_ns, size) 判断是否需要重新读取
+        self._cached: tuple[tuple[int, int], list[dict]] | None = None
     
     def load(self) -> list[dict]:
-        """从文件加载所有邀请信息"""
-        if self.file_path.exists():
-            try:
+        """从文件加载所有邀请信息（文件未变化时直接返回缓存的副本）"""
+        try:
+            stat = self.file_path.stat()
+            version = (stat.st_mtime_ns, stat.st_size)
+            if self._cached is None or self._cached[0] != version:
                 with open(self.file_path, "r", encoding="utf-8") as f:
-                    messages = json.load(f)
-                    if messages:
-                        return messages
-            except (json.JSONDecodeError, IOError):
-                pass
+                    self._cached = (version, json.load(f) or [])
+            if self._cached[1]:
+                return [dict(message) for message in self._cached[1]]
+        except (json.JSONDecodeError, IOError):
+            pass
         console.print("[yellow]⚠️ 未找到邀请信息配置文件，请先在设置模式中添加邀请信息[/yellow]")
         return []
     
     def save(self, messages: list[dict]):
-        """保存邀请信息到文件"""
+        """保存邀请信息到文件，并用刚写入的内容更新缓存（同一 mtime 精度内大小不变的改写也不会读到旧内容）"""
         with open(self.file_path, "w", encoding="utf-8") as f:
             json.dump(messages, f, ensure_ascii=False, indent=2)
+        try:
+            stat = self.file_path.stat()
+        except OSError:
+            self._cached = None
+        else:
+            self._cached = ((stat.st_mtime_ns, stat.st_size), [dict(message) for message in messages])
     
     def display(self, messages: list[dict]):
         """显示所有邀请信息"""
@@ -135,23 +194,23 @@ class MessageManager:
         """新增邀请信息"""
         console.print("\n[bold cyan]➕ 新增邀请信息[/bold cyan]")
         
-        name = questionary.text("请输入邀请信息名称:").ask()
+        name = prompts.text("请输入邀请信息名称:").ask()
         if not name:
             console.print("[yellow]已取消[/yellow]")
             return messages
         
-        clipboard_content = pyperclip.paste().strip()
+        clipboard_content = prompts.paste().strip()
         default_content = ""
         if clipboard_content:
-            use_clipboard = questionary.confirm(
+            use_clipboard = prompts.confirm(
                 f"检测到剪贴板内容，是否直接使用?\n[dim]{clipboard_content[:50]}...[/dim]",
                 default=True
             ).ask()
             if use_clipboard:
                 default_content = clipboard_content
         
-        content = questionary.text(
-            "请输入邀请信息内容 (支持多行):",
+        content = prompts.text(
+            "请输入邀请信息内容 (支持多行，可用占位符如 {publisher_name}):",
             default=default_content,
             multiline=True
         ).ask()
@@ -159,11 +218,22 @@ class MessageManager:
             console.print("[yellow]已取消[/yellow]")
             return messages
         
+        self.check_placeholders(content)
         messages.append({"name": name, "content": content})
         self.save(messages)
         console.print(f"[green]✅ 已添加邀请信息: {name}[/green]")
         return messages
     
+    @staticmethod
+    def check_placeholders(content: str):
+        """提示内容中不受支持的占位符（发送时原样输出）"""
+        unknown = unknown_placeholders(content)
+        if unknown:
+            console.print(
+                f"[yellow]⚠️ 不支持的占位符将原样发送: {', '.join('{' + name + '}' for name in unknown)}[/yellow]\n"
+                f"[dim]可用占位符: {', '.join('{' + name + '}' for name in TEMPLATE_FIELDS)}[/dim]"
+            )
+
     def edit(self, messages: list[dict]) -> list[dict]:
         """编辑邀请信息"""
         if not messages:
@@ -175,7 +245,7 @@ class MessageManager:
         choices = [f"{i+1}. {msg['name']}" for i, msg in enumerate(messages)]
         choices.append("取消")
         
-        selection = questionary.select(
+        selection = prompts.select(
             "选择要编辑的邀请信息:",
             choices=choices
         ).ask()
@@ -188,22 +258,22 @@ class MessageManager:
         
         console.print(f"\n[bold]当前内容:[/bold]\n[dim]{msg['content']}[/dim]\n")
         
-        new_name = questionary.text(
+        new_name = prompts.text(
             "请输入新名称 (留空保持不变):",
             default=msg["name"]
         ).ask()
         
-        clipboard_content = pyperclip.paste().strip()
+        clipboard_content = prompts.paste().strip()
         default_content = msg["content"]
         if clipboard_content and clipboard_content != msg["content"]:
-            use_clipboard = questionary.confirm(
+            use_clipboard = prompts.confirm(
                 f"检测到剪贴板内容，是否替换当前内容?\n[dim]{clipboard_content[:50]}...[/dim]",
                 default=False
             ).ask()
             if use_clipboard:
                 default_content = clipboard_content
         
-        new_content = questionary.text(
+        new_content = prompts.text(
             "请输入新内容 (留空保持不变):",
             default=default_content,
             multiline=True
@@ -212,6 +282,7 @@ class MessageManager:
         if new_name:
             messages[idx]["name"] = new_name
         if new_content:
+            self.check_placeholders(new_content)
             messages[idx]["content"] = new_content
         
         self.save(messages)
@@ -229,7 +300,7 @@ class MessageManager:
         choices = [f"{i+1}. {msg['name']}" for i, msg in enumerate(messages)]
         choices.append("取消")
         
-        selection = questionary.select(
+        selection = prompts.select(
             "选择要删除的邀请信息:",
             choices=choices
         ).ask()
@@ -240,7 +311,7 @@ class MessageManager:
         idx = int(selection.split(".")[0]) - 1
         deleted_name = messages[idx]["name"]
         
-        confirm = questionary.confirm(
+        confirm = prompts.confirm(
             f"确定要删除 '{deleted_name}' 吗?",
             default=False
         ).ask()
@@ -253,20 +324,309 @@ class MessageManager:
         return messages
 
 
+@dataclass
+class StatePaths:
+    """一个商户的状态文件位置（ID 存储、审计日志、HTML 快照、分页索引、分阶段耗时、运行检查点与邀请配额）"""
+    audit_log: Path
+    publisher_ids_db: Path
+    seen_ids: Path | None
+    clicked_ids: Path | None
+    html_dumps: Path
+    page_index: Path
+    metrics_jsonl: Path
+    metrics_prom: Path
+    checkpoint: Path
+    quota_db: Path
+
+    @classmethod
+    def default(cls) -> "StatePaths":
+        """模块级路径（单商户，调用时读取，便于脚本中重定向）"""
+        return cls(
+            AUDIT_LOG_PATH, PUBLISHER_IDS_DB_PATH, SEEN_IDS_PATH, CLICKED_IDS_PATH,
+            HTML_DUMP_DIR, PAGE_INDEX_PATH, METRICS_JSONL_PATH, METRICS_PROM_PATH, CHECKPOINT_PATH, QUOTA_DB_PATH,
+        )
+
+    @classmethod
+    def under(cls, state_dir: Path) -> "StatePaths":
+        """全部状态放在 state_dir 下（没有旧版文本文件需要导入）"""
+        state_dir = Path(state_dir)
+        return cls(
+            state_dir / AUDIT_LOG_PATH.name, state_dir / PUBLISHER_IDS_DB_PATH.name, None, None,
+            state_dir / HTML_DUMP_DIR.name, state_dir / PAGE_INDEX_PATH.name,
+            state_dir / METRICS_JSONL_PATH.name, state_dir / METRICS_PROM_PATH.name, state_dir / CHECKPOINT_PATH.name,
+            state_dir / QUOTA_DB_PATH.name,
+        )
+
+
+class DirectoryExhausted(Exception):
+    """目录已到最后一页，没有下一页可翻"""
+
+
 class AwinRPA:
     """Awin RPA 自动化工具"""
     
+    # 商户的联盟目录页 URL
+    DIRECTORY_URL_TEMPLATE = 'https://ui.awin.com/awin/merchant/{merchant_id}/affiliate-directory/index/tab/notInvited'
+
     # 默认目标页面 URL
-    DEFAULT_URL = 'https://ui.awin.com/awin/merchant/45307/affiliate-directory/index/tab/notInvited'
+    DEFAULT_URL = DIRECTORY_URL_TEMPLATE.format(merchant_id=45307)
     
-    def __init__(self):
-        self.browser = Chromium()
-        self.tab = self.browser.latest_tab
+    # 目录分页的 URL 查询参数名；为 None 时跳页只能在页面上完成（见 PAGE_LINKS）
+    PAGE_PARAM: str | None = None
+    # 分页栏页码链接的定位符（链接文本为页码）；没有 PAGE_PARAM 时跳过已全部邀请的页优先点击页码，
+    # 为 None 或目标页码不在分页栏上时逐页点击下一页（不受翻页礼貌间隔限制）
+    PAGE_LINKS: str | None = None
+
+    # publisher ID 抽取方式
+    EXTRACT_MODES = ("batch", "html", "per_element")
+
+    # 邀请信息写入方式：inject 用一次 run_js 设置输入框的值并触发 input/change 事件，type 按键盘输入
+    INPUT_MODES = ("inject", "type")
+    # 注入后等待发送按钮启用的时间，超时视为页面未接受注入的值，改为键盘输入
+    INJECT_ACCEPT_TIMEOUT = 2.0
+
+    # 审计记录中附带当前 URL 的事件
+    AUDIT_URL_EVENTS = frozenset({"publisher_ids_fetched", "invite_button_missing", "invite_click_failed"})
+
+    # run 中浏览器断开后的重连：第 n 次连续重连前等待 min(BASE * 2^(n-1), MAX) 秒，超过次数后放弃
+    RECONNECT_ATTEMPTS = 5
+    RECONNECT_BASE_DELAY = 2.0
+    RECONNECT_MAX_DELAY = 60.0
+
+    def __init__(
+        self,
+        browser: "Chromium" = None,
+        extract_mode: str = "batch",
+        async_writes: bool = True,
+        invite_interval: float = 2.0,
+        page_interval: float = 1.0,
+        live_metrics: bool = True,
+        browser_options: "ChromiumOptions | None" = None,
+        lazy_browser: bool = False,
+        resource_policy: ResourcePolicy | None = None,
+        state_dir: Path | None = None,
+        scoring_rules: ScoringRules | None = None,
+        capture_policy: CapturePolicy | None = None,
+        input_mode: str = "inject",
+        memory_limits: MemoryLimits | None = None,
+        quota_policy: QuotaPolicy | None = None,
+    ):
+        """
+        browser: 已创建的浏览器；为 None 时按 browser_options（默认取模块级 browser_options()）启动或接管
+        lazy_browser: True 时不在构造时启动浏览器，首次使用或调用 start_browser 时才在后台启动
+        resource_policy: 在每个使用的标签页上启用的资源拦截，为 None 时取模块级 RESOURCE_POLICY
+        state_dir: 商户的状态目录，为 None 时使用模块级路径；页面稳定耗时记录与商户无关，始终共用
+        scoring_rules: publisher 评分规则，为 None 时读取 SCORING_RULES_PATH（文件不存在则按页面顺序邀请）
+        capture_policy: HTML 快照采集策略，为 None 时取模块级 CAPTURE_POLICY
+        input_mode: 邀请信息写入方式（见 INPUT_MODES），inject 未被页面接受时自动改为键盘输入
+        memory_limits: 长时间运行的内存阈值，为 None 时取模块级 MEMORY_LIMITS（仍为 None 则不检查）
+        quota_policy: 每小时/每天的邀请配额，为 None 时取模块级 QUOTA_POLICY（仍为 None 则只按 invite_interval 限速）
+        """
+        self._created = time.perf_counter()
+        self._run_started = self._created
+        # 启动耗时与首次邀请耗时（秒），在多个标签页的工作副本间共享
+        self.startup: dict = {}
+        self._browser = browser
+        self._browser_options = browser_options
+        self._browser_future: Future | None = None
+        self._browser_lock = threading.Lock()
+        self._tab = None
+        self.resource_policy = resource_policy or RESOURCE_POLICY
+        # 已启用资源拦截的标签页 ID，在多个标签页的工作副本间共享
+        self._policy_tabs: set[str] = set()
+        self.paths = StatePaths.under(state_dir) if state_dir is not None else StatePaths.default()
         self.message_manager = MessageManager()
+        # batch: 一次 run_js 抽取表格；html: 取一次 HTML 快照离线解析；per_element: 逐个元素读取属性
+        if extract_mode not in self.EXTRACT_MODES:
+            raise ValueError(f"未知的抽取方式: {extract_mode}")
+        self.extract_mode = extract_mode
+        if input_mode not in self.INPUT_MODES:
+            raise ValueError(f"未知的邀请信息写入方式: {input_mode}")
+        self.input_mode = input_mode
+        self.last_publisher_rows: list[PublisherRow] = []
+        # per_element 模式下抽取 ID 时已取到的邀请链接元素，供邀请计划直接复用
+        self._last_invite_links: list | None = None
+        self.snapshot_store = SnapshotStore(self.paths.html_dumps)
+        # 快照采集策略与 ring 模式的环形缓冲，在多个标签页的工作副本间共享
+        self.capture = SnapshotCapture(capture_policy or CAPTURE_POLICY)
+        # 本次邀请是否已保存过失败现场快照
+        self._failure_captured = False
+        self.audit_sink = AuditSink(self.paths.audit_log)
+        # 快照落盘、审计日志与 ID 文件追加交给后台线程，点击热路径只保留浏览器操作
+        self.writer = BackgroundWriter() if async_writes else None
         self._fetch_seq = 0
         self._click_seq = 0
-        self._seen_publisher_ids: set[str] = _load_id_set(SEEN_IDS_PATH)
-        self._clicked_publisher_ids: set[str] = _load_id_set(CLICKED_IDS_PATH)
+        # 计数器在多个标签页的工作副本间共享（浅拷贝共享同一个 dict），保证点击序号全局唯一
+        self._counters = {"click": 0}
+        # 索引化的 ID 存储，首次访问时才打开（不在启动时扫描全部历史）
+        self._seen_publisher_ids = SqliteIdStore(self.paths.publisher_ids_db, "seen", legacy_path=self.paths.seen_ids)
+        self._clicked_publisher_ids = SqliteIdStore(
+            self.paths.publisher_ids_db, "clicked", legacy_path=self.paths.clicked_ids
+        )
+        # 当前使用的邀请信息名称，随点击记录一起保存
+        self.message_name: str | None = None
+        # 正在某个标签页上发送中的 publisher，与 _clicked_publisher_ids 一起受 _claim_lock 保护
+        self._inflight_publisher_ids: set[str] = set()
+        # 本次运行中发送失败的 publisher，邀请计划不再重复尝试（下次运行仍会重试）
+        self._failed_publisher_ids: set[str] = set()
+        self._claim_lock = threading.Lock()
+        # True 表示固定在 self.tab 上工作（并行工作副本），refresh_tab 不切换到 latest_tab
+        self.pin_tab = False
+        # 礼貌性最小间隔：相邻两次邀请/翻页之间至少间隔这么多秒（附加 0~30% 随机抖动）
+        self.invite_limiter = RateLimiter(min_interval=invite_interval, jitter=0.3)
+        self.page_limiter = RateLimiter(min_interval=page_interval, jitter=0.3)
+        # 用页面信号代替固定 sleep，并记录各阶段实际稳定耗时
+        self.waiter = AdaptiveWaiter(SettleStats(SETTLE_STATS_PATH))
+        # 分页索引：记录各目录列表中已全部邀请的页，运行时直接跳过
+        self.page_index = PageIndex(self.paths.page_index)
+        self.page_number = 1
+        self.filters: list[str] = []
+        # 当前目录列表的标识，在首次使用时根据当时的 URL 计算；跳转/筛选后重置
+        self._listing: str | None = None
+        # 热路径分阶段耗时直方图，在多个标签页的工作副本间共享；live_metrics 控制运行时是否实时显示
+        self.metrics = StageMetrics()
+        self.live_metrics = live_metrics
+        # 运行检查点：run 期间 _checkpoint 为内存中的进度，每次邀请成功与翻页后在后台原子写入
+        self.checkpoints = CheckpointStore(self.paths.checkpoint)
+        self._checkpoint: Checkpoint | None = None
+        self.scoring_rules = scoring_rules or ScoringRules.load(SCORING_RULES_PATH)
+        # 内存守护在多个标签页的工作副本间共享
+        limits = memory_limits or MEMORY_LIMITS
+        self.memory_guard = MemoryGuard(limits) if limits is not None else None
+        # 邀请配额在多个标签页的工作副本间共享，多进程通过配额数据库互斥
+        policy = quota_policy or QUOTA_POLICY
+        self.quota = InviteQuota(self.paths.quota_db, policy, history=self._invite_history) if policy is not None else None
+        # 本次邀请已占用、尚未点击发送按钮的配额记录，失败时退回
+        self._quota_ticket: int | None = None
+        # 本次运行是否因今天的配额用完而停止
+        self.quota_exhausted = False
+        if browser is None and not lazy_browser:
+            self._wait_browser()
+
+    @property
+    def failed_publisher_ids(self) -> frozenset[str]:
+        """本次运行中发送失败的 publisher（只读副本，下次运行开始时清空）"""
+        return frozenset(self._failed_publisher_ids)
+
+    @property
+    def browser(self) -> "Chromium":
+        if self._browser is None:
+            self._wait_browser()
+        return self._browser
+
+    @property
+    def tab(self):
+        if self._tab is None:
+            # 后台预热可能已选好目录页标签页，先等它完成
+            self._wait_browser()
+            if self._tab is None:
+                self.tab = self._find_directory_tab(self._browser, self.DEFAULT_URL) or self._browser.latest_tab
+        return self._tab
+
+    @tab.setter
+    def tab(self, tab):
+        self._apply_policy(tab)
+        self._tab = tab
+
+    def _apply_policy(self, tab):
+        """在标签页上启用资源拦截（每个标签页只启用一次）"""
+        if self.resource_policy is None or tab is None:
+            return
+        tab_id = getattr(tab, "tab_id", None) or id(tab)
+        if tab_id in self._policy_tabs:
+            return
+        self._policy_tabs.add(tab_id)
+        self.resource_policy.attach(tab)
+
+    def start_browser(self, url: str | None = None) -> Future:
+        """
+        在后台线程中启动或接管浏览器，返回完成时结果为浏览器的 Future，可与交互式提示并行
+        url 不为空时一并预热目录页：已有同一目录页的标签页则直接复用，否则在当前标签页打开
+        """
+        with self._browser_lock:
+            if self._browser_future is None:
+                self._browser_future = Future()
+                threading.Thread(target=self._launch_browser, args=(url,), name="awin-browser", daemon=True).start()
+            return self._browser_future
+
+    def _launch_browser(self, url: str | None):
+        future = self._browser_future
+        started = time.perf_counter()
+        try:
+            if self._browser is None:
+                from DrissionPage import Chromium
+
+                co = self._browser_options or browser_options()
+                if self.resource_policy is not None:
+                    self.resource_policy.apply_options(co)
+                browser = Chromium(co)
+            else:
+                browser = self._browser
+            self.startup["browser_launch_s"] = round(time.perf_counter() - started, 3)
+            if url:
+                tab = self._find_directory_tab(browser, url)
+                self.startup["tab_reused"] = tab is not None
+                if tab is None:
+                    tab = browser.latest_tab
+                    self._apply_policy(tab)
+                    tab.get(url)
+                else:
+                    self._apply_policy(tab)
+                self.page_number = self._page_from_url(tab.url)
+                self._listing = None
+                self.startup["directory_ready_s"] = round(time.perf_counter() - started, 3)
+                # 预热完成后才设置，避免主线程在页面加载完成前拿到标签页
+                self._tab = tab
+        except Exception as e:
+            future.set_exception(e)
+            return
+        future.set_result(browser)
+
+    def _wait_browser(self):
+        """等待 start_browser 完成（未调用过时现在同步启动），阻塞时间记为 browser_wait_s"""
+        if self._browser is not None and self._browser_future is None:
+            return
+        future = self.start_browser()
+        if not future.done():
+            started = time.perf_counter()
+            future.exception()
+            self.startup["browser_wait_s"] = round(
+                self.startup.get("browser_wait_s", 0) + time.perf_counter() - started, 3
+            )
+        self._browser = future.result()
+
+    @staticmethod
+    def _same_directory(url: str | None, other: str | None) -> bool:
+        """两个 URL 是否为同一目录页（协议、主机与路径相同，忽略查询参数）"""
+        if not url or not other:
+            return False
+        a, b = urlsplit(url), urlsplit(other)
+        return (a.scheme, a.netloc, a.path.rstrip("/")) == (b.scheme, b.netloc, b.path.rstrip("/"))
+
+    def _find_directory_tab(self, browser: "Chromium", url: str):
+        """返回已打开同一目录页的标签页，没有时返回 None"""
+        try:
+            tabs = browser.get_tabs()
+        except Exception:
+            return None
+        for tab in tabs:
+            try:
+                if self._same_directory(tab.url, url):
+                    return tab
+            except Exception:
+                continue
+        return None
+
+    def _record_first_invite(self):
+        """记录从创建实例 / 开始运行到首次邀请成功的耗时"""
+        now = time.perf_counter()
+        self.startup["first_invite_s"] = round(now - self._created, 3)
+        self.startup["first_invite_after_run_s"] = round(now - self._run_started, 3)
+        logger.info(
+            f"首次邀请: 创建后 {self.startup['first_invite_s']} s, 开始运行后 {self.startup['first_invite_after_run_s']} s, "
+            f"等待浏览器 {self.startup.get('browser_wait_s', 0)} s"
+        )
+        self._audit("first_invite", **self.startup)
     
     def _page_context(self) -> dict:
         try:
@@ -275,14 +635,23 @@ class AwinRPA:
             url = None
         return {"url": url}
     
+    def _write(self, func, *args, **kwargs):
+        """执行 I/O 任务：启用后台写入时异步提交并返回 Future，否则同步执行并返回结果"""
+        if self.writer is None:
+            return func(*args, **kwargs)
+        return self.writer.submit(func, *args, **kwargs)
+
+    def _emit_audit(self, fields: dict):
+        # 字段中可能含有先前提交的快照任务的 Future（如 html_path），后台线程按提交顺序执行，此时已完成
+        self.audit_sink.write({key: resolve(value) for key, value in fields.items()})
+
     def _audit(self, event: str, **extra):
-        logger.bind(
-            audit=True,
-            event=event,
-            ts=datetime.now(timezone.utc).isoformat(),
-            **self._page_context(),
-            **extra,
-        ).info(event)
+        fields = {"ts": time.time(), "event": event}
+        # 读取 URL 需要一次浏览器往返，只在获取 ID 与失败事件上记录
+        if event in self.AUDIT_URL_EVENTS:
+            fields.update(self._page_context())
+        fields.update(extra)
+        self._write(self._emit_audit, fields)
 
     def _safe_get_html(self) -> str:
         try:
@@ -303,57 +672,245 @@ class AwinRPA:
 
         return ""
 
-    def _dump_html(self, publisher_id: str, phase: str) -> str | None:
+    def _put_snapshot(self, html: str, click_seq: int, publisher_id: str, phase: str) -> str | None:
+        try:
+            return self.snapshot_store.put(html, click_seq, publisher_id, phase)
+        except Exception:
+            return None
+
+    def _dump_html(self, publisher_id: str, phase: str):
         try:
             html = self._safe_get_html()
             if not html:
                 return None
-            ts = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S.%fZ")
-            safe_pid = "".join(ch for ch in str(publisher_id) if ch.isalnum() or ch in ("-", "_"))[:64] or "unknown"
-            HTML_DUMP_DIR.mkdir(parents=True, exist_ok=True)
-            path = HTML_DUMP_DIR / f"{ts}_clickseq{self._click_seq}_pid{safe_pid}_{phase}.html"
-            path.write_text(html, encoding="utf-8", errors="ignore")
-            return str(path)
+            if self.capture.holds(phase):
+                self.capture.record(html, persisted=False)
+                self.capture.hold(self._click_seq, str(publisher_id), html)
+                return None
+            if phase not in ROUTINE_PHASES:
+                self._failure_captured = True
+                # 失败现场之前先把暂存的 before_click 落盘，失败快照可以存为相对它的差量
+                self._persist_held_snapshots()
+            self.capture.record(html, persisted=True)
+            return self._write(self._put_snapshot, html, self._click_seq, str(publisher_id), phase)
         except Exception:
             return None
 
-    def _save_snapshot(self, publisher_id: str, phase: str) -> str | None:
+    def _save_snapshot(self, publisher_id: str, phase: str):
         """
-        保存 HTML 快照用于对比
-        返回 HTML 文件路径
+        按采集策略保存 HTML 快照用于对比（去重、压缩，非 before_click 阶段存为差量）
+        返回快照对象文件路径，可用 `python snapshot_store.py show <路径>` 还原；
+        启用后台写入时返回该路径的 Future，可直接作为 _audit 的字段传入；
+        策略不采集该阶段或只暂存在内存中时返回 None
         """
+        if not self.capture.wants(phase, self._click_seq):
+            return None
         return self._dump_html(publisher_id, phase)
+
+    def _persist_held_snapshots(self):
+        """把 ring 模式暂存在内存中的 before_click 快照落盘"""
+        for click_seq, publisher_id, html in self.capture.release():
+            html_path = self._write(self._put_snapshot, html, click_seq, publisher_id, "before_click")
+            self._audit(
+                "snapshot_before_click",
+                click_seq=click_seq,
+                publisher_id=publisher_id,
+                html_path=html_path,
+                deferred=True,
+            )
     
+    def _fill_message(self, custom_message, publisher_id: str, msg: str) -> bool:
+        """把邀请信息写入输入框，返回是否以注入方式写入；注入的值未被接受或脚本出错时改为键盘输入"""
+        if self.input_mode == "inject":
+            try:
+                if custom_message.run_js(INJECT_MESSAGE_JS, msg):
+                    return True
+                reason = "value_rejected"
+            except Exception as e:
+                reason = f"{type(e).__name__}: {e}"
+            self._type_message(custom_message, publisher_id, msg, reason)
+            return False
+        custom_message.input(msg)
+        return False
+
+    def _type_message(self, custom_message, publisher_id: str, msg: str, reason: str):
+        """以键盘输入的方式重新写入邀请信息（先清空注入的值），耗时计入 invite.input_fallback"""
+        logger.debug(f"publisher ID: {publisher_id} 的邀请信息注入未被接受（{reason}），改为键盘输入")
+        self._audit("message_inject_fallback", click_seq=self._click_seq, publisher_id=publisher_id, reason=reason)
+        with self.metrics.timed("invite.input_fallback"):
+            custom_message.input(msg, clear=True)
+
     def refresh_tab(self):
         """重新获取当前浏览器标签页（不刷新页面）"""
-        self.tab = self.browser.latest_tab
+        if not self.pin_tab:
+            self.tab = self.browser.latest_tab
+
+    def _for_tab(self, tab) -> "AwinRPA":
+        """返回绑定到指定标签页的工作副本，与本实例共享 ID 集合、快照存储、后台写入与点击计数器"""
+        worker = copy.copy(self)
+        worker.tab = tab
+        worker.pin_tab = True
+        worker.last_publisher_rows = []
+        worker._last_invite_links = None
+        # 礼貌性间隔按标签页独立计算，全局速率由 run_parallel 的限速器控制
+        worker.invite_limiter = self.invite_limiter.fresh()
+        worker.page_limiter = self.page_limiter.fresh()
+        return worker
+
+    def _claim_publisher(self, publisher_id: str) -> bool:
+        """占用一个 publisher，已点击或正在其他标签页发送时返回 False"""
+        with self._claim_lock:
+            if publisher_id in self._clicked_publisher_ids or publisher_id in self._inflight_publisher_ids:
+                return False
+            self._inflight_publisher_ids.add(publisher_id)
+            return True
+
+    def _release_publisher(self, publisher_id: str):
+        with self._claim_lock:
+            self._inflight_publisher_ids.discard(publisher_id)
+
+    def _invite_history(self, since: float) -> list[float]:
+        """
+        since 之后成功发送邀请的时间，用于首次使用配额时回放令牌桶
+        合并 clicked 记录与审计日志中的 invite_sent_success（同一 publisher 只计一次）；
+        旧版文本文件导入的 clicked 记录没有真实的发送时间，records_since 不返回它们
+        """
+        sent = dict(self._clicked_publisher_ids.records_since(since))
+        for record in recent_events(self.paths.audit_log, "invite_sent_success", since):
+            if record.get("publisher_id"):
+                sent.setdefault(str(record["publisher_id"]), record["ts"])
+        return sorted(sent.values())
     
     def goto_page(self, url: str = None):
         """跳转到邀请页面"""
         target_url = url or self.DEFAULT_URL
         self.tab.get(target_url)
+        self.page_number = self._page_from_url(target_url)
+        self._listing = None
     
     def select_sector(self, *sectors: str):
         """选择筛选项目"""
         for sector in sectors:
             self.tab.ele(f'text={sector}').click()
+        # 筛选后列表回到第一页
+        self.filters.extend(sectors)
+        self.page_number = 1
+        self._listing = None
+
+    def _page_from_url(self, url: str | None) -> int:
+        """从 URL 的分页参数解析页码，未配置分页参数或不存在时视为第 1 页"""
+        if not self.PAGE_PARAM or not url:
+            return 1
+        value = dict(parse_qsl(urlsplit(url).query)).get(self.PAGE_PARAM, "1")
+        return int(value) if value.isdigit() and int(value) > 0 else 1
+
+    def _listing_key(self) -> str:
+        if self._listing is None:
+            url = self._page_context().get("url")
+            self._listing = listing_key(url, self.filters, self.PAGE_PARAM)
+            if self.PAGE_PARAM:
+                self.page_number = self._page_from_url(url)
+        return self._listing
+
+    def _observe_page(self, publisher_ids: list[str], full: bool = False):
+        """把当前页的 ID 指纹与是否已全部邀请写入分页索引"""
+        self.page_index.observe(self._listing_key(), self.page_number, publisher_ids, full=full)
+
+    def skip_exhausted_pages(self):
+        """
+        根据分页索引跳过从当前页起连续已全部邀请的页
+        跳转前先用当前页的内容校验索引，排序变化时索引作废、不跳页
+        """
+        key = self._listing_key()
+        target = self.page_index.first_open_page(key)
+        if target <= self.page_number:
+            return
+        rows = self.get_publisher_rows() or []
+        current_ids = list(dict.fromkeys(row.publisher_id for row in rows if row.publisher_id))
+        if not self.page_index.observe(key, self.page_number, current_ids):
+            return
+        target = self.page_index.first_open_page(key)
+        if target <= self.page_number:
+            return
+
+        from_page = self.page_number
+        logger.info(f"分页索引: 第 {from_page}~{target - 1} 页已全部邀请，直接跳到第 {target} 页")
+        if self.PAGE_PARAM:
+            self.tab.get(page_url(self._page_context().get("url"), target, self.PAGE_PARAM))
+            self.page_number = target
+        else:
+            # URL 不含页码时仍需在页面上加载经过的页，只是不发送邀请，因此不等待翻页礼貌间隔
+            while self.page_number < target:
+                link_page, link = self._page_link(target)
+                if link is not None:
+                    self._load_page(link, link_page, "page_link_clicked")
+                else:
+                    self.click_next_page(rate_limited=False)
+        self._audit("pages_skipped", listing=key, from_page=from_page, to_page=target)
+
+    def _page_link(self, target: int) -> tuple[int, object]:
+        """分页栏上当前页之后、不超过 target 的最大页码及其链接，没有时返回 (0, None)"""
+        if not self.PAGE_LINKS:
+            return 0, None
+        links = {}
+        for link in self.tab.eles(self.PAGE_LINKS, timeout=0):
+            text = (getattr(link, "text", "") or "").strip()
+            if text.isdigit() and self.page_number < int(text) <= target:
+                links[int(text)] = link
+        if not links:
+            return 0, None
+        page = max(links)
+        return page, links[page]
     
-    def get_publisher_ids(self) -> list[str]:
-        """获取所有 publisher ID"""
+    def get_publisher_rows(self) -> list[PublisherRow] | None:
+        """
+        一次 CDP 往返批量获取目录表格中每个邀请链接的 publisher 行数据
+        返回 None 表示批量抽取不可用（表格不存在或脚本执行失败），调用方应回退逐元素读取
+        """
+        if self.extract_mode == "html":
+            return parse_directory_html(self._safe_get_html())
+        try:
+            result = self.tab.run_js(DIRECTORY_ROWS_JS)
+        except Exception as e:
+            logger.debug(f"批量抽取目录表格失败，回退逐元素读取: {e}")
+            return None
+        if not isinstance(result, dict) or not isinstance(result.get("rows"), list):
+            return None
+        columns = column_map(result.get("headers") or [])
+        return [build_row(columns, raw) for raw in result["rows"] if isinstance(raw, dict)]
+
+    def _get_publisher_ids_raw(self) -> tuple[list[str], str]:
+        """返回 (原始 publisher ID 列表, 实际使用的抽取方式)"""
+        if self.extract_mode != "per_element":
+            rows = self.get_publisher_rows()
+            if rows is not None:
+                self.last_publisher_rows = rows
+                return [row.publisher_id for row in rows], self.extract_mode
+
         table = self.tab.ele('xpath=//*[@id="directoryResults"]/table')
         invite_links = table.eles('xpath:.//a[@data-publisherid]')
         publisher_ids_raw = [link.attr('data-publisherid') for link in invite_links]
+        # 逐元素模式没有行元数据，只保留 ID（邀请状态视为可邀请）
+        self.last_publisher_rows = [PublisherRow(publisher_id=pid or "") for pid in publisher_ids_raw]
+        self._last_invite_links = invite_links
+        return publisher_ids_raw, "per_element"
+
+    def get_publisher_ids(self) -> list[str]:
+        """获取所有 publisher ID"""
+        self._last_invite_links = None
+        with self.metrics.timed("get_publisher_ids"):
+            publisher_ids_raw, extract_mode = self._get_publisher_ids_raw()
         publisher_ids = [pid for pid in publisher_ids_raw if pid]
         publisher_ids = list(dict.fromkeys(publisher_ids))  # 去重且保留顺序
 
         self._fetch_seq += 1
-        new_ids = [pid for pid in publisher_ids if pid not in self._seen_publisher_ids]
-        self._seen_publisher_ids.update(publisher_ids)
-        _append_new_ids(SEEN_IDS_PATH, new_ids)
+        new_ids = self._seen_publisher_ids.add_many(publisher_ids)
+        self._write(self._seen_publisher_ids.flush)
 
         self._audit(
             "publisher_ids_fetched",
             fetch_seq=self._fetch_seq,
+            extract_mode=extract_mode,
             raw_count=len(publisher_ids_raw),
             unique_count=len(publisher_ids),
             publisher_ids=publisher_ids,
@@ -363,25 +920,118 @@ class AwinRPA:
         )
         return publisher_ids
     
+    def _resolve_invite_links(self, plan: PagePlan, row_count: int):
+        """一次性取回页面上的全部邀请链接元素，按下标挂到计划项上；数量或抽查的 ID 对不上时放弃（回退按 ID 查找）"""
+        links = self._last_invite_links
+        if links is None:
+            try:
+                table = self.tab.ele('css:#directoryResults table', timeout=2)
+                links = table.eles('css:a[data-publisherid]') if table else []
+            except Exception as e:
+                logger.debug(f"批量获取邀请链接失败，发送时按 ID 查找: {e}")
+                return
+        if len(links) != row_count:
+            logger.debug(f"邀请链接数量 {len(links)} 与目录行数 {row_count} 不一致，发送时按 ID 查找")
+            return
+        # 行数据与元素分两次读取，抽查首尾两项确认页面没有在中间发生变化
+        for item in {plan.work[0].index: plan.work[0], plan.work[-1].index: plan.work[-1]}.values():
+            try:
+                if links[item.index].attr("data-publisherid") != item.publisher_id:
+                    logger.debug("邀请链接与目录行不对应，发送时按 ID 查找")
+                    return
+            except Exception:
+                return
+        for item in plan.work:
+            item.link = links[item.index]
+
+    def plan_page(self, resolve_links: bool = True) -> PagePlan:
+        """
+        规划当前页的邀请：一次抽取目录表格，批量与已点击记录比对，
+        排除已点击、已邀请/不可用以及本次运行已失败的行，返回按页面顺序排列的计划；
+        resolve_links 时一次性取回待邀请行的邀请链接元素，发送时无需再按 ID 查找
+        """
+        publisher_ids = self.get_publisher_ids()
+        rows = self.last_publisher_rows
+        unclicked = set(self._clicked_publisher_ids.missing(publisher_ids))
+        plan = plan_rows(rows, unclicked, self._failed_publisher_ids)
+        if resolve_links and plan.work:
+            with self.metrics.timed("resolve_links"):
+                self._resolve_invite_links(plan, len(rows))
+        self._audit(
+            "page_planned",
+            fetch_seq=self._fetch_seq,
+            work_count=len(plan.work),
+            skipped=dict(Counter(plan.skipped.values())),
+            links_resolved=bool(plan.work) and plan.work[0].link is not None,
+        )
+        return plan
+
     def input_message(self, message: str):
         """在申请框里面填写申请信息"""
         self.tab.ele('#customMessage').input(message)
     
-    def click_next_page(self):
-        """点击下一页按钮"""
+    def click_next_page(self, rate_limited: bool = True):
+        """
+        点击下一页按钮，已是最后一页时抛出 DirectoryExhausted
+        rate_limited 为 False 时不等待翻页礼貌间隔（跳过已全部邀请的页）
+        """
+        next_button = self.tab.ele('#nextPage')
+        if not next_button:
+            raise DirectoryExhausted(self._page_context().get("url"))
+        if rate_limited:
+            with self.metrics.timed("next_page.rate_wait"):
+                self.page_limiter.acquire()
+        self._load_page(next_button, self.page_number + 1, "next_page_clicked")
+
+    def _load_page(self, button, page_number: int, event: str):
+        """点击翻页按钮或页码链接，等待新页面的表格加载后更新页码与检查点"""
         before_url = self._page_context().get("url")
-        self.tab.ele('#nextPage').click()
-        self.tab.wait.doc_loaded()
-        self.tab.wait(2, 4)
+        # 标记当前表格，等待它被新页面的表格替换，而不是固定 sleep
+        self.waiter.mark_table_stale(self.tab)
+        with self.waiter.stats.timed("next_page"), self.metrics.timed("next_page.load"):
+            button.click()
+            self.tab.wait.doc_loaded()
+            settled = self.waiter.table_replaced(self.tab)
+        self.page_number = page_number
         after_url = self._page_context().get("url")
-        self._audit("next_page_clicked", before_url=before_url, after_url=after_url)
+        self._audit(
+            event,
+            before_url=before_url,
+            after_url=after_url,
+            page_number=self.page_number,
+            settled=settled,
+        )
+        self._write(self.page_index.save)
+        self._save_checkpoint(after_url)
     
-    def send_invite_to_publisher(self, publisher_id: str, msg: str) -> bool:
+    def send_invite_to_publisher(self, publisher_id: str, msg: str, link=None) -> bool:
         """
         向单个 publisher 发送邀请
-        返回 True 表示成功，False 表示按钮不存在
+        link: 邀请计划中预先解析的邀请链接元素，为 None 时按 ID 查找
+        返回 True 表示成功，False 表示按钮不存在或某个阶段失败
+        失败时保存失败现场快照（失败阶段未保存过时），ring 模式下连同暂存的 before_click 快照一起落盘
+        设置了邀请配额时，今天的配额已用完则抛出 QuotaExhausted
         """
-        self._click_seq += 1
+        self._failure_captured = False
+        self._quota_ticket = None
+        try:
+            success = self._send_invite(publisher_id, msg, link)
+        finally:
+            # 还没有点击发送按钮就失败（或出错）的邀请退回配额
+            if self._quota_ticket is not None:
+                self.quota.refund(self._quota_ticket)
+                self._quota_ticket = None
+        if not success and not self._failure_captured:
+            html_fail = self._save_snapshot(publisher_id, "failed")
+            self._audit("snapshot_failed", click_seq=self._click_seq, publisher_id=publisher_id, html_path=html_fail)
+        return success
+
+    def _send_invite(self, publisher_id: str, msg: str, link=None) -> bool:
+        # 依次记录各阶段耗时（阶段名与失败审计中的 stage 一致）
+        sw = self.metrics.stopwatch("invite")
+        with self._claim_lock:
+            self._counters["click"] += 1
+            self._click_seq = self._counters["click"]
         clicked_before = publisher_id in self._clicked_publisher_ids
         self._audit(
             "invite_click_attempt",
@@ -390,17 +1040,19 @@ class AwinRPA:
             clicked_before=clicked_before,
         )
 
-        # 在点击前保存快照
+        # 在点击前保存快照（ring 模式只暂存在内存中，失败时才落盘）
         html_before = self._save_snapshot(publisher_id, "before_click")
-        self._audit(
-            "snapshot_before_click",
-            click_seq=self._click_seq,
-            publisher_id=publisher_id,
-            html_path=html_before,
-        )
+        if html_before is not None:
+            self._audit(
+                "snapshot_before_click",
+                click_seq=self._click_seq,
+                publisher_id=publisher_id,
+                html_path=html_before,
+            )
+        sw.lap("snapshot_before")
 
         # 查找对应的邀请按钮
-        invite_link = self.tab.ele(f'xpath=//a[@data-publisherid="{publisher_id}"]', timeout=2)
+        invite_link = link if link is not None else self.tab.ele(f'xpath=//a[@data-publisherid="{publisher_id}"]', timeout=2)
         if not invite_link:
             logger.warning(f"找不到 publisher ID: {publisher_id} 的邀请按钮，尝试重新获取页面元素")
             # 保存失败时的快照
@@ -422,12 +1074,28 @@ class AwinRPA:
                     publisher_id=publisher_id,
                     after_refresh=True,
                 )
+                sw.fail("locate_link")
                 return False
+        sw.lap("locate_link")
         
         logger.info(f"向 publisher ID: {publisher_id} 发送 invitation")
+        if self.quota is not None:
+            self._quota_ticket = self.quota.acquire()
+        else:
+            self.invite_limiter.acquire()
+        sw.lap("rate_wait")
 
         try:
-            invite_link.click()
+            try:
+                invite_link.click()
+            except Exception:
+                if link is None:
+                    raise
+                # 预先解析的元素句柄可能已失效（表格被局部刷新），按 ID 重新查找后再点击一次
+                invite_link = self.tab.ele(f'xpath=//a[@data-publisherid="{publisher_id}"]', timeout=2)
+                if not invite_link:
+                    raise
+                invite_link.click()
         except Exception as e:
             # 保存点击失败时的快照
             html_fail = self._save_snapshot(publisher_id, "click_failed")
@@ -444,7 +1112,9 @@ class AwinRPA:
                 },
                 html_path=html_fail,
             )
+            sw.fail("click_invite_link")
             return False
+        sw.lap("click_invite_link")
 
         # 输入邀请信息（等待弹窗/输入框真正出现，避免"按钮已失效但元素仍在"的情况）
         try:
@@ -460,8 +1130,10 @@ class AwinRPA:
                     error="customMessage_not_found",
                     html_path=html_fail,
                 )
+                sw.fail("wait_custom_message")
                 return False
-            custom_message.input(msg)
+            sw.lap("wait_custom_message")
+            injected = self._fill_message(custom_message, publisher_id, msg)
         except Exception as e:
             self._audit(
                 "invite_click_failed",
@@ -470,7 +1142,9 @@ class AwinRPA:
                 stage="input_message",
                 error=str(e),
             )
+            sw.fail("input_message")
             return False
+        sw.lap("input_message")
 
         # 等待 send invite 按钮可点击，然后点击
         try:
@@ -483,8 +1157,17 @@ class AwinRPA:
                     stage="wait_send_button",
                     error="send_button_not_found",
                 )
+                sw.fail("wait_send_button")
                 return False
-            send_btn.wait.clickable(timeout=10)
+            if injected and not send_btn.wait.clickable(timeout=self.INJECT_ACCEPT_TIMEOUT):
+                # 发送按钮没有随注入的值启用（页面校验依赖真实的键盘输入），改为键盘输入
+                self._type_message(custom_message, publisher_id, msg, "send_button_disabled")
+                injected = False
+            if not injected:
+                send_btn.wait.clickable(timeout=10)
+            sw.lap("wait_send_button")
+            # 点击发送按钮后无法确定邀请是否已发出，不再退回配额
+            self._quota_ticket = None
             send_btn.click()
         except Exception as e:
             self._audit(
@@ -494,7 +1177,9 @@ class AwinRPA:
                 stage="click_send_button",
                 error=str(e),
             )
+            sw.fail("click_send_button")
             return False
+        sw.lap("click_send_button")
 
         # 等待弹窗出现并关闭
         try:
@@ -507,9 +1192,13 @@ class AwinRPA:
                     stage="wait_popup_ok",
                     error="popup_ok_not_found",
                 )
+                sw.fail("wait_popup_ok")
                 return False
             popup_ok_btn.wait.displayed(timeout=10, raise_err=True)
+            sw.lap("wait_popup_ok")
             popup_ok_btn.click()
+            # 等待弹窗真正关闭后再继续，代替固定的 2~3 秒 sleep
+            self.waiter.popup_closed(self.tab)
         except Exception as e:
             self._audit(
                 "invite_click_failed",
@@ -518,64 +1207,552 @@ class AwinRPA:
                 stage="close_popup_ok",
                 error=str(e),
             )
+            sw.fail("close_popup_ok")
             return False
+        sw.lap("close_popup_ok")
 
         # 保存成功发送后的快照
         html_after = self._save_snapshot(publisher_id, "after_click")
+        sw.lap("snapshot_after")
         self._audit(
             "invite_sent_success",
             click_seq=self._click_seq,
             publisher_id=publisher_id,
             html_path=html_after,
         )
-        if publisher_id not in self._clicked_publisher_ids:
-            self._clicked_publisher_ids.add(publisher_id)
-            _append_new_ids(CLICKED_IDS_PATH, [publisher_id])
-        self.tab.wait(2, 3)
+        with self._claim_lock:
+            self._clicked_publisher_ids.add(publisher_id, self.message_name)
+        self._write(self._clicked_publisher_ids.flush)
+        sw.done()
+        if "first_invite_s" not in self.startup:
+            self._record_first_invite()
         return True
     
-    def run(self, invite_count: int, msg: str):
+    def run(self, invite_count: int, msg: str, message_name: str | None = None, resume: bool = False):
         """
         执行 RPA 主流程
-        invite_count: 需要发送的邀请数量
+        invite_count: 需要发送的邀请数量（恢复时为包含中断前已发送数量的总目标）
         msg: 申请信息内容
+        message_name: 邀请信息名称，随点击记录保存
+        resume: 从同一目录页、同一邀请信息的未完成检查点继续：恢复已发送数量与筛选条件，直接回到中断时的目录页
+        配置了评分规则时按分数从高到低发送（见 _invite_ranked），否则按页面顺序
+        浏览器断开等可恢复的错误按指数退避重连后从检查点位置继续（pin_tab 时标签页属于调用方，不重连）
+        设置了邀请配额时按配额发送，今天的配额用完后停止（quota_exhausted 为 True）
+        返回实际发送成功的邀请数量（恢复时包含中断前已发送的数量）
         """
-        sent_count = 0  # 已发送的邀请数量
+        self.message_name = message_name
+        restored = self._resumable_checkpoint(msg) if resume else None
+        self._start_run()
+        self._checkpoint = restored or Checkpoint(
+            invite_count, 0, message_hash(msg), message_name, extract_mode=self.extract_mode
+        )
+        checkpoint = self._checkpoint
+        checkpoint.invite_count = invite_count
+        if checkpoint.url is None:
+            # 首次保存检查点前就断线时，重连后回到调用方所在的目录页，而不是 DEFAULT_URL
+            checkpoint.url = self._page_context().get("url")
+            checkpoint.page_number, checkpoint.filters = self.page_number, list(self.filters)
+        # 连续重连次数，重连后有新的邀请成功即清零
+        attempts = 0
+        progress = checkpoint.sent_count
+        restore = restored is not None
+
+        try:
+            while True:
+                try:
+                    if restore and checkpoint.url:
+                        self._restore_position(checkpoint.url, checkpoint.page_number, checkpoint.filters)
+                    if self.scoring_rules is not None:
+                        self._invite_ranked(msg)
+                    else:
+                        self._invite_pages(msg)
+                    break
+                except transient_browser_errors() as e:
+                    if checkpoint.sent_count > progress:
+                        attempts, progress = 0, checkpoint.sent_count
+                    attempts += 1
+                    if self.pin_tab:
+                        raise
+                    if attempts > self.RECONNECT_ATTEMPTS:
+                        logger.error(f"浏览器连续 {self.RECONNECT_ATTEMPTS} 次重连后仍不可用，停止运行（可用 --resume 继续）")
+                        raise
+                    self._reconnect(attempts, e)
+                    restore = True
+            checkpoint.finished = True
+        except DirectoryExhausted:
+            logger.info("目录已到最后一页，没有更多可邀请的 publisher")
+            checkpoint.finished = True
+        except QuotaExhausted as e:
+            # 检查点保持未完成，配额恢复后可用 --resume 继续
+            logger.warning(f"{e}，停止运行")
+            self.quota_exhausted = True
+        finally:
+            self._save_checkpoint()
+            self._checkpoint = None
+            self._finish_run()
+
+        console.print(f"\n[bold green]✅ 已成功发送 {checkpoint.sent_count} 条邀请[/bold green]")
+        return checkpoint.sent_count
 
-        while sent_count < invite_count:
-            publisher_ids = self.get_publisher_ids()
+    def _invite_pages(self, msg: str):
+        """逐页发送邀请，直到检查点中的已发送数量达到目标；已是最后一页时抛出 DirectoryExhausted"""
+        checkpoint = self._checkpoint
+        template = compile_template(msg)
+        self.skip_exhausted_pages()
+        self._save_checkpoint(self._page_context().get("url"))
+        merchant_id = merchant_id_from_url(checkpoint.url)
+        while checkpoint.sent_count < checkpoint.invite_count:
+            self._check_memory()
+            plan = self.plan_page()
 
-            if not publisher_ids:
-                logger.info("当前页面没有可邀请的 publisher，尝试下一页")
+            # 当前页没有需要邀请的 publisher（已点击/已邀请/不可用/本次已失败），进入下一页
+            if not plan.work:
+                logger.info(f"当前页没有可邀请的 publisher（跳过 {len(plan.skipped)} 个），进入下一页")
+                self._observe_page(plan.publisher_ids, full=plan.complete)
                 self.click_next_page()
                 continue
 
-            logger.info(f"当前页面找到 {len(publisher_ids)} 个可邀请的 publisher")
-            console.print(f"\n[bold blue]📧 已发送 {sent_count}/{invite_count} 条邀请[/bold blue]")
+            self._observe_page(plan.publisher_ids)
 
-            # 逐个处理
-            found_new = False
-            for publisher_id in publisher_ids:
-                if sent_count >= invite_count:
+            logger.info(f"当前页面找到 {len(plan.work)} 个可邀请的 publisher（跳过 {len(plan.skipped)} 个）")
+            console.print(f"\n[bold blue]📧 已发送 {checkpoint.sent_count}/{checkpoint.invite_count} 条邀请[/bold blue]")
+
+            # 按计划逐个处理，处理完后重新规划本页
+            for item in plan.work:
+                if checkpoint.sent_count >= checkpoint.invite_count:
                     break
 
-                # 如果该 ID 已经点击过，跳过
-                if publisher_id in self._clicked_publisher_ids:
-                    logger.debug(f"publisher ID: {publisher_id} 已经点击过，跳过")
+                success = self.send_invite_to_publisher(
+                    item.publisher_id, template.render(item.row, merchant_id), link=item.link
+                )
+                if success:
+                    checkpoint.sent_count += 1
+                    self._save_checkpoint()
+                    console.print(f"[green]✅ 已发送 {checkpoint.sent_count}/{checkpoint.invite_count}[/green]")
+                else:
+                    self._failed_publisher_ids.add(item.publisher_id)
+
+    def _resumable_checkpoint(self, msg: str) -> Checkpoint | None:
+        """读取可用于恢复的检查点：未完成、邀请信息相同且与当前标签页是同一目录页，否则返回 None"""
+        checkpoint = self.checkpoints.load()
+        if checkpoint is None or checkpoint.finished:
+            logger.info("没有未完成的运行检查点，从头开始")
+            return None
+        if checkpoint.message_hash != message_hash(msg):
+            logger.warning("检查点使用的邀请信息与本次不同，忽略检查点、从头开始")
+            return None
+        if not self._same_directory(checkpoint.url, self._page_context().get("url")):
+            logger.warning(f"检查点属于其他目录页（{checkpoint.url}），忽略检查点、从头开始")
+            return None
+        logger.info(
+            f"从检查点恢复: 已发送 {checkpoint.sent_count}/{checkpoint.invite_count}，"
+            f"第 {checkpoint.page_number} 页，筛选条件 {checkpoint.filters or '无'}"
+        )
+        return checkpoint
+
+    def _restore_position(self, url: str, page_number: int, filters: list[str]):
+        """回到目录列表的第 page_number 页：打开 url（已在该页时不重复打开），重新应用筛选条件，再翻到该页"""
+        if self._page_context().get("url") != url or self.page_number != self._page_from_url(url):
+            self.goto_page(url)
+        if filters:
+            # 筛选条件通过点击页面应用，重新应用后列表回到第一页
+            self.filters = []
+            self.select_sector(*filters)
+        while self.page_number < page_number:
+            self.click_next_page()
+
+    def _invite_ranked(self, msg: str):
+        """
+        按评分顺序发送邀请：扫描从当前页起 window 页的可邀请行并评分，取分数最高的（不超过剩余数量）
+        按所在页分组发送（最高分所在的页先发，页内按分数顺序），发送失败的由后续高分补上；
+        窗口内没有候选后从窗口之后的页继续。低于 min_score 的 publisher 本次不邀请
+        """
+        from publisher_scoring import rank_rows
+
+        checkpoint = self._checkpoint
+        rules = self.scoring_rules
+        template = compile_template(msg)
+        self.skip_exhausted_pages()
+        self._save_checkpoint(self._page_context().get("url"))
+        merchant_id = merchant_id_from_url(checkpoint.url)
+        while checkpoint.sent_count < checkpoint.invite_count:
+            self._check_memory()
+            window_url, first_page = self._page_context().get("url"), self.page_number
+            filters = list(self.filters)
+            candidates: list[tuple[int, PublisherRow]] = []
+            exhausted = False
+            for offset in range(rules.window):
+                if offset:
+                    try:
+                        self.click_next_page()
+                    except DirectoryExhausted:
+                        exhausted = True
+                        break
+                # 元素句柄在离开本页后失效，发送时按 ID 查找
+                plan = self.plan_page(resolve_links=False)
+                self._observe_page(plan.publisher_ids, full=plan.complete)
+                candidates.extend((self.page_number, item.row) for item in plan.work)
+            last_page = self.page_number
+            rows = {row.publisher_id: row for _, row in candidates}
+
+            with self.metrics.timed("rank.score"):
+                ranked = rank_rows(candidates, rules)
+            logger.info(
+                f"评分窗口第 {first_page}~{last_page} 页: {len(candidates)} 个可邀请的 publisher，"
+                f"{len(ranked)} 个参与排序，最高分 {ranked['score'].max() if len(ranked) else '-'}"
+            )
+            pending = list(zip(ranked["publisher_id"], ranked["page"]))
+            while pending and checkpoint.sent_count < checkpoint.invite_count:
+                remaining = checkpoint.invite_count - checkpoint.sent_count
+                batch, pending = pending[:remaining], pending[remaining:]
+                by_page: dict[int, list[str]] = {}
+                for publisher_id, page in batch:
+                    by_page.setdefault(int(page), []).append(publisher_id)
+                for page, publisher_ids in by_page.items():
+                    self._goto_list_page(window_url, page, filters)
+                    console.print(f"\n[bold blue]📧 已发送 {checkpoint.sent_count}/{checkpoint.invite_count} 条邀请（第 {page} 页）[/bold blue]")
+                    for publisher_id in publisher_ids:
+                        if self.send_invite_to_publisher(publisher_id, template.render(rows[publisher_id], merchant_id)):
+                            checkpoint.sent_count += 1
+                            self._save_checkpoint()
+                            console.print(f"[green]✅ 已发送 {checkpoint.sent_count}/{checkpoint.invite_count}[/green]")
+                        else:
+                            self._failed_publisher_ids.add(publisher_id)
+
+            if checkpoint.sent_count >= checkpoint.invite_count:
+                break
+            if exhausted:
+                raise DirectoryExhausted(window_url)
+            # 窗口之后的页
+            self._goto_list_page(window_url, last_page, filters)
+            self.click_next_page()
+
+    def _goto_list_page(self, url: str, page: int, filters: list[str]):
+        """
+        在 url 所在的目录列表内移动到第 page 页
+        分页参数在 URL 中时直接打开；否则向后连续翻页，向前时从 url 重新打开后翻页
+        """
+        if page == self.page_number:
+            return
+        if self.PAGE_PARAM and not filters:
+            target = page_url(url, page, self.PAGE_PARAM)
+            self.goto_page(target)
+            self._save_checkpoint(target)
+            return
+        if page < self.page_number:
+            self._restore_position(url, page, filters)
+        while self.page_number < page:
+            self.click_next_page()
+
+    def _follow_list(self, url: str, page: int, filters: list[str]):
+        """
+        工作标签页移动到 url 所在目录列表的第 page 页
+        标签页还不在该目录页（新开或被回收）时先打开列表、应用筛选条件，之后在列表内向后翻页
+        """
+        if self._same_directory(self._page_context().get("url"), url):
+            self._goto_list_page(url, page, filters)
+        elif self.PAGE_PARAM and not filters:
+            self.goto_page(page_url(url, page, self.PAGE_PARAM))
+        else:
+            self._restore_position(url, page, filters)
+
+    def _save_checkpoint(self, url: str | None = None):
+        """把当前进度写入检查点（后台原子写入）；url 为当前目录页 URL，只在页面变化时传入"""
+        checkpoint = self._checkpoint
+        if checkpoint is None:
+            return
+        if url:
+            checkpoint.url = url
+        checkpoint.page_number = self.page_number
+        checkpoint.filters = list(self.filters)
+        checkpoint.updated = time.time()
+        self._write(self.checkpoints.save, copy.copy(checkpoint))
+
+    def _check_memory(self, workers: list["AwinRPA"] = ()):
+        """
+        长时间运行模式：每发送 check_every 次邀请采样当前标签页与各工作标签页，超过阈值的标签页被回收；
+        Python RSS 超限时先收缩进程内缓存，再回收当前标签页。只在页面之间调用（此时没有未使用的元素句柄）
+        """
+        guard = self.memory_guard
+        invites = self._counters["click"]
+        if guard is None or not guard.due(invites):
+            return
+        for rpa in (self, *workers):
+            with self.metrics.timed("memory.sample"):
+                sample = guard.measure(rpa.tab, invites)
+            reasons = guard.exceeded(sample, invites)
+            if rpa is not self:
+                reasons = [reason for reason in reasons if reason != "python_rss_mb"]
+            if not reasons:
+                continue
+            if "python_rss_mb" in reasons:
+                self._trim_caches()
+            # 工作标签页在下一页开始时自行打开目录页，其余（含 pin_tab 的单标签页运行）当场恢复位置
+            rpa._recycle_tab(reasons, sample, restore=rpa is self)
+            guard.recycled(invites, reasons)
+
+    def _recycle_tab(self, reasons: list[str], sample: MemorySample, restore: bool = True):
+        """
+        在新标签页打开当前目录页（恢复筛选条件与页码）后关闭旧标签页，丢弃旧标签页累积的 DOM、JS 堆与监听器
+        restore 为 False 时新标签页保持空白，由调用方自行打开目录页（并行工作标签页）
+        """
+        old = self.tab
+        url, page_number, filters = self._page_context().get("url"), self.page_number, list(self.filters)
+        logger.info(f"回收标签页（{', '.join(reasons)}）: {sample}")
+        with self.metrics.timed("memory.recycle_tab"):
+            self.tab = self.browser.new_tab()
+            self.last_publisher_rows = []
+            self._last_invite_links = None
+            if restore:
+                self._restore_position(url, page_number, filters)
+            self._policy_tabs.discard(getattr(old, "tab_id", None) or id(old))
+            try:
+                old.close()
+            except Exception as e:
+                logger.warning(f"关闭旧标签页失败: {e}")
+        self._audit("tab_recycled", reasons=reasons, page_number=page_number, **{
+            key: value for key, value in asdict(sample).items() if key != "ts"
+        })
+
+    def _trim_caches(self):
+        """收缩进程内缓存：ID 存储落盘并释放 SQLite 页缓存，清理分页索引中过期/超量的记录，回收循环引用"""
+        self._seen_publisher_ids.shrink_memory()
+        self._clicked_publisher_ids.shrink_memory()
+        self.page_index.compact()
+        gc.collect()
+
+    def _reconnect(self, attempt: int, error: Exception):
+        """
+        浏览器断开后按指数退避等待，丢弃失效的浏览器与标签页；下次使用时重新接管同一调试地址或启动新浏览器
+        断线期间的发送失败多半由断线导致，清空本次运行的失败记录以便重试
+        """
+        delay = min(self.RECONNECT_BASE_DELAY * 2 ** (attempt - 1), self.RECONNECT_MAX_DELAY)
+        reason = f"{type(error).__name__}: {error}"
+        logger.warning(f"浏览器连接中断（{reason}），{delay:.0f} 秒后第 {attempt} 次重连")
+        self._audit("browser_reconnect", attempt=attempt, delay_s=delay, error=reason, sent_count=self._checkpoint.sent_count)
+        with self.metrics.timed("browser.reconnect_wait"):
+            time.sleep(delay)
+        address = getattr(self._browser, "address", None)
+        with self._browser_lock:
+            if self._browser_options is None and address:
+                self._browser_options = browser_options().set_address(address)
+            self._browser = None
+            self._browser_future = None
+        self._tab = None
+        # 新连接上的标签页可能沿用旧的 tab_id，需要重新启用资源拦截
+        self._policy_tabs.clear()
+        self._failed_publisher_ids.clear()
+
+    def run_parallel(
+        self,
+        invite_count: int,
+        msg: str,
+        tabs: int = 2,
+        max_per_minute: float | None = None,
+        message_name: str | None = None,
+    ):
+        """
+        多标签页并行执行 RPA 主流程
+        当前标签页负责翻页与获取 publisher ID，另开 tabs 个标签页并行发送邀请；
+        工作标签页跟随当前标签页移动到同一页（见 _follow_list）：分页参数在 URL 中时直接打开，
+        否则与恢复检查点一样打开目录页、重新应用筛选条件后向后翻页
+        invite_count: 需要发送的邀请数量
+        msg: 申请信息内容
+        tabs: 并行发送的标签页数量
+        max_per_minute: 全局每分钟最多发送的邀请数，None 表示不限（设置了邀请配额时同时受配额限制）
+        message_name: 邀请信息名称，随点击记录保存
+        返回实际发送成功的邀请数量
+        """
+        self.message_name = message_name
+        self._start_run()
+        limiter = RateLimiter(max_per_minute)
+        template = compile_template(msg)
+        # 当前页可邀请的目录行，按 ID 渲染个性化邀请信息
+        rows: dict[str, PublisherRow] = {}
+        workers = [self._for_tab(self.browser.new_tab()) for _ in range(tabs)]
+        progress_lock = threading.Lock()
+        sent_count = 0
+        # 已发送 + 正在发送的数量，用于避免超发
+        reserved = 0
+        # 今天的配额已用完，各标签页不再领取新的 publisher
+        quota_error: QuotaExhausted | None = None
+
+        # 工作标签页以开始时的目录页 URL 为列表入口，按页码跟随当前标签页
+        list_url = self._page_context().get("url")
+
+        def work(worker: AwinRPA, page: int, filters: list[str], pending: queue.SimpleQueue):
+            nonlocal sent_count, reserved, quota_error
+            worker._follow_list(list_url, page, filters)
+            while True:
+                with progress_lock:
+                    if reserved >= invite_count or quota_error is not None:
+                        return
+                    reserved += 1
+                try:
+                    publisher_id = pending.get_nowait()
+                except queue.Empty:
+                    publisher_id = None
+                if publisher_id is None or not self._claim_publisher(publisher_id):
+                    with progress_lock:
+                        reserved -= 1
+                    if publisher_id is None:
+                        return
                     continue
 
-                found_new = True
-                success = self.send_invite_to_publisher(publisher_id, msg)
-                if success:
-                    sent_count += 1
-                    console.print(f"[green]✅ 已发送 {sent_count}/{invite_count}[/green]")
+                success = False
+                try:
+                    limiter.acquire()
+                    success = worker.send_invite_to_publisher(
+                        publisher_id, template.render(rows.get(publisher_id), merchant_id_from_url(list_url))
+                    )
+                except QuotaExhausted as e:
+                    with progress_lock:
+                        quota_error = quota_error or e
+                except Exception as e:
+                    logger.warning(f"标签页发送 publisher ID: {publisher_id} 时出错: {e}")
+                finally:
+                    self._release_publisher(publisher_id)
+                    with progress_lock:
+                        if success:
+                            sent_count += 1
+                            console.print(f"[green]✅ 已发送 {sent_count}/{invite_count}[/green]")
+                        else:
+                            reserved -= 1
+                            if quota_error is None:
+                                self._failed_publisher_ids.add(publisher_id)
 
-            # 如果当前页所有 ID 都已经点击过，进入下一页
-            if not found_new:
-                logger.info("当前页所有 ID 都已经点击过，进入下一页")
-                self.click_next_page()
+        try:
+            with ThreadPoolExecutor(max_workers=tabs, thread_name_prefix="awin-tab") as pool:
+                self.skip_exhausted_pages()
+                while sent_count < invite_count:
+                    # 工作标签页此时空闲，可以一并检查与回收
+                    self._check_memory(workers)
+                    # 元素句柄只属于当前标签页，工作标签页按 ID 查找
+                    plan = self.plan_page(resolve_links=False)
+                    self._observe_page(plan.publisher_ids)
+                    candidates = [item.publisher_id for item in plan.work]
+                    rows = {item.publisher_id: item.row for item in plan.work}
+                    if candidates:
+                        logger.info(f"当前页面找到 {len(candidates)} 个未邀请的 publisher，分配到 {tabs} 个标签页")
+                        console.print(f"\n[bold blue]📧 已发送 {sent_count}/{invite_count} 条邀请[/bold blue]")
+                        pending: queue.SimpleQueue = queue.SimpleQueue()
+                        for pid in candidates:
+                            pending.put(pid)
+                        futures = [
+                            pool.submit(work, worker, self.page_number, list(self.filters), pending) for worker in workers
+                        ]
+                        for future in futures:
+                            future.result()
+                        if quota_error is not None:
+                            raise quota_error
+                    else:
+                        logger.info(f"当前页没有可邀请的 publisher（跳过 {len(plan.skipped)} 个），进入下一页")
+                    failed = SKIP_FAILED in plan.skipped.values() or any(
+                        pid in self._failed_publisher_ids for pid in candidates
+                    )
+                    if not failed and not self._clicked_publisher_ids.missing(candidates):
+                        self._observe_page(plan.publisher_ids, full=True)
+                    if sent_count < invite_count:
+                        self.click_next_page()
+        except DirectoryExhausted:
+            logger.info("目录已到最后一页，没有更多可邀请的 publisher")
+        except QuotaExhausted as e:
+            logger.warning(f"{e}，停止运行")
+            self.quota_exhausted = True
+        finally:
+            for worker in workers:
+                try:
+                    worker.tab.close()
+                except Exception:
+                    pass
+            self._finish_run()
 
         console.print(f"\n[bold green]✅ 已成功发送 {sent_count} 条邀请[/bold green]")
+        return sent_count
+
+    def _start_run(self):
+        """清空上一次运行的阶段耗时与失败记录，按需开始实时显示"""
+        self._failed_publisher_ids.clear()
+        self.quota_exhausted = False
+        self._run_started = time.perf_counter()
+        self.metrics.reset()
+        if self.resource_policy is not None:
+            self.resource_policy.reset_stats()
+        # 上一次运行暂存的快照不再作为本次失败的现场
+        self.capture.release()
+        self.capture.reset_stats()
+        if self.memory_guard is not None:
+            self.memory_guard.reset_stats()
+        if self.live_metrics:
+            self.metrics.start_live(console)
+
+    def _finish_run(self):
+        """运行结束：清理快照、保存等待耗时记录并输出各阶段耗时，等待后台写入全部落盘"""
+        self.metrics.stop_live()
+        quota = self.quota.status() if self.quota is not None else None
+        self._write(
+            self.metrics.append_jsonl,
+            self.paths.metrics_jsonl,
+            extract_mode=self.extract_mode,
+            startup=dict(self.startup),
+            snapshots=self.capture.stats(),
+            **({"memory": self.memory_guard.stats()} if self.memory_guard is not None else {}),
+            **({"quota": quota} if quota is not None else {}),
+            **({"resources": self.resource_policy.stats()} if self.resource_policy is not None else {}),
+        )
+        self._write(self.metrics.write_prometheus, self.paths.metrics_prom)
+        # 按保留策略清理过期/超量的 HTML 快照
+        self._write(self.snapshot_store.prune)
+        self._write(self.waiter.stats.save)
+        self._write(self.page_index.save)
+        self._write(self._seen_publisher_ids.flush)
+        self._write(self._clicked_publisher_ids.flush)
+        self._write(self.audit_sink.close)
+        self._report_settle_times()
+        if self.resource_policy is not None:
+            stats = self.resource_policy.stats()
+            logger.info(f"资源拦截: 拦截 {sum(stats['blocked'].values())} 个请求 {stats['blocked']}, 放行 {sum(stats['allowed'].values())} 个")
+        snapshots = self.capture.stats()
+        logger.info(
+            f"HTML 快照（{snapshots['mode']}）: 取 DOM {snapshots.get('captured', 0)} 次 "
+            f"（{snapshots.get('captured_chars', 0) / 1e6:.1f} M 字符），直接落盘 {snapshots.get('persisted', 0)} 个，"
+            f"暂存后落盘 {snapshots.get('released', 0)} 个，暂存后丢弃 {snapshots.get('dropped', 0)} 个"
+        )
+        if self.memory_guard is not None:
+            memory = self.memory_guard.stats()
+            logger.info(
+                f"内存检查 {memory.get('checks', 0)} 次，回收标签页 {memory.get('recycles', 0)} 次，峰值 {memory['peak']}"
+            )
+        if quota is not None:
+            logger.info(
+                f"邀请配额: 最近一小时发送 {quota['sent_last_hour']} 次，今天 {quota['sent_today']}/{quota['per_day'] or '不限'}，"
+                f"可用令牌 {quota['tokens']}"
+            )
+        self._flush_writes()
+
+    def _report_settle_times(self):
+        """输出各阶段实际稳定耗时，与改用自适应等待前的固定 sleep 对比"""
+        fixed_sleep_ms = {"next_page": 3000, "next_page_settle": 3000, "popup_close": 2500}
+        for stage, summary in self.waiter.stats.summary().items():
+            before = fixed_sleep_ms.get(stage)
+            logger.info(
+                f"阶段 {stage}: {summary['count']} 次, p50 {summary['p50_ms']} ms, "
+                f"p95 {summary['p95_ms']} ms, max {summary['max_ms']} ms"
+                + (f" (原固定等待约 {before} ms)" if before else "")
+            )
+
+    def _flush_writes(self):
+        """排空后台写入队列，并输出从点击热路径上移走的耗时"""
+        if self.writer is None:
+            return
+        self.writer.flush()
+        stats = self.writer.stats()
+        invites = max(self._counters["click"], 1)
+        logger.info(
+            f"后台写入: {stats['completed']} 个任务完成, {stats['failed']} 个失败, "
+            f"移出热路径 {stats['busy_ms'] / invites:.1f} ms/邀请, "
+            f"背压阻塞 {stats['blocked_ms'] / invites:.1f} ms/邀请, 最大队列深度 {stats['max_depth']}"
+        )
 
 
 class AppUI:
@@ -584,6 +1761,7 @@ class AppUI:
     def __init__(self, rpa: AwinRPA):
         self.rpa = rpa
         self.message_manager = rpa.message_manager
+        self.selected_message_name: str | None = None
     
     def settings_mode(self):
         """设置模式 - 管理邀请信息"""
@@ -597,7 +1775,7 @@ class AppUI:
         while True:
             self.message_manager.display(messages)
             
-            action = questionary.select(
+            action = prompts.select(
                 "请选择操作:",
                 choices=[
                     "➕ 新增邀请信息",
@@ -633,7 +1811,7 @@ class AppUI:
         
         choices = [f"{i+1}. {msg['name']}" for i, msg in enumerate(messages)]
         
-        selection = questionary.select(
+        selection = prompts.select(
             "请选择要使用的邀请信息:",
             choices=choices
         ).ask()
@@ -644,6 +1822,7 @@ class AppUI:
         
         idx = int(selection.split(".")[0]) - 1
         selected_msg = messages[idx]
+        self.selected_message_name = selected_msg["name"]
         
         console.print(Panel(
             selected_msg["content"],
@@ -651,13 +1830,13 @@ class AppUI:
             border_style="cyan"
         ))
         
-        modify = questionary.confirm(
+        modify = prompts.confirm(
             "是否需要修改这条邀请信息?",
             default=False
         ).ask()
         
         if modify:
-            new_content = questionary.text(
+            new_content = prompts.text(
                 "请输入修改后的邀请信息 (支持多行):",
                 default=selected_msg["content"],
                 multiline=True
@@ -666,8 +1845,9 @@ class AppUI:
             if new_content is None:
                 console.print("[yellow]已取消修改[/yellow]")
                 return selected_msg["content"]
+            self.message_manager.check_placeholders(new_content)
             
-            save_option = questionary.select(
+            save_option = prompts.select(
                 "是否保存这次修改?",
                 choices=[
                     "仅本次使用 (不保存)",
@@ -681,20 +1861,21 @@ class AppUI:
                 self.message_manager.save(messages)
                 console.print(f"[green]✅ 已更新邀请信息: {selected_msg['name']}[/green]")
             elif save_option == "保存为新的邀请信息":
-                new_name = questionary.text(
+                new_name = prompts.text(
                     "请输入新邀请信息的名称:",
                     default=f"{selected_msg['name']} (修改版)"
                 ).ask()
                 if new_name:
                     messages.append({"name": new_name, "content": new_content})
                     self.message_manager.save(messages)
+                    self.selected_message_name = new_name
                     console.print(f"[green]✅ 已保存新邀请信息: {new_name}[/green]")
             
             return new_content
         
         return selected_msg["content"]
     
-    def get_user_input(self) -> tuple[int, str]:
+    def get_user_input(self) -> tuple[int, str, int]:
         """使用终端UI交互获取用户输入的参数"""
         console.print(Panel.fit(
             "[bold cyan]🤖 Awin RPA 自动化工具[/bold cyan]\n"
@@ -702,7 +1883,7 @@ class AppUI:
             border_style="cyan"
         ))
         
-        action = questionary.select(
+        action = prompts.select(
             "请选择操作:",
             choices=[
                 "🚀 开始执行 RPA",
@@ -719,7 +1900,7 @@ class AppUI:
             self.settings_mode()
             return self.get_user_input()
         
-        invite_count = questionary.text(
+        invite_count = prompts.text(
             "请输入要发送的邀请数量:",
             default="10",
             validate=lambda x: x.isdigit() and int(x) > 0 or "请输入有效的正整数"
@@ -729,13 +1910,24 @@ class AppUI:
             console.print("[yellow]已取消操作[/yellow]")
             exit(0)
         
+        tabs = prompts.text(
+            "请输入并行发送的标签页数量 (1 为单标签页顺序发送):",
+            default="1",
+            validate=lambda x: x.isdigit() and int(x) > 0 or "请输入有效的正整数"
+        ).ask()
+        
+        if tabs is None:
+            console.print("[yellow]已取消操作[/yellow]")
+            exit(0)
+        
         msg = self.select_message()
         
         console.print("\n[bold]📋 执行配置:[/bold]")
         console.print(f"  • 发送数量: [green]{invite_count}[/green]")
+        console.print(f"  • 并行标签页: [green]{tabs}[/green]")
         console.print(f"  • 消息内容: [dim]{msg[:50]}...[/dim]" if len(msg) > 50 else f"  • 消息内容: [dim]{msg}[/dim]")
         
-        confirm = questionary.confirm(
+        confirm = prompts.confirm(
             "\n确认开始执行?",
             default=True
         ).ask()
@@ -744,20 +1936,61 @@ class AppUI:
             console.print("[yellow]已取消操作[/yellow]")
             exit(0)
         
-        return int(invite_count), msg
+        return int(invite_count), msg, int(tabs)
     
-    def start(self):
-        """启动应用程序"""
-        invite_count, msg = self.get_user_input()
+    def resume(self) -> bool:
+        """从上次未完成的运行继续，没有可恢复的检查点时返回 False"""
+        checkpoint = self.rpa.checkpoints.load()
+        if checkpoint is None or checkpoint.finished or not checkpoint.url:
+            console.print("[yellow]没有未完成的运行可以恢复[/yellow]")
+            return False
+        message = next((m for m in self.message_manager.load() if m["name"] == checkpoint.message_name), None)
+        if message is None or message_hash(message["content"]) != checkpoint.message_hash:
+            console.print(f"[red]❌ 上次使用的邀请信息「{checkpoint.message_name}」已被修改或删除，无法恢复[/red]")
+            return False
+
+        console.print(Panel.fit(
+            f"[bold cyan]🔁 恢复运行[/bold cyan]\n"
+            f"邀请信息: {checkpoint.message_name}\n"
+            f"已发送: {checkpoint.sent_count}/{checkpoint.invite_count}\n"
+            f"目录页: 第 {checkpoint.page_number} 页",
+            border_style="cyan"
+        ))
+        self.rpa.start_browser(checkpoint.url)
+        self.selected_message_name = checkpoint.message_name
+        self.rpa.run(checkpoint.invite_count, message["content"], message_name=checkpoint.message_name, resume=True)
+        console.print("\n[bold green]✅ 执行完成![/bold green]")
+        return True
+
+    def start(self, resume: bool = False):
+        """启动应用程序；resume 为 True 时先尝试从上次未完成的运行继续"""
+        if resume and self.resume():
+            return
+        # 浏览器启动与目录页首屏加载在后台进行，与下面的交互式提示重叠
+        self.rpa.start_browser(self.rpa.DEFAULT_URL)
+        invite_count, msg, tabs = self.get_user_input()
         
         console.print("\n[bold green]🚀 开始执行 RPA...[/bold green]")
-        self.rpa.run(invite_count=invite_count, msg=msg)
+        if tabs > 1:
+            self.rpa.run_parallel(invite_count=invite_count, msg=msg, tabs=tabs, message_name=self.selected_message_name)
+        else:
+            self.rpa.run(invite_count=invite_count, msg=msg, message_name=self.selected_message_name)
         console.print("\n[bold green]✅ 执行完成![/bold green]")
 
 
 if __name__ == "__main__":
-    rpa = AwinRPA()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Awin 联盟目录自动邀请")
+    parser.add_argument("--resume", action="store_true", help="从上次中断的运行继续（恢复已发送数量、筛选条件与目录页位置）")
+    parser.add_argument("--block-resources", action="store_true", help="轻量页面模式：拦截图片/字体/媒体与统计跟踪请求")
+    args = parser.parse_args()
+
+    if args.block_resources:
+        RESOURCE_POLICY = ResourcePolicy()
+    configure_logging()
+    rpa = AwinRPA(lazy_browser=True)
     app = AppUI(rpa)
-    app.start()
+    app.start(resume=args.resume)
 
 
@@ -0,0 +1,168 @@
+"""
+长时间运行的内存守护
+
+连续运行数小时时，同一个目录页标签页反复打开/关闭邀请弹窗，DOM 节点、JS 堆与事件监听器不断累积。
+开启后（AwinRPA 的 memory_limits），每发送 check_every 次邀请在翻页/评分窗口之间采样一次：
+- 标签页: CDP Performance.getMetrics 的 JSHeapUsedSize、Nodes、JSEventListeners
+- Python 进程 RSS（安装了 psutil 时用 psutil，否则读 /proc/self/statm；都不可用时不检查）
+标签页指标超过阈值时，AwinRPA 在新标签页打开当前目录页（恢复筛选条件与页码）后关闭旧标签页；
+Python RSS 超过阈值时先收缩进程内缓存，再回收当前标签页。
+最近的采样保存在有界的 history 中，供基准输出内存曲线。
+"""
+import os
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import asdict, dataclass
+from functools import cache
+
+from loguru import logger
+
+# 指标名 -> CDP Performance.getMetrics 中的名称与换算系数
+TAB_METRICS = {
+    "tab_heap_mb": ("JSHeapUsedSize", 1 / 1024 / 1024),
+    "tab_nodes": ("Nodes", 1),
+    "tab_listeners": ("JSEventListeners", 1),
+}
+
+
+@dataclass
+class MemoryLimits:
+    # 每发送多少次邀请采样一次
+    check_every: int = 50
+    tab_heap_mb: float = 256
+    tab_nodes: int = 50_000
+    tab_listeners: int = 20_000
+    python_rss_mb: float = 1024
+    # 不论是否超过阈值，每发送这么多次邀请回收一次标签页；None 表示只按阈值回收
+    recycle_every: int | None = None
+    # 保留的最近采样数
+    history: int = 500
+
+    def __post_init__(self):
+        if self.check_every < 1 or self.history < 1:
+            raise ValueError("check_every 与 history 必须为正整数")
+        if self.recycle_every is not None and self.recycle_every < 1:
+            raise ValueError("recycle_every 必须为正整数或 None")
+
+
+@dataclass
+class MemorySample:
+    ts: float
+    invites: int
+    tab_heap_mb: float | None = None
+    tab_nodes: int | None = None
+    tab_listeners: int | None = None
+    python_rss_mb: float | None = None
+
+
+@cache
+def _rss_reader():
+    """返回读取当前进程 RSS（字节）的函数，都不可用时返回 None"""
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+    if psutil is not None:
+        process = psutil.Process()
+        return lambda: process.memory_info().rss
+    if os.path.exists("/proc/self/statm"):
+        page_size = os.sysconf("SC_PAGE_SIZE")
+
+        def read_statm() -> int:
+            with open("/proc/self/statm", "rb") as f:
+                return int(f.read().split()[1]) * page_size
+
+        return read_statm
+    return None
+
+
+def python_rss_mb() -> float | None:
+    reader = _rss_reader()
+    if reader is None:
+        return None
+    try:
+        return reader() / 1024 / 1024
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def tab_metrics(tab) -> dict[str, float]:
+    """标签页的 CDP Performance 指标 {名称: 值}；Performance.enable 可重复调用，每次采样前都执行一次"""
+    tab.run_cdp("Performance.enable")
+    result = tab.run_cdp("Performance.getMetrics") or {}
+    return {metric["name"]: metric["value"] for metric in result.get("metrics", [])}
+
+
+class MemoryGuard:
+    """按 MemoryLimits 决定何时采样、哪些指标超过阈值，并记录采样历史与回收统计（线程安全）"""
+
+    def __init__(self, limits: MemoryLimits):
+        self.limits = limits
+        self.history: deque[MemorySample] = deque(maxlen=limits.history)
+        self._lock = threading.Lock()
+        self._stats: Counter = Counter()
+        self._peaks: dict[str, float] = {}
+        # 上次采样/回收时的邀请计数，None 表示本次运行尚未开始计数
+        self._last_check: int | None = None
+        self._last_recycle: int | None = None
+
+    def due(self, invites: int) -> bool:
+        """是否到了采样时间（返回 True 时同时记为已采样）；invites 为单调递增的邀请计数"""
+        with self._lock:
+            if self._last_check is None:
+                self._last_check = self._last_recycle = invites
+                return False
+            if invites - self._last_check < self.limits.check_every:
+                return False
+            self._last_check = invites
+            return True
+
+    def measure(self, tab, invites: int) -> MemorySample:
+        sample = MemorySample(ts=time.time(), invites=invites, python_rss_mb=python_rss_mb())
+        try:
+            metrics = tab_metrics(tab)
+        except Exception as e:
+            logger.debug(f"读取标签页性能指标失败: {type(e).__name__}: {e}")
+            metrics = {}
+        for field, (name, scale) in TAB_METRICS.items():
+            if name in metrics:
+                value = metrics[name] * scale
+                setattr(sample, field, round(value, 1) if scale != 1 else int(value))
+        with self._lock:
+            self.history.append(sample)
+            self._stats["checks"] += 1
+            for field, value in asdict(sample).items():
+                if field not in ("ts", "invites") and value is not None:
+                    self._peaks[field] = max(self._peaks.get(field, value), value)
+        return sample
+
+    def exceeded(self, sample: MemorySample, invites: int) -> list[str]:
+        """超过阈值的指标名；到了 recycle_every 时包含 recycle_every"""
+        reasons = [
+            field for field in (*TAB_METRICS, "python_rss_mb")
+            if getattr(sample, field) is not None and getattr(sample, field) > getattr(self.limits, field)
+        ]
+        every = self.limits.recycle_every
+        with self._lock:
+            if every is not None and self._last_recycle is not None and invites - self._last_recycle >= every:
+                reasons.append("recycle_every")
+        return reasons
+
+    def recycled(self, invites: int, reasons: list[str]):
+        with self._lock:
+            self._last_recycle = invites
+            self._stats["recycles"] += 1
+            self._stats.update(f"over_{reason}" for reason in reasons)
+
+    def reset_stats(self):
+        with self._lock:
+            self.history.clear()
+            self._stats.clear()
+            self._peaks.clear()
+            self._last_check = self._last_recycle = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            last = asdict(self.history[-1]) if self.history else None
+            return {**self._stats, "peak": dict(self._peaks), "last": last}
@@ -0,0 +1,77 @@
+"""
+邀请信息模板
+
+邀请信息内容中可以使用占位符，发送时用目录表格中该 publisher 的行数据填充：
+  {publisher_name}  {publisher_id}  {sector}  {promotion_type}  {region}  {merchant_id}
+取值为空时使用默认值：{publisher_name|there} 在名称为空时输出 there（未给默认值时输出空字符串）。
+其余花括号内容原样保留。
+
+模板按内容编译一次（lru_cache）：字面量中的花括号转义后与占位符拼成一个 str.format 格式串，
+渲染只需按占位符取行字段再调用一次 format，每条在微秒级（见 benchmarks/bench_message_templates.py）。
+"""
+import re
+from functools import lru_cache
+
+from directory_parser import PublisherRow
+
+# 占位符 -> 从 (目录行, 商户 ID) 取值
+FIELDS = {
+    "publisher_name": lambda row, merchant_id: row.name if row is not None else "",
+    "publisher_id": lambda row, merchant_id: row.publisher_id if row is not None else "",
+    "sector": lambda row, merchant_id: row.sector if row is not None else "",
+    "promotion_type": lambda row, merchant_id: row.promotion_type if row is not None else "",
+    "region": lambda row, merchant_id: row.region if row is not None else "",
+    "merchant_id": lambda row, merchant_id: merchant_id,
+}
+
+_PLACEHOLDER = re.compile(r"\{(\w+)(?:\|([^{}]*))?\}")
+_MERCHANT_ID = re.compile(r"/merchant/(\d+)")
+
+
+class MessageTemplate:
+    """编译后的邀请信息模板"""
+
+    __slots__ = ("source", "fields", "_format", "_slots")
+
+    def __init__(self, source: str):
+        self.source = source
+        parts: list[str] = []
+        slots = []
+        last = 0
+        for match in _PLACEHOLDER.finditer(source):
+            name, default = match.group(1), match.group(2) or ""
+            if name not in FIELDS:
+                continue
+            parts.append(source[last:match.start()].replace("{", "{{").replace("}", "}}"))
+            parts.append("{}")
+            slots.append((FIELDS[name], default))
+            last = match.end()
+        parts.append(source[last:].replace("{", "{{").replace("}", "}}"))
+        self._format = "".join(parts)
+        self._slots = tuple(slots)
+        self.fields = tuple(dict.fromkeys(m.group(1) for m in _PLACEHOLDER.finditer(source) if m.group(1) in FIELDS))
+
+    @property
+    def personalized(self) -> bool:
+        return bool(self._slots)
+
+    def render(self, row: PublisherRow | None = None, merchant_id: str = "") -> str:
+        if not self._slots:
+            return self.source
+        return self._format.format(*[getter(row, merchant_id) or default for getter, default in self._slots])
+
+
+@lru_cache(maxsize=64)
+def compile_template(source: str) -> MessageTemplate:
+    return MessageTemplate(source)
+
+
+def unknown_placeholders(source: str) -> list[str]:
+    """内容中形如占位符但不受支持的名称（会原样输出），用于编辑时提示"""
+    return sorted({m.group(1) for m in _PLACEHOLDER.finditer(source) if m.group(1) not in FIELDS})
+
+
+def merchant_id_from_url(url: str | None) -> str:
+    """目录页 URL 中的商户 ID，取不到时返回空字符串"""
+    match = _MERCHANT_ID.search(url or "")
+    return match.group(1) if match else ""
@@ -0,0 +1,215 @@
+"""
+热路径分阶段耗时统计
+
+按阶段（如 invite.wait_custom_message、next_page.load）把耗时累积到固定分桶的直方图中，
+每次记录只做一次 bisect 与计数累加，不保存原始样本，开销可忽略。
+运行结束时导出为 JSONL 汇总（每次运行一行）与 Prometheus 文本格式（可供 node_exporter textfile 采集），
+运行期间可用 rich Live 实时显示各阶段表格。
+"""
+import json
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+from rich.console import Console
+from rich.live import Live
+from rich.table import Table
+
+# 1 ms 起按 1.5 倍递增到约 2 分钟，分位数按桶内线性插值估算（与 Prometheus histogram_quantile 一致）
+BUCKETS: tuple[float, ...] = tuple(round(0.001 * 1.5 ** i, 6) for i in range(30))
+
+
+class Histogram:
+    """固定分桶直方图，非线程安全（由 StageMetrics 加锁）"""
+
+    __slots__ = ("counts", "count", "sum", "min", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q: float) -> float | None:
+        if not self.count:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for i, n in enumerate(self.counts):
+            if n and cumulative + n >= rank:
+                lower = BUCKETS[i - 1] if i > 0 else 0.0
+                upper = BUCKETS[i] if i < len(BUCKETS) else self.max
+                value = lower + (upper - lower) * (rank - cumulative) / n
+                return min(max(value, self.min), self.max)
+            cumulative += n
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.sum / self.count * 1000, 1) if self.count else None,
+            "p50_ms": round(self.quantile(0.5) * 1000, 1) if self.count else None,
+            "p95_ms": round(self.quantile(0.95) * 1000, 1) if self.count else None,
+            "max_ms": round(self.max * 1000, 1) if self.count else None,
+            "total_s": round(self.sum, 3),
+        }
+
+
+class Stopwatch:
+    """顺序阶段计时：每次 lap 记录距上一次 lap 的耗时，done/fail 额外记录整体耗时"""
+
+    __slots__ = ("metrics", "prefix", "started", "_last")
+
+    def __init__(self, metrics: "StageMetrics", prefix: str):
+        self.metrics = metrics
+        self.prefix = prefix
+        self.started = self._last = time.perf_counter()
+
+    def lap(self, stage: str, outcome: str = "ok"):
+        now = time.perf_counter()
+        self.metrics.observe(f"{self.prefix}.{stage}", now - self._last, outcome)
+        self._last = now
+
+    def done(self):
+        self.metrics.observe(f"{self.prefix}.total", time.perf_counter() - self.started)
+
+    def fail(self, stage: str):
+        """记录失败的阶段，并以 error 结果记录整体耗时"""
+        self.lap(stage, "error")
+        self.metrics.observe(f"{self.prefix}.total", time.perf_counter() - self.started, "error")
+
+
+class StageMetrics:
+    """按 (阶段, 结果) 聚合的直方图集合，线程安全，可在多个标签页的工作副本间共享"""
+
+    def __init__(self):
+        self._histograms: dict[tuple[str, str], Histogram] = {}
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self._live: Live | None = None
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {}
+            self.started = time.time()
+
+    def observe(self, stage: str, seconds: float, outcome: str = "ok"):
+        key = (stage, outcome)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timed(self, stage: str):
+        """计时代码块，抛出异常时以 error 结果记录"""
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            yield
+            outcome = "ok"
+        finally:
+            self.observe(stage, time.perf_counter() - started, outcome)
+
+    def stopwatch(self, prefix: str) -> Stopwatch:
+        return Stopwatch(self, prefix)
+
+    def _snapshot(self) -> dict[tuple[str, str], Histogram]:
+        with self._lock:
+            snapshot = {}
+            for key, histogram in self._histograms.items():
+                copy = Histogram()
+                copy.counts = list(histogram.counts)
+                copy.count, copy.sum, copy.min, copy.max = histogram.count, histogram.sum, histogram.min, histogram.max
+                snapshot[key] = copy
+            return snapshot
+
+    def summary(self) -> dict[str, dict]:
+        """{阶段: {count, errors, mean_ms, p50_ms, p95_ms, max_ms, total_s}}，分位数只统计成功的样本"""
+        result: dict[str, dict] = {}
+        for (stage, outcome), histogram in sorted(self._snapshot().items()):
+            if outcome == "ok":
+                result[stage] = {**histogram.summary(), "errors": result.get(stage, {}).get("errors", 0)}
+            else:
+                result.setdefault(stage, {**Histogram().summary(), "errors": 0})["errors"] += histogram.count
+        return result
+
+    def to_prometheus(self, name: str = "awin_stage_seconds") -> str:
+        lines = [
+            f"# HELP {name} Latency of Awin RPA hot-path stages in seconds.",
+            f"# TYPE {name} histogram",
+        ]
+        for (stage, outcome), histogram in sorted(self._snapshot().items()):
+            labels = f'stage="{stage}",outcome="{outcome}"'
+            cumulative = 0
+            for bound, n in zip(BUCKETS, histogram.counts):
+                cumulative += n
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+            lines.append(f"{name}_sum{{{labels}}} {histogram.sum:.6f}")
+            lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+        lines.append("# HELP awin_metrics_updated_timestamp_seconds Time the metrics file was written.")
+        lines.append("# TYPE awin_metrics_updated_timestamp_seconds gauge")
+        lines.append(f"awin_metrics_updated_timestamp_seconds {time.time():.3f}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: Path):
+        """原子写入 Prometheus 文本格式文件"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(self.to_prometheus(), encoding="utf-8")
+        tmp.replace(path)
+
+    def append_jsonl(self, path: Path, **extra):
+        """追加一行本次运行的汇总"""
+        record = {
+            "ts": datetime.now(timezone.utc).isoformat(),
+            "duration_s": round(time.time() - self.started, 1),
+            **extra,
+            "stages": self.summary(),
+        }
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def table(self, title: str = "各阶段耗时") -> Table:
+        table = Table(title=title, title_justify="left")
+        table.add_column("阶段")
+        table.add_column("次数", justify="right")
+        table.add_column("失败", justify="right")
+        table.add_column("p50 ms", justify="right")
+        table.add_column("p95 ms", justify="right")
+        table.add_column("max ms", justify="right")
+        for stage, s in self.summary().items():
+            table.add_row(
+                stage, str(s["count"]), str(s["errors"] or ""),
+                *(f"{s[k]:.0f}" if s[k] is not None else "-" for k in ("p50_ms", "p95_ms", "max_ms")),
+            )
+        return table
+
+    def start_live(self, console: Console):
+        """在终端底部实时刷新阶段表格（后台线程每秒刷新 2 次），console.print 的输出显示在表格上方"""
+        if self._live is None:
+            self._live = Live(get_renderable=self.table, console=console, refresh_per_second=2)
+            self._live.start()
+
+    def stop_live(self):
+        if self._live is not None:
+            self._live.stop()
+            self._live = None
@@ -0,0 +1,128 @@
+"""
+目录分页索引
+
+按「目录 URL + 筛选条件」记录每一页的 publisher ID 指纹以及该页是否已全部邀请，
+下次运行时直接跳到第一个可能还有未邀请 publisher 的页面。
+某页重新访问时指纹与记录不一致，说明目录排序发生了变化，该页及之后的记录全部作废。
+保存时清理过期的页，并只保留最近访问的 max_listings 个目录列表，索引大小不随运行时间增长。
+"""
+import hashlib
+import json
+import threading
+import time
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from loguru import logger
+
+
+def fingerprint(publisher_ids: list[str]) -> str:
+    return hashlib.sha1("\n".join(publisher_ids).encode("utf-8")).hexdigest()[:16]
+
+
+def listing_key(url: str | None, filters: list[str] | tuple[str, ...] = (), page_param: str | None = None) -> str:
+    """目录列表的标识：去掉分页参数、查询参数排序后的 URL + 排序后的筛选条件"""
+    parts = urlsplit(url or "")
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k != page_param)
+    base = urlunsplit((parts.scheme, parts.netloc, parts.path.rstrip("/"), urlencode(query), ""))
+    return base + ("|" + ",".join(sorted(filters)) if filters else "")
+
+
+def page_url(url: str, page: int, page_param: str) -> str:
+    """把分页参数设置为 page 后的 URL"""
+    parts = urlsplit(url)
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k != page_param]
+    query.append((page_param, str(page)))
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), parts.fragment))
+
+
+class PageIndex:
+    """持久化的分页索引（JSON 文件），线程安全"""
+
+    def __init__(self, path: Path, max_age_days: float = 7, max_listings: int = 50):
+        self.path = Path(path)
+        self.max_age_days = max_age_days
+        self.max_listings = max_listings
+        self._lock = threading.Lock()
+        self._data: dict[str, dict] | None = None
+
+    def _load(self) -> dict[str, dict]:
+        if self._data is None:
+            try:
+                self._data = json.loads(self.path.read_text(encoding="utf-8")) if self.path.exists() else {}
+            except (json.JSONDecodeError, OSError):
+                logger.warning(f"分页索引 {self.path} 无法读取，重新建立")
+                self._data = {}
+        return self._data
+
+    def _pages(self, key: str) -> dict[str, dict]:
+        listing = self._load().setdefault(key, {"pages": {}})
+        return listing["pages"]
+
+    def first_open_page(self, key: str) -> int:
+        """从第 1 页起连续已全部邀请（且未过期）的页之后的第一页"""
+        cutoff = time.time() - self.max_age_days * 86400
+        with self._lock:
+            pages = self._pages(key)
+            page = 1
+            while (entry := pages.get(str(page))) and entry.get("full") and entry.get("ts", 0) >= cutoff:
+                page += 1
+            return page
+
+    def expected(self, key: str, page: int) -> str | None:
+        """返回某页记录的指纹"""
+        with self._lock:
+            entry = self._pages(key).get(str(page))
+            return entry.get("fp") if entry else None
+
+    def observe(self, key: str, page: int, publisher_ids: list[str], full: bool = False) -> bool:
+        """
+        记录某页当前的 ID 指纹与是否已全部邀请
+        返回 False 表示指纹与记录不一致（排序已变化），此时该页及之后的记录被作废
+        """
+        fp = fingerprint(publisher_ids)
+        with self._lock:
+            pages = self._pages(key)
+            entry = pages.get(str(page))
+            consistent = entry is None or entry.get("fp") == fp
+            if not consistent:
+                for stale in [p for p in pages if int(p) >= page]:
+                    del pages[stale]
+                logger.info(f"第 {page} 页内容与分页索引不一致，目录排序已变化，作废第 {page} 页及之后的记录")
+            # 同一页只会从「未完成」变为「已完成」，除非指纹变化
+            full = full or (consistent and entry is not None and entry.get("full", False))
+            pages[str(page)] = {"fp": fp, "full": full, "ts": time.time()}
+            return consistent
+
+    def invalidate(self, key: str):
+        with self._lock:
+            self._load().pop(key, None)
+
+    def compact(self):
+        """删除过期的页与没有记录的列表，按最近访问时间只保留 max_listings 个列表"""
+        cutoff = time.time() - self.max_age_days * 86400
+        with self._lock:
+            if self._data is None:
+                return
+            latest: dict[str, float] = {}
+            for key, listing in list(self._data.items()):
+                pages = listing.get("pages", {})
+                for page in [p for p, entry in pages.items() if entry.get("ts", 0) < cutoff]:
+                    del pages[page]
+                if pages:
+                    latest[key] = max(entry.get("ts", 0) for entry in pages.values())
+                else:
+                    del self._data[key]
+            for key in sorted(latest, key=latest.get)[:max(len(latest) - self.max_listings, 0)]:
+                del self._data[key]
+
+    def save(self):
+        self.compact()
+        with self._lock:
+            if self._data is None:
+                return
+            payload = json.dumps(self._data, ensure_ascii=False)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(payload, encoding="utf-8")
+        tmp.replace(self.path)
@@ -0,0 +1,88 @@
+"""
+交互式提示的延迟加载封装
+
+questionary（连同 prompt_toolkit）与 pyperclip 只在第一次显示提示/读取剪贴板时导入，
+脚本化运行与只导入 main 的场景不承担这部分启动开销。
+多行输入的提示文本补丁在第一次显示多行输入时才应用。
+"""
+import inspect
+
+from loguru import logger
+
+MULTILINE_INSTRUCTION = "模板输入完成后，先按 esc 再按 enter。保存当前模板。\n"
+
+_patched = False
+
+
+def _questionary():
+    import questionary
+    return questionary
+
+
+def _patch_multiline(questionary):
+    """
+    兼容性猴子补丁：尝试为 questionary 的多行输入替换默认提示文本
+    不同版本的 questionary 实现细节不同：有的在类上提供 INSTRUCTIONS，有的没有。
+    优先尝试修补模块内任意具有 INSTRUCTIONS 属性的类；若找不到则回退为包装 questionary.text
+    """
+    global _patched
+    if _patched:
+        return
+    _patched = True
+    try:
+        patched = False
+        for name, obj in inspect.getmembers(questionary.prompts.text):
+            if inspect.isclass(obj) and hasattr(obj, "INSTRUCTIONS"):
+                try:
+                    obj.INSTRUCTIONS = MULTILINE_INSTRUCTION
+                    patched = True
+                    break
+                except Exception:
+                    # 某些实现可能不允许写入，忽略并继续
+                    continue
+
+        if not patched:
+            # 回退：包装 questionary.text 工厂函数，在调用时为多行输入尝试传递 instruction 参数（如果支持）
+            _orig_text = questionary.text
+            def _patched_text(*args, **kwargs):
+                try:
+                    multiline = kwargs.get("multiline", False)
+                    if multiline:
+                        # 仅当调用方没有指定 instruction 时才注入自定义提示
+                        if "instruction" not in kwargs:
+                            kwargs["instruction"] = MULTILINE_INSTRUCTION
+                    return _orig_text(*args, **kwargs)
+                except TypeError:
+                    # 如果原函数不接受 instruction 参数，尝试移除并调用原函数
+                    #（这意味着无法通过该途径修改提示，保持原状）
+                    kwargs.pop("instruction", None)
+                    return _orig_text(*args, **kwargs)
+
+            questionary.text = _patched_text
+    except Exception:
+        # 任何意外不应阻止程序运行，记录并继续
+        try:
+            logger.warning("未能应用 questionary 多行提示的猴子补丁，继续以默认行为运行。")
+        except Exception:
+            pass
+
+
+def text(message: str, **kwargs):
+    questionary = _questionary()
+    if kwargs.get("multiline"):
+        _patch_multiline(questionary)
+    return questionary.text(message, **kwargs)
+
+
+def select(message: str, **kwargs):
+    return _questionary().select(message, **kwargs)
+
+
+def confirm(message: str, **kwargs):
+    return _questionary().confirm(message, **kwargs)
+
+
+def paste() -> str:
+    """读取剪贴板文本"""
+    import pyperclip
+    return pyperclip.paste()
@@ -0,0 +1,142 @@
+"""
+publisher 优先级评分
+
+把目录表格中若干页（评分窗口）的可邀请行转换为 DataFrame，按规则文件（scoring_rules.json，
+示例见 scoring_rules.example.json）向量化打分，AwinRPA.run 按分数从高到低发送邀请：
+- sector / promotion_type / region: {关键字: 分值}，该列文本包含关键字（不区分大小写）即加分，分值可为负
+- keywords: {关键字: 分值}，名称、行业、推广类型或地区中任一列包含关键字即加分（每个关键字最多计一次）
+- min_score: 低于该分数的 publisher 本次不邀请（不设置则全部参与排序）
+- window: 每次评分扫描的目录页数
+分类列先 factorize，只对不同取值匹配关键字，再按编码取回各行分数（分类列只有几十种取值），
+数万行的评分在毫秒级完成（见 benchmarks/bench_scoring.py）。
+pandas 只在评分时导入。
+"""
+import json
+from dataclasses import dataclass, field, fields
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from directory_parser import PublisherRow
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+# 按单元格取值打分的列（与 PublisherRow 字段同名）
+CATEGORY_COLUMNS = ("sector", "promotion_type", "region")
+# keywords 匹配的列；DISTINCT_COLUMNS 中的列各行取值基本不同，不做 factorize
+TEXT_COLUMNS = ("name", *CATEGORY_COLUMNS)
+DISTINCT_COLUMNS = ("name",)
+
+
+@dataclass
+class ScoringRules:
+    sector: dict[str, float] = field(default_factory=dict)
+    promotion_type: dict[str, float] = field(default_factory=dict)
+    region: dict[str, float] = field(default_factory=dict)
+    keywords: dict[str, float] = field(default_factory=dict)
+    min_score: float | None = None
+    window: int = 5
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ScoringRules":
+        unknown = sorted(set(data) - {f.name for f in fields(cls)})
+        if unknown:
+            raise ValueError(f"评分规则中有未知字段: {', '.join(unknown)}")
+        weights = {
+            name: {str(key).lower(): float(value) for key, value in (data.get(name) or {}).items()}
+            for name in (*CATEGORY_COLUMNS, "keywords")
+        }
+        rules = cls(
+            **weights,
+            min_score=float(data["min_score"]) if data.get("min_score") is not None else None,
+            window=int(data.get("window", 5)),
+        )
+        if rules.window < 1:
+            raise ValueError("评分规则的 window 必须为正整数")
+        return rules
+
+    @classmethod
+    def load(cls, path: Path) -> "ScoringRules | None":
+        """读取规则文件，文件不存在时返回 None（不评分，按页面顺序邀请）"""
+        try:
+            data = json.loads(Path(path).read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+        except json.JSONDecodeError as e:
+            raise ValueError(f"评分规则文件不是有效的 JSON: {path} ({e})") from None
+        return cls.from_dict(data)
+
+
+def rows_frame(rows: list[tuple[int, PublisherRow]]) -> "pd.DataFrame":
+    """[(页码, 目录行)] -> DataFrame，position 为行在窗口中的原始顺序"""
+    import pandas as pd
+
+    # 文本列用 object 存储，构造与 factorize 都比 StringDtype 快
+    frame = pd.DataFrame(
+        {column: [getattr(row, column) for _, row in rows] for column in ("publisher_id", *TEXT_COLUMNS)},
+        dtype=object,
+    )
+    frame.insert(1, "page", pd.array([page for page, _ in rows], dtype="int64"))
+    frame.insert(2, "position", range(len(rows)))
+    return frame
+
+
+def _hits(values: list[str], key: str) -> "np.ndarray":
+    """各个不同取值是否包含 key，末尾追加缺失值（factorize 编码 -1）的 False"""
+    import numpy as np
+
+    hits = np.zeros(len(values) + 1, dtype=bool)
+    hits[:-1] = np.fromiter((key in value for value in values), dtype=bool, count=len(values))
+    return hits
+
+
+def _distinct_values(column: "pd.Series", distinct: bool) -> tuple["np.ndarray | None", list[str]]:
+    """返回 (编码, 小写的不同取值)；distinct 为 True 时各行取值本就互不相同，不做 factorize，编码为 None"""
+    import pandas as pd
+
+    if distinct:
+        return None, [str(value).lower() for value in column]
+    codes, uniques = pd.factorize(column)
+    return codes, [str(value).lower() for value in uniques]
+
+
+def score_frame(frame: "pd.DataFrame", rules: ScoringRules) -> "pd.Series":
+    """
+    分类列先 factorize，只对几十种不同取值匹配关键字，再按编码展开到各行；
+    名称列每行不同，直接逐值匹配一次
+    """
+    import numpy as np
+    import pandas as pd
+
+    score = np.zeros(len(frame))
+    keyword_hits = {key: np.zeros(len(frame), dtype=bool) for key in rules.keywords}
+    for column in TEXT_COLUMNS:
+        weights = getattr(rules, column, None) or {}
+        if not weights and not keyword_hits:
+            continue
+        codes, values = _distinct_values(frame[column], distinct=column in DISTINCT_COLUMNS)
+
+        def expand(per_value: "np.ndarray") -> "np.ndarray":
+            return per_value[:-1] if codes is None else per_value[codes]
+
+        if weights:
+            per_value = np.zeros(len(values) + 1)
+            for key, weight in weights.items():
+                per_value += _hits(values, key) * weight
+            score += expand(per_value)
+        for key, hits in keyword_hits.items():
+            hits |= expand(_hits(values, key))
+    for key, weight in rules.keywords.items():
+        score += keyword_hits[key] * weight
+    return pd.Series(score, index=frame.index, name="score")
+
+
+def rank_rows(rows: list[tuple[int, PublisherRow]], rules: ScoringRules) -> "pd.DataFrame":
+    """评分并按分数从高到低排序（同分保持页面顺序），去掉低于 min_score 的行与窗口内重复的 publisher"""
+    frame = rows_frame(rows)
+    frame["score"] = score_frame(frame, rules)
+    if rules.min_score is not None:
+        frame = frame[frame["score"] >= rules.min_score]
+    frame = frame.sort_values("score", ascending=False, kind="stable")
+    return frame.drop_duplicates("publisher_id")
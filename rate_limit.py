@@ -0,0 +1,42 @@
+"""
+邀请发送限速
+
+多个标签页并行发送邀请时共享同一个限速器，保证全局发送速率不超过上限；
+也用作单个标签页上翻页/邀请之间的礼貌性最小间隔。
+"""
+import random
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    线程安全的最小间隔限速器
+    max_per_minute: 每分钟最多次数；min_interval: 两次之间的最小秒数（两者取更严格者）
+    jitter: 在间隔上随机增加的比例（0.3 表示 0~30%），避免请求节奏过于规律
+    """
+
+    def __init__(self, max_per_minute: float | None = None, min_interval: float | None = None, jitter: float = 0.0):
+        self.max_per_minute = max_per_minute
+        self.min_interval = min_interval
+        self.jitter = jitter
+        self.interval = max(60.0 / max_per_minute if max_per_minute else 0.0, min_interval or 0.0)
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def fresh(self) -> "RateLimiter":
+        """返回配置相同、状态独立的新限速器"""
+        return RateLimiter(self.max_per_minute, self.min_interval, self.jitter)
+
+    def acquire(self) -> float:
+        """阻塞直到获得下一个时隙，返回等待的秒数"""
+        if not self.interval:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval * (1 + random.uniform(0, self.jitter))
+        wait = slot - now
+        if wait > 0:
+            time.sleep(wait)
+        return wait
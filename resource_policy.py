@@ -0,0 +1,107 @@
+"""
+目录页资源拦截（轻量页面模式）
+
+AwinRPA 只读取目录表格并点击链接，图片、字体、媒体与统计/跟踪脚本都用不到，
+却会拖慢翻页后的 doc_loaded 等待，并在长时间运行中占用浏览器内存。
+ResourcePolicy 在标签页上通过 CDP Fetch 拦截请求：
+- block_types 中的资源类型（CDP ResourceType，如 Image、Font、Media）与匹配 deny 通配符的 URL 直接以 BlockedByClient 失败
+- 匹配 allow 通配符的 URL 始终放行（优先于 block_types 与 deny）
+只有命中拦截条件的请求才会暂停并回调，文档、XHR 与脚本（除 deny 命中的）不经过这里。
+启动新浏览器时还可设置无头模式与磁盘缓存上限；接管已运行的浏览器时这两项不生效。
+"""
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from fnmatch import fnmatchcase
+
+from loguru import logger
+
+# 常见统计与跟踪服务
+DEFAULT_DENY = (
+    "*://*.google-analytics.com/*",
+    "*://*.googletagmanager.com/*",
+    "*://*.doubleclick.net/*",
+    "*://*.facebook.net/*",
+    "*://*.facebook.com/tr*",
+    "*://*.hotjar.com/*",
+    "*://*.clarity.ms/*",
+    "*://*.newrelic.com/*",
+    "*://*.nr-data.net/*",
+)
+
+
+@dataclass
+class ResourcePolicy:
+    block_types: frozenset[str] = frozenset({"Image", "Font", "Media"})
+    deny: tuple[str, ...] = DEFAULT_DENY
+    allow: tuple[str, ...] = ()
+    # None 表示沿用浏览器启动选项
+    headless: bool | None = None
+    # 磁盘缓存上限（MB），None 表示不限制
+    cache_size_mb: int | None = 64
+    # 各资源类型被拦截/放行的次数，在所有标签页间累计
+    blocked: Counter = field(default_factory=Counter, init=False, repr=False)
+    allowed: Counter = field(default_factory=Counter, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def apply_options(self, co):
+        """把无头模式与缓存上限写入 ChromiumOptions（只对新启动的浏览器生效）"""
+        if self.headless is not None:
+            co.headless(self.headless)
+        if self.cache_size_mb is not None:
+            co.set_argument("--disk-cache-size", str(self.cache_size_mb * 1024 * 1024))
+            co.set_argument("--media-cache-size", str(self.cache_size_mb * 1024 * 1024))
+        return co
+
+    def is_allowed(self, url: str) -> bool:
+        return any(fnmatchcase(url, pattern) for pattern in self.allow)
+
+    def _patterns(self) -> list[dict]:
+        patterns = [{"urlPattern": "*", "resourceType": t, "requestStage": "Request"} for t in sorted(self.block_types)]
+        patterns += [{"urlPattern": p, "requestStage": "Request"} for p in self.deny]
+        return patterns
+
+    def attach(self, tab) -> bool:
+        """在标签页上启用拦截，返回是否成功（失败只记录警告，不影响正常浏览）"""
+        patterns = self._patterns()
+        if not patterns:
+            return False
+        driver = getattr(tab, "driver", None)
+        if driver is None:
+            return False
+
+        def on_paused(**params):
+            # 在 DrissionPage 的事件线程中执行，异常会终止该线程，必须全部捕获
+            try:
+                url = params.get("request", {}).get("url", "")
+                kind = params.get("resourceType", "Other")
+                if self.is_allowed(url):
+                    driver.run("Fetch.continueRequest", requestId=params["requestId"])
+                    with self._lock:
+                        self.allowed[kind] += 1
+                else:
+                    driver.run("Fetch.failRequest", requestId=params["requestId"], errorReason="BlockedByClient")
+                    with self._lock:
+                        self.blocked[kind] += 1
+            except Exception as e:
+                logger.debug(f"资源拦截回调出错: {e}")
+
+        try:
+            driver.set_callback("Fetch.requestPaused", on_paused)
+            result = driver.run("Fetch.enable", patterns=patterns)
+        except Exception as e:
+            logger.warning(f"启用资源拦截失败: {e}")
+            return False
+        if isinstance(result, dict) and "error" in result:
+            logger.warning(f"启用资源拦截失败: {result['error']}")
+            return False
+        return True
+
+    def reset_stats(self):
+        with self._lock:
+            self.blocked.clear()
+            self.allowed.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"blocked": dict(self.blocked), "allowed": dict(self.allowed)}
@@ -0,0 +1,335 @@
+"""
+多商户邀请调度
+
+在一个浏览器中同时为多个商户发送邀请：
+- 每个商户的 ID 存储、审计日志、HTML 快照、分页索引与耗时统计放在 MERCHANT_STATE_ROOT/<商户 ID>/ 下，互不混用
+- 浏览器中开 --tabs 个标签页作为共享的标签页池，每个标签页依次为不同商户执行一轮（--slice 条邀请），
+  商户按轮转顺序分配，同一时刻一个商户只在一个标签页上运行，因此各商户的礼貌性间隔仍然有效，
+  不同商户的邀请在多个标签页上并行，提高总吞吐
+- daily_quota 为商户每天（本地时间）最多发送的邀请数，按该商户 clicked 记录中今天写入的数量计算，
+  重复运行调度器不会超出配额
+- 商户下一轮从上一轮结束时的目录页继续（未配置分页参数时按记录的页码重新翻到该页）
+
+任务文件为 JSON Lines，每行一个商户：
+  {"merchant": 45307, "count": 100, "daily_quota": 50, "template": "默认邀请信息",
+   "invite_interval": 2, "page_interval": 1, "name": "Giftlab"}
+结束时在标准输出最后一行输出 JSON 汇总，退出码与 batch_run.py 相同（达到当天配额的商户算作发送不足）。
+
+用法: python scheduler.py jobs.jsonl [--tabs 3] [--slice 5] [--summary summary.json] [--headless] [--block-resources]
+"""
+import argparse
+import hashlib
+import json
+import re
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+
+from loguru import logger
+
+import main as rpa_main
+from batch_run import (
+    EXIT_CONFIG,
+    EXIT_ERROR,
+    EXIT_INTERRUPTED,
+    EXIT_OK,
+    EXIT_PARTIAL,
+    JobError,
+    directory_url,
+    resolve_message,
+)
+from invite_quota import today_start
+
+# 商户状态: running 仍有待发送；done 达到 count；quota 达到当天配额；exhausted 目录已无可邀请的 publisher
+FINAL_STATUSES = ("done", "quota", "exhausted", "error", "interrupted")
+
+
+@dataclass
+class MerchantJob:
+    merchant: str
+    count: int
+    daily_quota: int | None = None
+    template: str | None = None
+    invite_interval: float = 2.0
+    page_interval: float = 1.0
+    name: str | None = None
+
+    @property
+    def url(self) -> str:
+        return directory_url(self.merchant)
+
+    @property
+    def key(self) -> str:
+        """状态目录名：URL 中的商户 ID，取不到时用 URL 的摘要"""
+        match = re.search(r"/merchant/(\d+)", self.url)
+        return match.group(1) if match else hashlib.sha1(self.url.encode("utf-8")).hexdigest()[:12]
+
+
+def load_jobs(path: Path) -> list[MerchantJob]:
+    known = set(MerchantJob.__dataclass_fields__)
+    try:
+        lines = path.read_text(encoding="utf-8").splitlines()
+    except OSError as e:
+        raise JobError(f"无法读取任务文件: {e}") from None
+    jobs = []
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        label = f"{path}:{number}"
+        try:
+            values = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise JobError(f"{label}: 不是有效的 JSON ({e})") from None
+        if not isinstance(values, dict):
+            raise JobError(f"{label}: 每行应为一个 JSON 对象")
+        unknown = sorted(set(values) - known)
+        if unknown:
+            raise JobError(f"{label}: 未知字段 {', '.join(unknown)}")
+        try:
+            job = MerchantJob(
+                merchant=str(values["merchant"]),
+                count=int(values["count"]),
+                daily_quota=int(values["daily_quota"]) if values.get("daily_quota") is not None else None,
+                template=values.get("template"),
+                invite_interval=float(values.get("invite_interval", 2.0)),
+                page_interval=float(values.get("page_interval", 1.0)),
+                name=values.get("name"),
+            )
+        except (KeyError, TypeError, ValueError) as e:
+            raise JobError(f"{label}: 字段有误 ({e})") from None
+        if job.count <= 0:
+            raise JobError(f"{label}: count 必须为正整数")
+        directory_url(job.merchant)
+        jobs.append(job)
+    if not jobs:
+        raise JobError(f"任务文件中没有任务: {path}")
+    keys = [job.key for job in jobs]
+    duplicated = sorted({key for key in keys if keys.count(key) > 1})
+    if duplicated:
+        raise JobError(f"同一商户出现多次: {', '.join(duplicated)}")
+    return jobs
+
+
+class MerchantRun:
+    """一个商户在本次调度中的状态"""
+
+    def __init__(self, job: MerchantJob, rpa: rpa_main.AwinRPA, message_name: str, msg: str):
+        self.job = job
+        self.rpa = rpa
+        self.message_name = message_name
+        self.msg = msg
+        self.sent = 0
+        self.slices = 0
+        self.status = "running"
+        self.error: str | None = None
+        self.busy = False
+        # 上一轮结束时所在的目录页 URL、页码与筛选条件，下一轮从这里继续
+        # （未配置分页参数时 URL 中没有页码，需要按页码重新翻页）
+        self.resume_url = job.url
+        self.resume_page = 1
+        self.resume_filters: list[str] = []
+        # 上一轮使用的标签页
+        self.tab = None
+
+    def remaining(self) -> int:
+        left = self.job.count - self.sent
+        if self.job.daily_quota is not None:
+            used_today = self.rpa._clicked_publisher_ids.count_since(today_start())
+            left = min(left, self.job.daily_quota - used_today)
+        return max(left, 0)
+
+    def summary(self) -> dict:
+        return {
+            "merchant": self.job.merchant,
+            "name": self.job.name,
+            "state_dir": str(rpa_main.MERCHANT_STATE_ROOT / self.job.key),
+            "count": self.job.count,
+            "daily_quota": self.job.daily_quota,
+            "template": self.message_name,
+            "sent": self.sent,
+            "slices": self.slices,
+            "status": self.status,
+            "error": self.error,
+        }
+
+
+class FairScheduler:
+    """按轮转顺序把空闲、仍有待发送的商户分配给空闲标签页"""
+
+    def __init__(self, runs: list[MerchantRun]):
+        self._order = deque(runs)
+        self._cond = threading.Condition()
+        self.stopped = False
+
+    def _settle(self, run: MerchantRun):
+        if run.status == "running" and run.remaining() == 0:
+            run.status = "done" if run.sent >= run.job.count else "quota"
+
+    def acquire(self) -> MerchantRun | None:
+        """取下一个可运行的商户；暂时没有但仍有商户在其他标签页运行时等待，全部结束时返回 None"""
+        with self._cond:
+            while not self.stopped:
+                for _ in range(len(self._order)):
+                    run = self._order[0]
+                    self._order.rotate(-1)
+                    if run.busy:
+                        continue
+                    self._settle(run)
+                    if run.status == "running":
+                        run.busy = True
+                        return run
+                if not any(run.busy for run in self._order):
+                    return None
+                self._cond.wait()
+            return None
+
+    def release(self, run: MerchantRun):
+        with self._cond:
+            run.busy = False
+            self._settle(run)
+            self._cond.notify_all()
+
+    def stop(self):
+        with self._cond:
+            self.stopped = True
+            self._cond.notify_all()
+
+
+def serve(run: MerchantRun, tab, slice_size: int):
+    """在 tab 上为商户执行一轮，返回这一轮结束时使用的标签页（内存守护回收后是新标签页，调用方用它替换旧标签页）"""
+    rpa = run.rpa
+    rpa.tab = tab
+    # 标签页换过或被其他商户使用过时，与恢复检查点一样回到上一轮结束的页（打开目录页、应用筛选条件、翻页）
+    if tab is not run.tab or rpa._page_context().get("url") != run.resume_url:
+        rpa.goto_page(run.resume_url)
+        rpa._restore_position(run.resume_url, run.resume_page, run.resume_filters)
+    run.tab = tab
+    want = min(slice_size, run.remaining())
+    try:
+        sent = rpa.run(want, run.msg, message_name=run.message_name)
+    except Exception as e:
+        logger.exception(f"商户 {run.job.name or run.job.merchant} 运行出错")
+        run.sent += rpa.metrics.summary().get("invite.total", {}).get("count") or 0
+        run.status = "error"
+        run.error = f"{type(e).__name__}: {e}"
+    else:
+        run.sent += sent
+        run.slices += 1
+        run.resume_url = rpa._page_context().get("url") or run.resume_url
+        run.resume_page = rpa.page_number
+        run.resume_filters = list(rpa.filters)
+        # run 只在目录已到最后一页或配额用完时提前返回
+        if sent < want:
+            run.status = "quota" if rpa.quota_exhausted else "exhausted"
+    run.tab = rpa.tab
+    return run.tab
+
+
+def exit_code_of(runs: list[MerchantRun]) -> int:
+    statuses = {run.status for run in runs}
+    if "interrupted" in statuses:
+        return EXIT_INTERRUPTED
+    if "error" in statuses:
+        return EXIT_ERROR
+    # 与 batch_run 一致：配额用完而提前结束的商户同样算作发送不足
+    if "exhausted" in statuses or "quota" in statuses:
+        return EXIT_PARTIAL
+    return EXIT_OK
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("jobs", type=Path, help="商户任务文件（JSON Lines）")
+    parser.add_argument("--tabs", type=int, default=2, help="共享标签页池的大小（同时运行的商户数）")
+    parser.add_argument("--slice", type=int, default=5, help="每个商户每轮发送的邀请数")
+    parser.add_argument("--summary", type=Path, help="把 JSON 汇总另存为文件")
+    parser.add_argument("--browser-address", help="接管已启动的 Chromium 调试地址，如 127.0.0.1:9222")
+    parser.add_argument("--user-data-path", type=Path, help="新启动浏览器使用的用户数据目录（沿用登录状态）")
+    parser.add_argument("--headless", action="store_true", help="新启动的浏览器使用无头模式")
+    parser.add_argument("--block-resources", action="store_true", help="轻量页面模式：拦截图片/字体/媒体与统计跟踪请求")
+    args = parser.parse_args()
+
+    try:
+        if args.tabs <= 0 or args.slice <= 0:
+            raise JobError("--tabs 与 --slice 必须为正整数")
+        jobs = load_jobs(args.jobs)
+        messages = rpa_main.MessageManager().load()
+        templates = [resolve_message(messages, job.template) for job in jobs]
+    except JobError as e:
+        print(f"配置错误: {e}", file=sys.stderr)
+        sys.exit(EXIT_CONFIG)
+
+    rpa_main.configure_logging()
+    if args.browser_address:
+        rpa_main.BROWSER_ADDRESS = args.browser_address
+    if args.user_data_path:
+        rpa_main.BROWSER_USER_DATA_PATH = args.user_data_path
+    co = rpa_main.browser_options()
+    if args.headless:
+        co.headless(True)
+    if args.block_resources:
+        rpa_main.RESOURCE_POLICY = rpa_main.ResourcePolicy()
+
+    started = time.perf_counter()
+    summary = {"started": datetime.now(timezone.utc).isoformat()}
+    # 第一个商户的实例负责启动浏览器，其余商户共用同一个浏览器、资源拦截记录与页面稳定耗时记录
+    # （耗时记录与商户无关，共用一个实例才不会各自保存、互相覆盖 settle_times.json）
+    runs: list[MerchantRun] = []
+    for job, (message_name, msg) in zip(jobs, templates):
+        rpa = rpa_main.AwinRPA(
+            browser=runs[0].rpa.browser if runs else None,
+            browser_options=co,
+            invite_interval=job.invite_interval,
+            page_interval=job.page_interval,
+            live_metrics=False,
+            state_dir=rpa_main.MERCHANT_STATE_ROOT / job.key,
+        )
+        rpa.pin_tab = True
+        if runs:
+            rpa._policy_tabs = runs[0].rpa._policy_tabs
+            rpa.waiter = runs[0].rpa.waiter
+        runs.append(MerchantRun(job, rpa, message_name, msg))
+    browser = runs[0].rpa.browser
+    tabs = [browser.latest_tab] + [browser.new_tab() for _ in range(min(args.tabs, len(runs)) - 1)]
+    scheduler = FairScheduler(runs)
+
+    def worker(tab):
+        while (run := scheduler.acquire()) is not None:
+            try:
+                tab = serve(run, tab, args.slice)
+            finally:
+                scheduler.release(run)
+
+    pool = ThreadPoolExecutor(max_workers=len(tabs), thread_name_prefix="awin-merchant")
+    futures = [pool.submit(worker, tab) for tab in tabs]
+    try:
+        for future in futures:
+            future.result()
+    except KeyboardInterrupt:
+        # 正在运行的一轮结束后停止，不再分配新的一轮
+        scheduler.stop()
+        for run in runs:
+            if run.status == "running":
+                run.status = "interrupted"
+        pool.shutdown(wait=True)
+    else:
+        pool.shutdown()
+
+    summary["duration_s"] = round(time.perf_counter() - started, 1)
+    summary["sent"] = sum(run.sent for run in runs)
+    summary["invites_per_minute"] = round(summary["sent"] / max(summary["duration_s"], 0.1) * 60, 1)
+    summary["merchants"] = [run.summary() for run in runs]
+    summary["exit_code"] = exit_code_of(runs)
+    if args.summary:
+        args.summary.write_text(json.dumps(summary, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(json.dumps(summary, ensure_ascii=False))
+    sys.exit(summary["exit_code"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+"""
+内容寻址的 HTML 快照存储
+
+替代 AwinRPA._dump_html 每次点击都写一份完整未压缩 HTML 的做法：
+- 以 HTML 内容的 sha256 作为 key，相同内容只存一份（去重）
+- gzip 压缩存储
+- 可选地把 after_click 等阶段存为相对 before_click 的差量（公共前后缀 + 中间片段）；
+  差量基准总是完整对象，差量链深度不超过 1
+- index.jsonl 记录 run/click_seq/publisher_id/phase -> key 的映射
+- 按总大小/存活时间清理旧快照
+
+用法: python snapshot_store.py show <key|路径> [-o out.html]
+      python snapshot_store.py find [--click-seq N] [--publisher-id ID] [--phase PHASE] [--run RUN]
+      python snapshot_store.py prune
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+FULL_SUFFIX = ".html.gz"
+DELTA_SUFFIX = ".delta.gz"
+
+
+def _common_prefix_len(a: str, b: str) -> int:
+    """二分查找公共前缀长度（切片比较在 C 层完成，适合 MB 级字符串）"""
+    lo, hi = 0, min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[:mid] == b[:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _common_suffix_len(a: str, b: str, limit: int) -> int:
+    lo, hi = 0, limit
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[len(a) - mid:] == b[len(b) - mid:]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def make_delta(base: str, html: str) -> tuple[int, int, str]:
+    """返回 (公共前缀长度, 公共后缀长度, 中间片段)，满足 base[:p] + middle + base[len(base)-s:] == html"""
+    prefix = _common_prefix_len(base, html)
+    suffix = _common_suffix_len(base, html, min(len(base), len(html)) - prefix)
+    return prefix, suffix, html[prefix:len(html) - suffix]
+
+
+def apply_delta(base: str, prefix: int, suffix: int, middle: str) -> str:
+    return base[:prefix] + middle + base[len(base) - suffix:]
+
+
+class SnapshotStore:
+    """HTML 快照存储"""
+
+    def __init__(
+        self,
+        root: Path,
+        diff_phases: bool = True,
+        max_bytes: int = 512 * 1024 * 1024,
+        max_age_days: float = 14,
+        compresslevel: int = 6,
+        prune_every: int = 200,
+    ):
+        self.root = Path(root)
+        self.objects_dir = self.root / "objects"
+        self.index_path = self.root / "index.jsonl"
+        # True 时非 before_click 阶段存为相对同一次点击 before_click 的差量
+        self.diff_phases = diff_phases
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+        self.compresslevel = compresslevel
+        self.prune_every = prune_every
+        self.run_id = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        self._puts_since_prune = 0
+        self._lock = threading.RLock()
+        # 最近几次点击的 before_click 快照 {click_seq: (key, html)}，用作差量基准；
+        # 多标签页并行时不同点击的快照会交错到达，因此按 click_seq 保留多个
+        self._bases: dict[int, tuple[str, str]] = {}
+        self._max_bases = 16
+
+    def _object_path(self, key: str, suffix: str) -> Path:
+        return self.objects_dir / key[:2] / f"{key}{suffix}"
+
+    def _find_object(self, key: str) -> Path | None:
+        for suffix in (FULL_SUFFIX, DELTA_SUFFIX):
+            path = self._object_path(key, suffix)
+            if path.exists():
+                return path
+        return None
+
+    def _write_object(self, path: Path, data: bytes):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_bytes(gzip.compress(data, compresslevel=self.compresslevel))
+        tmp.replace(path)
+
+    def put(self, html: str, click_seq: int, publisher_id: str, phase: str) -> str:
+        """保存快照并写入索引，返回对象文件路径（可直接传给 load/resolve）"""
+        with self._lock:
+            return self._put(html, click_seq, publisher_id, phase)
+
+    def _put(self, html: str, click_seq: int, publisher_id: str, phase: str) -> str:
+        key = hashlib.sha256(html.encode("utf-8", errors="ignore")).hexdigest()
+        base_key = None
+        path = self._find_object(key)
+        if path is None:
+            base = self._bases.get(click_seq) if self.diff_phases and phase != "before_click" else None
+            if base is not None and base[0] != key:
+                prefix, suffix, middle = make_delta(base[1], html)
+                # 差量不足以明显节省空间时仍存完整内容
+                if len(middle) * 2 < len(html):
+                    base_key = base[0]
+                    path = self._object_path(key, DELTA_SUFFIX)
+                    payload = {"base": base_key, "prefix": prefix, "suffix": suffix, "middle": middle}
+                    self._write_object(path, json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+            if path is None:
+                path = self._object_path(key, FULL_SUFFIX)
+                self._write_object(path, html.encode("utf-8", errors="ignore"))
+        elif path.name.endswith(DELTA_SUFFIX):
+            if phase == "before_click":
+                # 将作为差量基准的对象改存完整内容，避免差量链随每次邀请加长
+                path = self._rebase(key, path, html)
+            else:
+                base_key = self._read_delta(path)["base"]
+        # 刷新 mtime（含差量基准），使被再次引用的对象不会因存活时间被清理
+        path.touch()
+        base_path = self._find_object(base_key) if base_key else None
+        if base_path is not None:
+            base_path.touch()
+
+        if phase == "before_click":
+            self._bases[click_seq] = (key, html)
+            while len(self._bases) > self._max_bases:
+                self._bases.pop(next(iter(self._bases)))
+
+        self._append_index({
+            "ts": datetime.now(timezone.utc).isoformat(),
+            "run": self.run_id,
+            "click_seq": click_seq,
+            "publisher_id": publisher_id,
+            "phase": phase,
+            "key": key,
+            "base": base_key,
+            "size": len(html),
+        })
+
+        self._puts_since_prune += 1
+        if self.prune_every and self._puts_since_prune >= self.prune_every:
+            self.prune()
+        return str(path)
+
+    def _rebase(self, key: str, delta_path: Path, html: str) -> Path:
+        """把差量对象改写为完整对象；引用原差量路径的记录仍可按 key 解析"""
+        path = self._object_path(key, FULL_SUFFIX)
+        self._write_object(path, html.encode("utf-8", errors="ignore"))
+        delta_path.unlink(missing_ok=True)
+        return path
+
+    def _append_index(self, entry: dict):
+        self.root.mkdir(parents=True, exist_ok=True)
+        with open(self.index_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def _read_delta(self, path: Path) -> dict:
+        return json.loads(gzip.decompress(path.read_bytes()).decode("utf-8"))
+
+    def resolve(self, ref: str) -> str:
+        """把对象文件路径或 key 统一解析为 key"""
+        name = Path(ref).name
+        for suffix in (FULL_SUFFIX, DELTA_SUFFIX):
+            if name.endswith(suffix):
+                return name[:-len(suffix)]
+        return name
+
+    def load(self, ref: str) -> str:
+        """按 key 或对象文件路径还原完整 HTML（自动展开差量）"""
+        key = self.resolve(ref)
+        deltas = []
+        while True:
+            path = self._find_object(key)
+            if path is None:
+                raise FileNotFoundError(f"快照不存在: {ref}")
+            if path.name.endswith(FULL_SUFFIX):
+                break
+            delta = self._read_delta(path)
+            deltas.append(delta)
+            key = delta["base"]
+        html = gzip.decompress(path.read_bytes()).decode("utf-8", errors="ignore")
+        for delta in reversed(deltas):
+            html = apply_delta(html, delta["prefix"], delta["suffix"], delta["middle"])
+        return html
+
+    def iter_index(self):
+        if not self.index_path.exists():
+            return
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+    def find(self, click_seq: int = None, publisher_id: str = None, phase: str = None, run: str = None) -> list[dict]:
+        """按 click_seq/publisher_id/phase/run 查询索引"""
+        return [
+            entry for entry in self.iter_index()
+            if (click_seq is None or entry.get("click_seq") == click_seq)
+            and (publisher_id is None or entry.get("publisher_id") == publisher_id)
+            and (phase is None or entry.get("phase") == phase)
+            and (run is None or entry.get("run") == run)
+        ]
+
+    def prune(self) -> int:
+        """
+        按存活时间与总大小清理对象，返回删除的对象数
+        删除某个对象时一并删除以它为基准的差量，并重写索引去掉失效条目
+        """
+        with self._lock:
+            return self._prune()
+
+    def _prune(self) -> int:
+        self._puts_since_prune = 0
+        if not self.objects_dir.exists():
+            return 0
+
+        objects = []
+        sizes: dict[str, int] = {}
+        for path in self.objects_dir.glob("*/*.gz"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            key = self.resolve(str(path))
+            sizes[key] = stat.st_size
+            objects.append((stat.st_mtime, key))
+        objects.sort()
+
+        dependents: dict[str, set[str]] = {}
+        for entry in self.iter_index():
+            if entry.get("base"):
+                dependents.setdefault(entry["base"], set()).add(entry["key"])
+
+        removed: set[str] = set()
+        total = sum(sizes.values())
+
+        def remove(key: str):
+            nonlocal total
+            # 用显式栈展开依赖，旧版本留下的长差量链不会触发递归上限
+            stack = [key]
+            while stack:
+                key = stack.pop()
+                if key in removed:
+                    continue
+                removed.add(key)
+                path = self._find_object(key)
+                if path is not None:
+                    path.unlink(missing_ok=True)
+                    total -= sizes.get(key, 0)
+                for child in dependents.get(key, ()):
+                    # 已改存为完整对象的不再依赖原基准
+                    child_path = self._find_object(child)
+                    if child_path is None or child_path.name.endswith(DELTA_SUFFIX):
+                        stack.append(child)
+
+        cutoff = time.time() - self.max_age_days * 86400
+        for mtime, key in objects:
+            if mtime >= cutoff and total <= self.max_bytes:
+                break
+            remove(key)
+
+        if removed:
+            # 当前差量基准被删除后不能再作为基准
+            for seq, (key, _) in list(self._bases.items()):
+                if key in removed:
+                    del self._bases[seq]
+            kept = [entry for entry in self.iter_index() if entry.get("key") not in removed]
+            tmp = self.index_path.with_name(self.index_path.name + ".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                for entry in kept:
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            tmp.replace(self.index_path)
+        return len(removed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--root", type=Path, default=Path(__file__).parent / "html_dumps")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    show = sub.add_parser("show", help="还原并输出快照 HTML")
+    show.add_argument("ref")
+    show.add_argument("-o", "--output", type=Path)
+
+    find = sub.add_parser("find", help="查询快照索引")
+    find.add_argument("--click-seq", type=int)
+    find.add_argument("--publisher-id")
+    find.add_argument("--phase")
+    find.add_argument("--run")
+
+    sub.add_parser("prune", help="按保留策略清理快照")
+
+    args = parser.parse_args()
+    store = SnapshotStore(args.root)
+    if args.command == "show":
+        html = store.load(args.ref)
+        if args.output:
+            args.output.write_text(html, encoding="utf-8")
+        else:
+            sys.stdout.write(html)
+    elif args.command == "find":
+        for entry in store.find(args.click_seq, args.publisher_id, args.phase, args.run):
+            print(json.dumps(entry, ensure_ascii=False))
+    elif args.command == "prune":
+        print(f"已删除 {store.prune()} 个快照对象")
+
+
+if __name__ == "__main__":
+    main()
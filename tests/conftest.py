@@ -0,0 +1,25 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# 项目是平铺的顶层模块，测试直接按模块名导入
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture
+def rpa_main(tmp_path, monkeypatch):
+    """状态文件全部指向临时目录、不拦截资源的 main 模块"""
+    import main
+    from loguru import logger
+
+    logger.remove()
+    for name in (
+        "AUDIT_LOG_PATH", "PUBLISHER_IDS_DB_PATH", "SEEN_IDS_PATH", "CLICKED_IDS_PATH", "HTML_DUMP_DIR",
+        "SETTLE_STATS_PATH", "PAGE_INDEX_PATH", "METRICS_JSONL_PATH", "METRICS_PROM_PATH", "CHECKPOINT_PATH",
+        "QUOTA_DB_PATH", "SCORING_RULES_PATH",
+    ):
+        monkeypatch.setattr(main, name, tmp_path / getattr(main, name).name)
+    monkeypatch.setattr(main, "MERCHANT_STATE_ROOT", tmp_path / "merchants")
+    monkeypatch.setattr(main, "RESOURCE_POLICY", None)
+    return main
@@ -0,0 +1,153 @@
+"""
+测试用的假浏览器：模拟目录页的分页表格、邀请弹窗与发送按钮
+
+每个标签页有自己的当前页；URL 不含页码（对应 PAGE_PARAM = None），打开目录页总是回到第 1 页，
+只能通过 #nextPage 向后翻页，或点击分页栏（PAGER_LINKS）上当前页之后 PAGER_WINDOW 页以内的页码。
+按 ID 查找邀请链接时只能找到标签页当前页上的 publisher。
+"""
+import threading
+
+DIRECTORY_URL = "https://ui.awin.com/awin/merchant/{merchant}/affiliate-directory/index/tab/notInvited"
+PAGER_LINKS = "css:#pagination a"
+PAGER_WINDOW = 2
+
+
+class FakeElement:
+    def __init__(self, tab: "FakeTab", kind: str, publisher_id: str | None = None):
+        self.tab = tab
+        self.kind = kind
+        self.publisher_id = publisher_id
+
+    def click(self):
+        if self.kind == "link":
+            self.tab.current = self.publisher_id
+        elif self.kind == "send":
+            self.tab.browser.record_send(self.tab)
+
+    def input(self, message, clear=False):
+        pass
+
+    def run_js(self, js, *args):
+        return True
+
+    def attr(self, name):
+        return self.publisher_id if name == "data-publisherid" else None
+
+    @property
+    def wait(self):
+        return self
+
+    def clickable(self, **kwargs):
+        return True
+
+    def displayed(self, **kwargs):
+        pass
+
+
+class _NextButton:
+    def __init__(self, tab: "FakeTab"):
+        self.tab = tab
+
+    def click(self):
+        self.tab.page += 1
+        self.tab.browser.page_turns += 1
+
+
+class _PageLink:
+    def __init__(self, tab: "FakeTab", page: int):
+        self.tab = tab
+        self.text = str(page + 1)
+        self.page = page
+
+    def click(self):
+        self.tab.page = self.page
+        self.tab.browser.page_jumps += 1
+
+
+class _Wait:
+    def doc_loaded(self):
+        pass
+
+    def __call__(self, *args):
+        pass
+
+
+class FakeTab:
+    def __init__(self, browser: "FakeBrowser"):
+        self.browser = browser
+        self.url = "about:blank"
+        self.page = 0
+        self.current: str | None = None
+        self.html = ""
+        self.closed = False
+
+    def get(self, url):
+        self.url = url
+        self.page = 0
+
+    @property
+    def pages(self) -> list[list[str]]:
+        return self.browser.merchants.get(self.url, [])
+
+    def run_js(self, js, *args):
+        if "a[data-publisherid]" not in js:
+            # 等待页面稳定的脚本，视为立即满足
+            return True
+        ids = self.pages[self.page] if self.page < len(self.pages) else []
+        self.browser.fetches.append((self.url, self.page))
+        return {
+            "headers": ["Publisher", "Action"],
+            "rows": [{"publisher_id": pid, "link_text": "Invite", "cells": [f"pub{pid}", "Invite"]} for pid in ids],
+        }
+
+    def ele(self, locator, timeout=None):
+        if locator == "#nextPage":
+            return _NextButton(self) if self.page + 1 < len(self.pages) else None
+        if "data-publisherid" in locator:
+            publisher_id = locator.split('"')[1]
+            on_page = self.page < len(self.pages) and publisher_id in self.pages[self.page]
+            return FakeElement(self, "link", publisher_id) if on_page else None
+        if "modal_save" in locator:
+            return FakeElement(self, "send")
+        return FakeElement(self, "other")
+
+    def eles(self, locator, timeout=None):
+        if locator == PAGER_LINKS:
+            last = min(self.page + PAGER_WINDOW, len(self.pages) - 1)
+            return [_PageLink(self, page) for page in range(max(self.page - PAGER_WINDOW, 0), last + 1)]
+        return []
+
+    @property
+    def wait(self):
+        return _Wait()
+
+    def close(self):
+        self.closed = True
+
+
+class FakeBrowser:
+    """merchants: {商户 ID: 每页的 publisher ID 列表}"""
+
+    def __init__(self, merchants: dict[int, list[list[str]]]):
+        self.merchants = {DIRECTORY_URL.format(merchant=m): pages for m, pages in merchants.items()}
+        self.sent: list[tuple[str, str]] = []
+        self.page_turns = 0
+        self.page_jumps = 0
+        # 每次读取目录表格时标签页所在的 (URL, 页下标)
+        self.fetches: list[tuple[str, int]] = []
+        self._lock = threading.Lock()
+        self.latest_tab = FakeTab(self)
+
+    def new_tab(self):
+        return FakeTab(self)
+
+    def get_tabs(self):
+        return [self.latest_tab]
+
+    def record_send(self, tab: FakeTab):
+        with self._lock:
+            self.sent.append((tab.url, tab.current))
+
+
+def pages_of(first: int, pages: int, per_page: int = 5) -> list[list[str]]:
+    return [[str(first + p * per_page + i) for i in range(per_page)] for p in range(pages)]
@@ -0,0 +1,29 @@
+import json
+import threading
+
+from adaptive_wait import SettleStats
+
+
+def test_concurrent_saves_of_shared_stats(tmp_path):
+    path = tmp_path / "settle_times.json"
+    stats = SettleStats(path)
+    errors: list[BaseException] = []
+
+    def save_many(stage: str):
+        try:
+            for i in range(50):
+                stats.record(stage, i / 1000)
+                stats.save()
+        except BaseException as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=save_many, args=(f"stage{n}",)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    saved = json.loads(path.read_text(encoding="utf-8"))
+    assert {stage: len(values) for stage, values in saved.items()} == {f"stage{n}": 50 for n in range(4)}
+    assert SettleStats(path).summary().keys() == saved.keys()
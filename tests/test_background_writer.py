@@ -0,0 +1,49 @@
+import threading
+import time
+
+from background_writer import BackgroundWriter
+
+
+def test_submit_racing_close_never_loses_a_write():
+    for _ in range(20):
+        writer = BackgroundWriter(maxsize=4)
+        done: list[int] = []
+        futures = []
+        futures_lock = threading.Lock()
+        start = threading.Event()
+
+        def submitter(base: int):
+            start.wait()
+            for i in range(50):
+                future = writer.submit(done.append, base + i)
+                with futures_lock:
+                    futures.append(future)
+
+        threads = [threading.Thread(target=submitter, args=(n * 100,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        start.set()
+        time.sleep(0.001)
+        writer.close()
+        for thread in threads:
+            thread.join()
+
+        assert all(future.result(timeout=5) is None for future in futures)
+        assert sorted(done) == sorted(n * 100 + i for n in range(4) for i in range(50))
+
+
+def test_stats_account_for_every_task():
+    writer = BackgroundWriter(maxsize=2)
+
+    def fail():
+        raise ValueError("boom")
+
+    for _ in range(10):
+        writer.submit(time.sleep, 0)
+    writer.submit(fail)
+    writer.close()
+    stats = writer.stats()
+    assert stats["submitted"] == 11
+    assert stats["completed"] + stats["failed"] == 11
+    assert stats["failed"] == 1
+    assert stats["pending"] == 0
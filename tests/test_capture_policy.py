@@ -0,0 +1,23 @@
+import pytest
+
+from capture_policy import CAPTURE_MODES, CapturePolicy, SnapshotCapture
+
+
+def test_default_rpa_policy_keeps_success_snapshot(rpa_main):
+    capture = SnapshotCapture(rpa_main.CAPTURE_POLICY)
+    assert capture.policy.mode == "ring"
+    assert capture.wants("after_click", 1)
+    assert capture.holds("before_click")
+
+
+@pytest.mark.parametrize("mode", CAPTURE_MODES)
+def test_keep_after_click_in_every_mode(mode):
+    capture = SnapshotCapture(CapturePolicy(mode, keep_after_click=True))
+    assert all(capture.wants("after_click", seq) for seq in range(1, 30))
+    assert not capture.holds("after_click")
+
+
+def test_ring_without_keep_after_click_skips_success_snapshot():
+    capture = SnapshotCapture(CapturePolicy("ring"))
+    assert not capture.wants("after_click", 1)
+    assert capture.wants("click_failed", 1)
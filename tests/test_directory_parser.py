@@ -0,0 +1,59 @@
+import pytest
+
+from directory_parser import (
+    BACKENDS,
+    INVITE_AVAILABLE,
+    INVITE_DISABLED,
+    INVITE_INVITED,
+    invite_state_of,
+    parse_directory_html,
+)
+
+PAGE = """
+<div id="directoryResults"><table>
+  <thead><tr><th>Publisher</th><th>Sector</th><th></th></tr></thead>
+  <tbody>
+    <tr><td>A</td><td>Retail</td><td><a data-publisherid="1">Invite</a></td></tr>
+    <tr><td>B</td><td>Retail</td><td><a data-publisherid="2">Invited</a></td></tr>
+    <tr><td>C</td><td>Retail</td><td><a data-publisherid="3">Not invited</a></td></tr>
+    <tr><td>D</td><td>Retail</td><td><a data-publisherid="4">Uninvited</a></td></tr>
+    <tr><td>E</td><td>Retail</td><td><a data-publisherid="5" class="disabled">Invite</a></td></tr>
+  </tbody>
+</table></div>
+"""
+
+
+@pytest.mark.parametrize(
+    ("text", "state"),
+    [
+        ("Invite", INVITE_AVAILABLE),
+        ("Invited", INVITE_INVITED),
+        (" Already  invited ", INVITE_INVITED),
+        ("Not invited", INVITE_AVAILABLE),
+        ("Not yet invited", INVITE_AVAILABLE),
+        ("Uninvited", INVITE_AVAILABLE),
+        ("un-invited", INVITE_AVAILABLE),
+        (None, INVITE_AVAILABLE),
+    ],
+)
+def test_invite_state_of_label(text, state):
+    assert invite_state_of(text, None, None) == state
+
+
+def test_invite_state_of_disabled():
+    assert invite_state_of("Invite", "btn disabled", None) == INVITE_DISABLED
+    assert invite_state_of("Invite", None, "true") == INVITE_DISABLED
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_parse_negative_labels_are_invitable(backend):
+    rows = parse_directory_html(PAGE, backend=backend)
+    states = {row.publisher_id: row.invite_state for row in rows}
+    assert states == {
+        "1": INVITE_AVAILABLE,
+        "2": INVITE_INVITED,
+        "3": INVITE_AVAILABLE,
+        "4": INVITE_AVAILABLE,
+        "5": INVITE_DISABLED,
+    }
+    assert [row.publisher_id for row in rows if row.invitable] == ["1", "3", "4"]
@@ -0,0 +1,84 @@
+import os
+import sqlite3
+import time
+
+import pytest
+
+from id_store import IdStore, MemoryIdStore, SqliteIdStore
+
+
+def test_legacy_import_is_excluded_from_history(tmp_path):
+    legacy = tmp_path / "clicked_ids.txt"
+    legacy.write_text("1\n2\n3\n", encoding="utf-8")
+    store = SqliteIdStore(tmp_path / "ids.sqlite3", "clicked", legacy_path=legacy)
+    assert len(store) == 3
+
+    since = time.time() - 60
+    store.add_many(["4", "5"], "hi")
+    assert "1" in store
+    # 同一批发送的记录写入时间相同，仍各自计数
+    records = store.records_since(since)
+    assert [pid for pid, _ in records] == ["4", "5"]
+    assert records[0][1] == records[1][1]
+    assert store.count_since(since) == 2
+    store.close()
+
+
+def test_existing_database_marks_previous_import_as_legacy(tmp_path):
+    path = tmp_path / "ids.sqlite3"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE clicked (id TEXT PRIMARY KEY, ts REAL NOT NULL, message TEXT) WITHOUT ROWID")
+    migrated = tmp_path / "clicked_ids.txt.migrated"
+    migrated.write_text("1\n2\n", encoding="utf-8")
+    imported_at = time.time() - 10
+    os.utime(migrated, (imported_at, imported_at))
+    conn.executemany("INSERT INTO clicked (id, ts) VALUES (?, ?)", [("1", imported_at), ("2", imported_at)])
+    conn.execute("INSERT INTO clicked (id, ts, message) VALUES ('3', ?, 'hi')", (imported_at,))
+    conn.commit()
+    conn.close()
+
+    store = SqliteIdStore(path, "clicked", legacy_path=tmp_path / "clicked_ids.txt")
+    assert [pid for pid, _ in store.records_since(imported_at - 1)] == ["3"]
+    assert store.count_since(imported_at - 1) == 1
+    assert len(store) == 3
+    store.close()
+
+
+def test_pre_flag_database_without_migrated_file_keeps_rows_countable(tmp_path):
+    path = tmp_path / "ids.sqlite3"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE clicked (id TEXT PRIMARY KEY, ts REAL NOT NULL, message TEXT) WITHOUT ROWID")
+    sent_at = time.time() - 10
+    conn.execute("INSERT INTO clicked (id, ts) VALUES ('1', ?)", (sent_at,))
+    conn.commit()
+    conn.close()
+    # 补列之后才导入的旧版文本文件仍标记为 legacy
+    legacy = tmp_path / "clicked_ids.txt"
+    legacy.write_text("2\n", encoding="utf-8")
+
+    store = SqliteIdStore(path, "clicked", legacy_path=legacy)
+    assert [pid for pid, _ in store.records_since(sent_at - 1)] == ["1"]
+    assert "2" in store and len(store) == 2
+    store.close()
+
+    conn = sqlite3.connect(path)
+    assert dict(conn.execute("SELECT id, legacy FROM clicked")) == {"1": 0, "2": 1}
+    conn.close()
+    # 再次打开不会重复补列或重新标记
+    reopened = SqliteIdStore(path, "clicked", legacy_path=legacy)
+    assert reopened.count_since(sent_at - 1) == 1
+    reopened.close()
+
+
+def test_incomplete_backend_fails_at_construction():
+    class Partial(IdStore):
+        def __contains__(self, publisher_id):
+            return False
+
+        def __len__(self):
+            return 0
+
+    with pytest.raises(TypeError):
+        Partial()
+    store = MemoryIdStore(["1"])
+    assert store.count_since(0) == 1
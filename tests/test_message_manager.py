@@ -0,0 +1,25 @@
+import os
+
+from main import MessageManager
+
+
+def test_save_in_same_mtime_tick_is_not_served_stale(tmp_path):
+    path = tmp_path / "invitation_messages.json"
+    manager = MessageManager(path)
+    manager.save([{"name": "a", "content": "hello"}])
+    stat = path.stat()
+    assert manager.load()[0]["content"] == "hello"
+
+    manager.save([{"name": "a", "content": "world"}])
+    # 模拟粗粒度 mtime：改写后文件的 mtime 与大小都与上次相同
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert path.stat().st_size == stat.st_size
+
+    assert manager.load()[0]["content"] == "world"
+
+
+def test_load_returns_copies(tmp_path):
+    manager = MessageManager(tmp_path / "invitation_messages.json")
+    manager.save([{"name": "a", "content": "hello"}])
+    manager.load()[0]["content"] = "changed"
+    assert manager.load()[0]["content"] == "hello"
@@ -0,0 +1,81 @@
+import time
+
+from fake_awin import DIRECTORY_URL, PAGER_LINKS, FakeBrowser, pages_of
+from page_index import PageIndex
+
+KEY = "https://ui.awin.com/directory"
+
+
+def test_first_open_page_follows_full_pages(tmp_path):
+    index = PageIndex(tmp_path / "page_index.json")
+    index.observe(KEY, 1, ["1", "2"], full=True)
+    index.observe(KEY, 2, ["3", "4"], full=True)
+    index.observe(KEY, 3, ["5", "6"])
+    assert index.first_open_page(KEY) == 3
+
+    # 同一页再次以未完成观察，仍保持已完成
+    assert index.observe(KEY, 2, ["3", "4"])
+    assert index.first_open_page(KEY) == 3
+
+
+def test_sort_order_change_invalidates_page_and_after(tmp_path):
+    index = PageIndex(tmp_path / "page_index.json")
+    for page in range(1, 4):
+        index.observe(KEY, page, [str(page * 10 + i) for i in range(2)], full=True)
+
+    assert not index.observe(KEY, 2, ["99", "98"])
+    assert index.first_open_page(KEY) == 2
+    assert index.expected(KEY, 1) is not None
+    assert index.expected(KEY, 3) is None
+
+    # 其他目录列表不受影响
+    index.observe("other", 1, ["1"], full=True)
+    assert index.first_open_page("other") == 2
+
+
+def make_rpa(rpa_main, pages):
+    browser = FakeBrowser({1: pages})
+    rpa = rpa_main.AwinRPA(browser=browser, invite_interval=0, page_interval=30, live_metrics=False)
+    rpa.goto_page(DIRECTORY_URL.format(merchant=1))
+    key = rpa._listing_key()
+    for page in range(1, 5):
+        rpa.page_index.observe(key, page, pages[page - 1], full=True)
+    return rpa, browser
+
+
+def test_skip_without_page_param_ignores_page_interval(rpa_main):
+    assert rpa_main.AwinRPA.PAGE_PARAM is None and rpa_main.AwinRPA.PAGE_LINKS is None
+    pages = pages_of(0, 6)
+    rpa, browser = make_rpa(rpa_main, pages)
+
+    started = time.perf_counter()
+    rpa.skip_exhausted_pages()
+
+    assert rpa.page_number == 5
+    assert browser.page_turns == 4
+    assert time.perf_counter() - started < 5
+    assert "next_page.rate_wait" not in rpa.metrics.summary()
+
+
+def test_skip_clicks_pager_links(rpa_main, monkeypatch):
+    monkeypatch.setattr(rpa_main.AwinRPA, "PAGE_LINKS", PAGER_LINKS)
+    pages = pages_of(0, 6)
+    rpa, browser = make_rpa(rpa_main, pages)
+
+    rpa.skip_exhausted_pages()
+
+    # 分页栏只显示后两页：1 -> 3 -> 5
+    assert rpa.page_number == 5
+    assert (browser.page_turns, browser.page_jumps) == (0, 2)
+    assert rpa.get_publisher_ids() == pages[4]
+
+
+def test_skip_stops_when_sort_order_changed(rpa_main):
+    pages = pages_of(0, 6)
+    rpa, browser = make_rpa(rpa_main, pages)
+    browser.merchants[DIRECTORY_URL.format(merchant=1)] = pages[::-1]
+
+    rpa.skip_exhausted_pages()
+
+    assert rpa.page_number == 1 and browser.page_turns == 0
+    assert rpa.page_index.first_open_page(rpa._listing_key()) == 1
@@ -0,0 +1,67 @@
+import DrissionPage
+
+from fake_awin import DIRECTORY_URL, FakeBrowser, FakeTab, pages_of
+from resource_policy import ResourcePolicy
+
+PAGES = pages_of(0, 2)
+
+
+class FlakyTab(FakeTab):
+    """第一次翻页时断线"""
+
+    failed = False
+
+    def ele(self, locator, timeout=None):
+        if locator == "#nextPage" and not FlakyTab.failed:
+            FlakyTab.failed = True
+            raise ConnectionError("connection lost")
+        return super().ele(locator, timeout)
+
+
+class CountingPolicy(ResourcePolicy):
+    def __init__(self):
+        super().__init__()
+        self.attached = []
+
+    def attach(self, tab):
+        self.attached.append(tab)
+        return True
+
+
+def make_rpa(rpa_main, monkeypatch, blank_after_reconnect=False, **kwargs):
+    """在商户 2 的目录页上开始的新运行：分页索引记录第 1 页已全部邀请，跳页时断线重连"""
+    monkeypatch.setattr(FlakyTab, "failed", False)
+    browser = FakeBrowser({2: PAGES})
+    tab = browser.latest_tab = FlakyTab(browser)
+    rpa = rpa_main.AwinRPA(browser=browser, invite_interval=0, page_interval=0, live_metrics=False, **kwargs)
+    rpa.RECONNECT_BASE_DELAY = 0
+    rpa.goto_page(DIRECTORY_URL.format(merchant=2))
+    rpa._observe_page(PAGES[0], full=True)
+
+    def chromium(co):
+        browser.latest_tab = FakeTab(browser) if blank_after_reconnect else tab
+        return browser
+
+    monkeypatch.setattr(DrissionPage, "Chromium", chromium)
+    return rpa, browser
+
+
+def test_fresh_run_reconnects_to_callers_directory(rpa_main, monkeypatch):
+    # 重连后拿到的是一个空白标签页，第一次保存检查点前就已断线
+    rpa, browser = make_rpa(rpa_main, monkeypatch, blank_after_reconnect=True)
+
+    sent = rpa.run(3, "hi")
+
+    assert FlakyTab.failed
+    assert sent == 3
+    assert browser.sent == [(DIRECTORY_URL.format(merchant=2), pid) for pid in PAGES[1][:3]]
+
+
+def test_reconnect_reattaches_resource_policy(rpa_main, monkeypatch):
+    policy = CountingPolicy()
+    rpa, browser = make_rpa(rpa_main, monkeypatch, resource_policy=policy)
+    tab = browser.latest_tab
+
+    assert rpa.run(3, "hi") == 3
+    # 新连接沿用同一个标签页（相同的 tab_id），仍重新启用拦截
+    assert policy.attached == [tab, tab]
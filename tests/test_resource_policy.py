@@ -0,0 +1,43 @@
+from fnmatch import fnmatchcase
+
+import main
+from resource_policy import ResourcePolicy
+
+# 邀请弹窗依赖的资源：弹窗由脚本渲染、样式决定可见/可点击，发送通过 XHR/Fetch 提交
+MODAL_RESOURCE_TYPES = {"Document", "Script", "Stylesheet", "XHR", "Fetch", "Other"}
+AWIN_URLS = (
+    "https://ui.awin.com/awin/merchant/45307/affiliate-directory/index/tab/notInvited",
+    "https://ui.awin.com/js/affiliate-directory.js",
+    "https://ui.awin.com/css/main.css",
+    "https://ui.awin.com/awin/merchant/45307/affiliate-directory/invite",
+)
+
+
+class FakeDriver:
+    def __init__(self):
+        self.calls = []
+
+    def set_callback(self, event, callback):
+        self.callback = callback
+
+    def run(self, method, **params):
+        self.calls.append((method, params))
+        return {}
+
+
+def test_resource_blocking_is_opt_in():
+    assert main.RESOURCE_POLICY is None
+
+
+def test_blocked_resources_exclude_what_the_invite_modal_needs():
+    policy = ResourcePolicy()
+    assert policy.block_types.isdisjoint(MODAL_RESOURCE_TYPES)
+    assert not any(fnmatchcase(url, pattern) for url in AWIN_URLS for pattern in policy.deny)
+
+    driver = FakeDriver()
+    tab = type("Tab", (), {"driver": driver})()
+    assert policy.attach(tab)
+    (method, params), = driver.calls
+    assert method == "Fetch.enable"
+    typed = {p["resourceType"] for p in params["patterns"] if "resourceType" in p}
+    assert typed == set(policy.block_types)
@@ -0,0 +1,33 @@
+from fake_awin import DIRECTORY_URL, FakeBrowser, pages_of
+
+
+def make_rpa(rpa_main, browser):
+    rpa = rpa_main.AwinRPA(browser=browser, invite_interval=0, page_interval=0, live_metrics=False)
+    rpa.goto_page(DIRECTORY_URL.format(merchant=1))
+    return rpa
+
+
+def test_workers_follow_pages_without_page_param(rpa_main):
+    assert rpa_main.AwinRPA.PAGE_PARAM is None
+    browser = FakeBrowser({1: pages_of(0, 4)})
+    rpa = make_rpa(rpa_main, browser)
+
+    sent = rpa.run_parallel(18, "hi", tabs=3)
+
+    assert sent == 18
+    assert not rpa.failed_publisher_ids
+    sent_ids = [pid for _, pid in browser.sent]
+    assert len(sent_ids) == len(set(sent_ids)) == 18
+    # 跨过了第 1 页之后的三页
+    assert {str(i) for i in range(5, 18)} <= set(sent_ids)
+
+
+def test_workers_resume_from_current_page(rpa_main):
+    browser = FakeBrowser({1: pages_of(0, 3)})
+    rpa = make_rpa(rpa_main, browser)
+    rpa.click_next_page()
+
+    sent = rpa.run_parallel(10, "hi", tabs=2)
+
+    assert sent == 10
+    assert sorted(pid for _, pid in browser.sent) == sorted(str(i) for i in range(5, 15))
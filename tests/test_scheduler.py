@@ -0,0 +1,80 @@
+from types import SimpleNamespace
+
+import batch_run
+import scheduler
+from fake_awin import DIRECTORY_URL, FakeBrowser, pages_of
+from memory_guard import MemoryLimits
+
+
+def make_run(rpa_main, browser, merchant: int, count: int, **kwargs) -> scheduler.MerchantRun:
+    job = scheduler.MerchantJob(merchant=str(merchant), count=count, invite_interval=0, page_interval=0)
+    rpa = rpa_main.AwinRPA(
+        browser=browser, invite_interval=0, page_interval=0, live_metrics=False,
+        state_dir=rpa_main.MERCHANT_STATE_ROOT / job.key, **kwargs,
+    )
+    rpa.pin_tab = True
+    return scheduler.MerchantRun(job, rpa, "default", "hi")
+
+
+def test_turn_resumes_on_recorded_page_after_tab_was_shared(rpa_main):
+    assert rpa_main.AwinRPA.PAGE_PARAM is None
+    browser = FakeBrowser({1: pages_of(0, 3), 2: pages_of(100, 3)})
+    tab = browser.latest_tab
+    first, second = make_run(rpa_main, browser, 1, 14), make_run(rpa_main, browser, 2, 14)
+
+    scheduler.serve(first, tab, 7)
+    assert first.resume_page == 2
+    scheduler.serve(second, tab, 7)
+
+    browser.fetches.clear()
+    scheduler.serve(first, tab, 7)
+
+    # 直接回到第 2 页继续，不从第 1 页重新扫描
+    assert browser.fetches[0] == (DIRECTORY_URL.format(merchant=1), 1)
+    assert first.sent == 14 and first.status == "running"
+    sent_first = [pid for url, pid in browser.sent if url == DIRECTORY_URL.format(merchant=1)]
+    assert sorted(sent_first, key=int) == [str(i) for i in range(14)]
+
+
+def test_turn_on_same_tab_continues_without_reloading(rpa_main):
+    browser = FakeBrowser({1: pages_of(0, 3)})
+    tab = browser.latest_tab
+    run = make_run(rpa_main, browser, 1, 14)
+
+    scheduler.serve(run, tab, 7)
+    turns = browser.page_turns
+    scheduler.serve(run, tab, 7)
+
+    assert run.sent == 14
+    # 第二轮只需从第 2 页翻到第 3 页
+    assert browser.page_turns - turns == 1
+
+
+def test_tab_recycled_mid_turn_is_restored_and_handed_back(rpa_main):
+    browser = FakeBrowser({1: pages_of(0, 3)})
+    tab = browser.latest_tab
+    run = make_run(rpa_main, browser, 1, 14, memory_limits=MemoryLimits(check_every=3, recycle_every=3))
+
+    # 第 1 页发完 5 个后回收标签页
+    new_tab = scheduler.serve(run, tab, 7)
+
+    assert tab.closed
+    assert new_tab is not tab and not new_tab.closed
+    assert run.rpa.tab is new_tab and run.tab is new_tab
+    assert run.sent == 7 and run.status == "running"
+
+    assert scheduler.serve(run, new_tab, 7) is run.rpa.tab
+    assert run.sent == 14
+    assert sorted((pid for _, pid in browser.sent), key=int) == [str(i) for i in range(14)]
+
+
+def test_exit_code_of_quota_matches_batch_run():
+    def runs(*statuses):
+        return [SimpleNamespace(status=status) for status in statuses]
+
+    assert scheduler.exit_code_of(runs("done", "done")) == batch_run.EXIT_OK
+    assert scheduler.exit_code_of(runs("done", "quota")) == batch_run.EXIT_PARTIAL
+    assert scheduler.exit_code_of(runs("quota")) == batch_run.exit_code_of([{"status": "quota"}])
+    assert scheduler.exit_code_of(runs("exhausted")) == batch_run.EXIT_PARTIAL
+    assert scheduler.exit_code_of(runs("quota", "error")) == batch_run.EXIT_ERROR
+    assert scheduler.exit_code_of(runs("quota", "interrupted")) == batch_run.EXIT_INTERRUPTED
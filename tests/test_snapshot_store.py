@@ -0,0 +1,41 @@
+import json
+
+from snapshot_store import DELTA_SUFFIX, FULL_SUFFIX, SnapshotStore
+
+
+def page(n: int) -> str:
+    return "<html><body>" + "x" * 400 + f"<p>{n}</p>" + "y" * 400 + "</body></html>"
+
+
+def test_before_click_equal_to_previous_after_click_keeps_chain_short(tmp_path):
+    store = SnapshotStore(tmp_path, prune_every=0)
+    refs = []
+    for seq in range(1, 300):
+        store.put(page(seq - 1), seq, str(seq), "before_click")
+        refs.append(store.put(page(seq), seq, str(seq), "after_click"))
+
+    deltas = list(tmp_path.glob(f"objects/*/*{DELTA_SUFFIX}"))
+    assert deltas
+    for path in deltas:
+        base = store._read_delta(path)["base"]
+        assert store._find_object(base).name.endswith(FULL_SUFFIX)
+    # 旧的差量路径在基准改存为完整对象后仍可解析
+    assert all(store.load(ref) == page(seq) for seq, ref in enumerate(refs, start=1))
+
+
+def test_load_walks_long_delta_chain(tmp_path):
+    store = SnapshotStore(tmp_path)
+    key = "0" * 64
+    store._write_object(store._object_path(key, FULL_SUFFIX), page(0).encode("utf-8"))
+    for n in range(1, 1500):
+        child = f"{n:064x}"
+        prefix, suffix, middle = len("<html><body>"), 0, page(n)[len("<html><body>"):]
+        payload = {"base": key, "prefix": prefix, "suffix": suffix, "middle": middle}
+        store._write_object(store._object_path(child, DELTA_SUFFIX), json.dumps(payload).encode("utf-8"))
+        store._append_index({"key": child, "base": key})
+        key = child
+
+    assert store.load(key) == page(1499)
+
+    store.max_age_days = -1
+    assert store.prune() == 1500